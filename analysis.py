@@ -0,0 +1,232 @@
+"""
+Post-game blunder analysis.
+
+Every position of a recorded game is searched again with a deeper
+fixed-depth alpha-beta `CustomPlayer` search than the agents could afford
+during the game. For each move the analyzer reports the value of the best
+move and of the move that was played, both from the point of view of the
+player who moved, and flags
+
+    blunder     the played move is worth at least `threshold` less than the
+                best one, or it walks into a forced loss
+    missed win  the best move forces a win and the played one doesn't
+
+Positions are searched in a pool of processes. Consecutive positions of a
+game are sent to the same worker, which keeps one cache of heuristic values
+for all of them: the searches for the best and for the played move of a
+position end on the same leaves, and transpositions recur from one position
+to the next, so these leaves are only scored once.
+
+    python analysis.py games.jsonl 3 --depth 7 --workers 4
+    python analysis.py games.db 42
+"""
+
+import argparse
+import json
+import math
+import os
+
+from concurrent.futures import ProcessPoolExecutor
+
+from isolation.bitboard import decode_state
+from isolation.bitboard import encode_state
+from isolation import Board
+from game_agent import CustomPlayer
+from gamedb import GameDB
+from gamedb import record_moves
+from sample_players import improved_score
+
+MAX_CACHE_SIZE = 1000000
+
+# per-process cache of heuristic values: (game key, {position: value})
+_CACHE = [None, {}]
+
+
+class CachedScore():
+    """Heuristic wrapper memoizing the values of the positions of one game.
+
+    Parameters
+    ----------
+    score_fn : callable
+        The heuristic; it must only depend on the cells, the players'
+        locations and the side to move.
+
+    cache : dict
+        Shared between the positions of a game.
+    """
+
+    def __init__(self, score_fn, cache):
+        self.score_fn = score_fn
+        self.cache = cache
+
+    def __call__(self, game, player):
+        symbols = game.__player_symbols__
+        key = (bytes(cell != Board.BLANK for row in game.__board_state__ for cell in row),
+               game.__last_player_move__[game.__player_1__],
+               game.__last_player_move__[game.__player_2__],
+               symbols[game.active_player], symbols[player])
+        value = self.cache.get(key)
+        if value is None:
+            value = self.cache[key] = self.score_fn(game, player)
+        return value
+
+
+def _analyze_position(task):
+    """
+    Search one position; return (ply, best move, best value, played value).
+    Runs in a worker process.
+    """
+    game_key, ply, state, played, depth, score_fn = task
+    if _CACHE[0] != game_key or len(_CACHE[1]) > MAX_CACHE_SIZE:
+        _CACHE[0], _CACHE[1] = game_key, {}
+
+    player = CustomPlayer(search_depth=depth, score_fn=CachedScore(score_fn, _CACHE[1]),
+                          iterative=False, method='alphabeta')
+    player.time_left = lambda: float("inf")
+    seats = (player, "opponent") if state[5] else ("opponent", player)
+    game = decode_state(state, *seats)
+
+    best_value, best_move = player.alphabeta(game, depth)
+    if played in game.get_legal_moves():
+        played_value, _ = player.alphabeta(game.forecast_move(played), depth - 1,
+                                           maximizing_player=False)
+    else:
+        played_value = float("-inf")
+    return ply, best_move, best_value, played_value
+
+
+def analyze(moves, width=7, height=7, start=0, depth=6, score_fn=improved_score,
+            threshold=2., workers=1, game_key=None):
+    """
+    Analyze every move of a game.
+
+    Parameters
+    ----------
+    moves : list<(int, int)>
+        Every ply of the game in order (see `gamedb.record_moves`). A final
+        move that isn't legal (e.g. None for a player out of moves) is
+        analyzed as a loss.
+
+    width, height : int (optional)
+        Board size.
+
+    start : int (optional)
+        First ply to analyze, e.g. 2 to skip a random opening.
+
+    depth : int (optional)
+        Search depth of the analysis; at least 2.
+
+    score_fn : callable (optional)
+        Heuristic of the analysis search; must be picklable for workers > 1.
+
+    threshold : float (optional)
+        Smallest loss of value flagged as a blunder.
+
+    workers : int (optional)
+        Number of processes; positions are searched in this process if 1.
+
+    game_key : hashable (optional)
+        Identifies the game for the workers' caches.
+
+    Returns
+    ----------
+    list<dict>
+        One entry per analyzed move: ply, player (1 or 2), move, best_move,
+        best_value, played_value, swing and flag ("blunder", "missed win" or
+        None).
+    """
+    if depth < 2:
+        raise ValueError("The analysis depth must be at least 2")
+    game_key = game_key if game_key is not None else tuple(moves)
+
+    tasks = []
+    game = Board(1, 2, width=width, height=height)
+    for ply, move in enumerate(moves):
+        if ply >= start:
+            tasks.append((game_key, ply, encode_state(game), move, depth, score_fn))
+        if move not in game.get_legal_moves():
+            break
+        game.apply_move(move)
+
+    if workers > 1 and len(tasks) > 1:
+        # contiguous chunks keep the positions of a game on the same worker
+        chunk = int(math.ceil(len(tasks) / float(workers)))
+        with ProcessPoolExecutor(workers) as pool:
+            results = list(pool.map(_analyze_position, tasks, chunksize=chunk))
+    else:
+        results = [_analyze_position(task) for task in tasks]
+
+    report = []
+    for ply, best_move, best_value, played_value in results:
+        if best_value == played_value:
+            swing = 0.
+        else:
+            swing = best_value - played_value
+        flag = None
+        if best_value == float("inf") and played_value != float("inf"):
+            flag = "missed win"
+        elif swing >= threshold or (played_value == float("-inf") and best_value != played_value):
+            flag = "blunder"
+        report.append({"ply": ply, "player": 1 + ply % 2, "move": moves[ply],
+                       "best_move": best_move, "best_value": best_value,
+                       "played_value": played_value, "swing": swing, "flag": flag})
+    return report
+
+
+def report_as_text(report):
+    """ Render the output of `analyze` as a table. """
+    cell = lambda move: "none" if move is None or tuple(move) == (-1, -1) else \
+        "{},{}".format(*move)
+    lines = ["{:>4} {:>6} {:>6} {:>6} {:>8} {:>8} {:>7}".format(
+        "ply", "player", "played", "best", "value", "best", "swing")]
+    for entry in report:
+        lines.append("{ply:>4} {player:>6} {0:>6} {1:>6} {played_value:>8.1f} "
+                     "{best_value:>8.1f} {swing:>7.1f}  {2}".format(
+                         cell(entry["move"]), cell(entry["best_move"]), entry["flag"] or "",
+                         **entry).rstrip())
+    flagged = [e for e in report if e["flag"]]
+    lines.append("{} blunders, {} missed wins".format(
+        sum(e["flag"] == "blunder" for e in flagged),
+        sum(e["flag"] == "missed win" for e in flagged)))
+    return "\n".join(lines)
+
+
+def load_game(source, game):
+    """
+    Load game number `game` (0-based) of a gamelog JSON Lines file, or the
+    game with id `game` of a `gamedb` database; return (moves, width,
+    height, number of opening plies).
+    """
+    if source.endswith(".db"):
+        with GameDB(source) as db:
+            record = db.get(game)
+        opening = record["opening"]
+        return record["moves"], record["width"], record["height"], 2 if opening else 0
+    with open(source) as f:
+        for i, line in enumerate(f):
+            if i == game:
+                record = json.loads(line)
+                moves, _ = record_moves(record)
+                return moves, 7, 7, len(record.get("opening", []))
+    raise KeyError(game)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find the blunders of a recorded game.")
+    parser.add_argument("source", help="gamelog JSON Lines file or gamedb database (.db)")
+    parser.add_argument("game", type=int, help="line number (from 0) or game id")
+    parser.add_argument("--depth", type=int, default=6)
+    parser.add_argument("--threshold", type=float, default=2.)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--include-opening", action="store_true",
+                        help="also analyze the moves of the (random) opening")
+    args = parser.parse_args()
+
+    moves, width, height, opening = load_game(args.source, args.game)
+    report = analyze(moves, width, height, 0 if args.include_opening else opening,
+                     args.depth, threshold=args.threshold, workers=args.workers)
+    print(report_as_text(report))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Tests for the post-game blunder analysis
+"""
+
+import unittest
+
+import analysis
+
+from sample_players import improved_score
+
+
+class AnalysisTest(unittest.TestCase):
+
+    def setUp(self):
+        # a 3x3 board: the center is unreachable, every other cell lies on a
+        # single knight cycle
+        self.moves = [(0, 0), (2, 2), (1, 2), (0, 1), (2, 0), (1, 0)]
+
+    def test_report(self):
+        report = analysis.analyze(self.moves, 3, 3, depth=3)
+        self.assertEqual([e["ply"] for e in report], list(range(6)))
+        for entry in report:
+            self.assertEqual(entry["player"], 1 + entry["ply"] % 2)
+            self.assertGreaterEqual(entry["best_value"], entry["played_value"])
+        self.assertIn("blunders", analysis.report_as_text(report))
+
+    def test_flags(self):
+        """ Walking into a forced loss instead of a forced win is flagged """
+        # after (0, 0), (0, 2), player 1 wins with (1, 2) and loses with (2, 1)
+        report = analysis.analyze([(0, 0), (0, 2), (2, 1)], 3, 3, start=2, depth=6)
+        self.assertEqual(len(report), 1)
+        entry = report[0]
+        self.assertEqual((entry["best_move"], entry["best_value"]), ((1, 2), float("inf")))
+        self.assertEqual(entry["played_value"], float("-inf"))
+        self.assertEqual(entry["flag"], "missed win")
+
+    def test_workers_agree(self):
+        serial = analysis.analyze(self.moves, 3, 3, depth=3, score_fn=improved_score)
+        parallel = analysis.analyze(self.moves, 3, 3, depth=3, score_fn=improved_score,
+                                    workers=2)
+        self.assertEqual(serial, parallel)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+"""
+Play many games concurrently in one asyncio event loop.
+
+`play_games` runs `Board.play_async` for a list of boards at once, so while
+one engine thinks the loop serves the other games. With agents that are
+external engines (`engine.AsyncEnginePlayer`) the work happens in the
+engine processes and a single Python process keeps dozens of games going;
+time limits are enforced by cancelling the move that overruns.
+
+    python arena.py "A=python engine.py --agent custom" \
+        "B=python engine.py --agent greedy" --games 100 --concurrency 16
+
+plays A against B with alternating colours from random openings, one pair
+of engine processes per concurrent game.
+"""
+
+import argparse
+import asyncio
+import random
+import shlex
+
+from isolation import Board
+from isolation import TimeControl
+from engine import AsyncEnginePlayer
+
+TIME_LIMIT = 150
+
+
+async def play_games(boards, concurrency=None, time_limit=TIME_LIMIT, time_control=None):
+    """
+    Play every board to the end concurrently.
+
+    Parameters
+    ----------
+    boards : list<`isolation.Board`>
+        Games ready to start; a player object may only take part in one
+        game at a time if it keeps per-game state (like an engine process).
+
+    concurrency : int (optional)
+        Largest number of games in progress at once; all of them if None.
+
+    time_limit, time_control : (optional)
+        Passed on to `Board.play_async`.
+
+    Returns
+    ----------
+    list<(player, list, str, list<float>)>
+        The winner, move history, termination and move times of every game,
+        in the order of `boards`.
+    """
+    slots = asyncio.Semaphore(concurrency or max(len(boards), 1))
+
+    async def play(game):
+        async with slots:
+            move_times = []
+            winner, history, termination = await game.play_async(time_limit, move_times,
+                                                                  time_control)
+            return winner, history, termination, move_times
+
+    return await asyncio.gather(*(play(game) for game in boards))
+
+
+async def match(commands, games, concurrency, time_control, seed=None):
+    """
+    Play `games` games between two engines with alternating colours, each of
+    `concurrency` workers running its own pair of engine processes; return
+    the number of wins of each engine and the number of timeouts.
+    """
+    rng = random.Random(seed)
+    openings = []
+    for _ in range(games):
+        game = Board("player 1", "player 2")
+        first = rng.choice(game.get_legal_moves())
+        game.apply_move(first)
+        openings.append((first, rng.choice(game.get_legal_moves())))
+
+    jobs = asyncio.Queue()
+    for k in range(games):
+        jobs.put_nowait(k)
+    wins = [0, 0]
+    timeouts = [0]
+
+    async def worker():
+        players = [AsyncEnginePlayer(command) for command in commands]
+        try:
+            while not jobs.empty():
+                k = jobs.get_nowait()
+                # (re)start the engines outside the clock
+                for player in players:
+                    await player.start()
+                seats = players if k % 2 == 0 else players[::-1]
+                game = Board(*seats)
+                for move in openings[k]:
+                    game.apply_move(move)
+                winner, _, termination = await game.play_async(time_control=time_control)
+                wins[players.index(winner)] += 1
+                timeouts[0] += termination == "timeout"
+        finally:
+            for player in players:
+                await player.close()
+
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, games))))
+    return wins, timeouts[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play engines against each other concurrently.")
+    parser.add_argument("engines", nargs=2, metavar="NAME=COMMAND")
+    parser.add_argument("--games", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=8,
+                        help="games in progress at once (default: %(default)s)")
+    parser.add_argument("--time-limit", type=float, default=TIME_LIMIT, metavar="MS",
+                        help="milliseconds per move (default: %(default)s)")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    names, commands = zip(*(spec.partition("=")[::2] for spec in args.engines))
+    wins, timeouts = asyncio.run(match([shlex.split(c) for c in commands], args.games,
+                                       args.concurrency, TimeControl(move_millis=args.time_limit),
+                                       args.seed))
+    for name, won in zip(names, wins):
+        print("{!s:<15}{:>6} wins".format(name, won))
+    print("{} timeouts".format(timeouts))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Tests for the asyncio game loop and concurrent games
+"""
+
+import asyncio
+import timeit
+import unittest
+
+import isolation
+import arena
+
+from engine import AsyncEnginePlayer
+from engine_test import ENGINE
+from sample_players import GreedyPlayer
+from sample_players import RandomPlayer
+
+
+class SleepyAsyncPlayer(RandomPlayer):
+    """ Coroutine player waiting a fixed time before every move """
+
+    def __init__(self, millis):
+        self.millis = millis
+
+    async def get_move(self, game, legal_moves, time_left):
+        await asyncio.sleep(self.millis / 1000.)
+        return super(SleepyAsyncPlayer, self).get_move(game, legal_moves, time_left)
+
+
+def opened(player_1, player_2):
+    game = isolation.Board(player_1, player_2)
+    game.apply_move((3, 3))
+    game.apply_move((2, 5))
+    return game
+
+
+class PlayAsyncTest(unittest.TestCase):
+
+    def test_same_as_play(self):
+        """ Synchronous players play the same game as with Board.play """
+        greedy_1, greedy_2 = GreedyPlayer(), GreedyPlayer()
+        expected = opened(greedy_1, greedy_2).play(time_limit=1000)
+        result = asyncio.run(opened(greedy_1, greedy_2).play_async(time_limit=1000))
+        self.assertEqual(result, expected)
+
+    def test_cancelled_on_timeout(self):
+        sleepy, other = SleepyAsyncPlayer(5000), RandomPlayer()
+        move_times = []
+        start = timeit.default_timer()
+        winner, history, termination = asyncio.run(
+            opened(sleepy, other).play_async(time_limit=50, move_times=move_times))
+        self.assertLess(timeit.default_timer() - start, 1.)
+        self.assertEqual((winner, termination), (other, "timeout"))
+        self.assertEqual(history, [[None]])
+        self.assertGreaterEqual(move_times[0], 50.)
+
+    def test_concurrent_games(self):
+        """ Waiting players of many games share the event loop """
+        boards = [opened(SleepyAsyncPlayer(20), SleepyAsyncPlayer(20)) for _ in range(20)]
+        start = timeit.default_timer()
+        results = asyncio.run(arena.play_games(boards, time_limit=1000))
+        elapsed = timeit.default_timer() - start
+        self.assertEqual(len(results), 20)
+        plies = max(sum(len(turn) for turn in history) for _, history, _, _ in results)
+        # one game's worth of sleeping, not twenty
+        self.assertLess(elapsed, 0.02 * plies * 4)
+        for (winner, _, termination, move_times), game in zip(results, boards):
+            self.assertIn(winner, (game.__player_1__, game.__player_2__))
+            self.assertEqual(termination, "illegal move")
+            self.assertTrue(all(t >= 20. for t in move_times[:-1]))
+
+    def test_async_engine(self):
+        command = ENGINE + ["--agent", "greedy", "--score", "open_move_score", "--name", "greedy"]
+
+        async def play():
+            engine = AsyncEnginePlayer(command)
+            await engine.start()
+            try:
+                opponent = RandomPlayer()
+                result = await opened(engine, opponent).play_async(time_limit=1000)
+                return engine, opponent, result
+            finally:
+                await engine.close()
+
+        engine, opponent, (winner, _, termination) = asyncio.run(play())
+        self.assertIn(winner, (engine, opponent))
+        self.assertEqual(termination, "illegal move")
+        self.assertEqual(engine.name, "greedy")
+        self.assertEqual(engine.timeouts, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
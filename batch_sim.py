@@ -0,0 +1,189 @@
+"""
+Lockstep simulator playing thousands of games between cheap agents at once.
+
+`simulate` keeps the boards of a whole batch of games in NumPy arrays and
+advances every game by one ply per step: move generation is a product with
+the knight adjacency matrix, a random choice is an argmax over random keys
+restricted to the legal cells, and a greedy choice scores every cell of every
+board with the same array operations. Games that are over stay in the arrays
+but stop changing.
+
+The agents behave like their counterparts in `sample_players`:
+
+    "random"           RandomPlayer
+    "greedy"           GreedyPlayer(open_move_score)
+    "greedy:improved"  GreedyPlayer(improved_score)
+    "greedy:null"      GreedyPlayer(null_score)
+
+Greedy agents break ties like `GreedyPlayer` (the largest (row, col) among
+the best moves), so from the same opening a greedy-vs-greedy game has the
+same winner and length as with `Board.play`. There is no clock; every game
+ends with the loser having no legal move ("illegal move" termination).
+
+    python batch_sim.py --games 100000 --player1 greedy --player2 random
+"""
+
+import argparse
+import timeit
+
+from collections import namedtuple
+
+import numpy as np
+
+from learning import adjacency
+
+AGENTS = ["random", "greedy", "greedy:open", "greedy:improved", "greedy:null"]
+
+Outcome = namedtuple("Outcome", ["winner", "plies", "termination", "moves"])
+
+
+def _legal(open_cells, loc, adj):
+    """ Legal cells of the players at `loc` (-1: not placed) on each board. """
+    placed = loc >= 0
+    legal = open_cells.copy()
+    legal[placed] &= adj[loc[placed]] > 0
+    return legal
+
+
+def _greedy_keys(open_cells, own_loc, opp_loc, adj, score):
+    """
+    Rank every cell of every board for a greedy mover: the heuristic value of
+    the position after moving there (np.inf if the opponent is then out of
+    moves), with the cell index breaking ties like tuple comparison of moves.
+    """
+    cells = open_cells.shape[1]
+    counts = open_cells.astype(float).dot(adj)
+    # moves of the mover from each candidate cell; the candidate itself is
+    # never a knight move away from itself, so blocking it changes nothing
+    own = counts
+    # moves of the opponent once the candidate cell is blocked
+    opp_placed = opp_loc >= 0
+    opp = np.empty_like(counts)
+    opp_adj = adj[opp_loc[opp_placed]]
+    opp[opp_placed] = (opp_adj * open_cells[opp_placed]).sum(axis=1)[:, None] - opp_adj
+    opp[~opp_placed] = open_cells[~opp_placed].sum(axis=1)[:, None] - 1.
+
+    if score == "improved":
+        value = own - opp
+    elif score == "null":
+        value = np.zeros_like(own)
+    else:
+        value = own
+    value[opp == 0] = np.inf
+
+    # values are bounded by the number of cells, so this keeps the order of
+    # (value, cell) pairs while fitting the winning moves in one float
+    big = 2. * cells + 2.
+    value = np.where(np.isinf(value), big, value)
+    return value * (cells + 1) + np.arange(cells)
+
+
+def simulate(games, player_1="random", player_2="random", width=7, height=7,
+             opening_plies=0, seed=None):
+    """
+    Play a batch of games in lockstep.
+
+    Parameters
+    ----------
+    games : int
+        Number of games to play.
+
+    player_1, player_2 : str
+        Agent names from AGENTS.
+
+    width, height : int (optional)
+        Board size.
+
+    opening_plies : int (optional)
+        Number of initial plies played at random for both agents, like the
+        random opening of `tournament.play_match`.
+
+    seed : int (optional)
+        Seed of the random generator.
+
+    Returns
+    ----------
+    Outcome
+        Arrays with one entry per game: `winner` (1 or 2), `plies` (the
+        number of moves made), `termination` ("illegal move") and `moves`
+        (games x max plies cell indices `row * width + col`, -1 after the
+        end of the game).
+    """
+    for agent in (player_1, player_2):
+        if agent not in AGENTS:
+            raise ValueError("Unknown agent: {}".format(agent))
+    rng = np.random.default_rng(seed)
+    cells = width * height
+    adj = adjacency(width, height)
+    rows = np.arange(games)
+
+    open_cells = np.ones((games, cells), dtype=bool)
+    loc = np.full((2, games), -1, dtype=np.int64)
+    alive = np.ones(games, dtype=bool)
+    winner = np.zeros(games, dtype=np.int8)
+    plies = np.zeros(games, dtype=np.int64)
+    moves = []
+
+    ply = 0
+    while alive.any():
+        side = ply % 2
+        legal = _legal(open_cells, loc[side], adj) & alive[:, None]
+        stuck = alive & ~legal.any(axis=1)
+        winner[stuck] = 2 - side
+        alive &= ~stuck
+        if not alive.any():
+            break
+
+        agent = (player_1, player_2)[side]
+        if agent == "random" or ply < opening_plies:
+            keys = rng.random((games, cells))
+        else:
+            keys = _greedy_keys(open_cells, loc[side], loc[1 - side], adj,
+                                agent.partition(":")[2] or "open")
+        keys = np.where(legal, keys, -np.inf)
+        move = np.where(alive, keys.argmax(axis=1), -1)
+
+        live = rows[alive]
+        open_cells[live, move[alive]] = False
+        loc[side, alive] = move[alive]
+        plies[alive] += 1
+        moves.append(move)
+        ply += 1
+
+    moves = np.array(moves, dtype=np.int16).T if moves else np.zeros((games, 0), dtype=np.int16)
+    return Outcome(winner, plies, np.full(games, "illegal move"), moves)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play batches of games between cheap agents.")
+    parser.add_argument("--games", type=int, default=10000)
+    parser.add_argument("--batch", type=int, default=10000, help="games simulated at once")
+    parser.add_argument("--player1", choices=AGENTS, default="random")
+    parser.add_argument("--player2", choices=AGENTS, default="random")
+    parser.add_argument("--width", type=int, default=7)
+    parser.add_argument("--height", type=int, default=7)
+    parser.add_argument("--opening", type=int, default=0, metavar="PLIES",
+                        help="random plies before the agents take over")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    wins = np.zeros(2)
+    total_plies = 0
+    start = timeit.default_timer()
+    for first in range(0, args.games, args.batch):
+        outcome = simulate(min(args.batch, args.games - first), args.player1, args.player2,
+                           args.width, args.height, args.opening,
+                           int(rng.integers(2 ** 31)))
+        wins += np.bincount(outcome.winner, minlength=3)[1:]
+        total_plies += outcome.plies.sum()
+    elapsed = timeit.default_timer() - start
+
+    print("player 1 ({}) wins: {:.2f}%".format(args.player1, 100. * wins[0] / args.games))
+    print("player 2 ({}) wins: {:.2f}%".format(args.player2, 100. * wins[1] / args.games))
+    print("average plies: {:.1f}".format(total_plies / args.games))
+    print("{:.0f} games/s".format(args.games / elapsed))
+
+
+if __name__ == "__main__":
+    main()
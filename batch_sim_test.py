@@ -0,0 +1,43 @@
+"""
+Tests for the lockstep batched game simulator
+"""
+
+import unittest
+
+import isolation
+import batch_sim
+
+from sample_players import GreedyPlayer
+from sample_players import improved_score
+
+
+class SimulateTest(unittest.TestCase):
+
+    def test_greedy_matches_board_play(self):
+        """ Greedy games have the same outcome as with Board.play """
+        outcome = batch_sim.simulate(30, "greedy:improved", "greedy", opening_plies=2, seed=1)
+        for g in range(30):
+            player_1, player_2 = GreedyPlayer(improved_score), GreedyPlayer()
+            game = isolation.Board(player_1, player_2)
+            for cell in outcome.moves[g, :2]:
+                game.apply_move(divmod(int(cell), game.width))
+            winner, _, termination = game.play(time_limit=float("inf"))
+            self.assertEqual(outcome.winner[g], 1 if winner is player_1 else 2)
+            self.assertEqual(outcome.plies[g], game.move_count)
+            self.assertEqual(outcome.termination[g], termination)
+
+    def test_random_games_are_legal(self):
+        outcome = batch_sim.simulate(50, width=5, height=6, seed=2)
+        for g in range(50):
+            game = isolation.Board("p1", "p2", width=5, height=6)
+            for cell in outcome.moves[g, :outcome.plies[g]]:
+                move = divmod(int(cell), 5)
+                self.assertIn(move, game.get_legal_moves())
+                game.apply_move(move)
+            self.assertFalse(game.get_legal_moves())
+            self.assertEqual(outcome.winner[g], 2 if game.active_player == "p1" else 1)
+            self.assertTrue((outcome.moves[g, outcome.plies[g]:] == -1).all())
+
+
+if __name__ == '__main__':
+    unittest.main()
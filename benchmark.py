@@ -0,0 +1,289 @@
+"""
+Performance benchmarks for the board operations and the search.
+
+Every benchmark runs a fixed operation over a fixed corpus of positions
+(boards at several stages of the game, played with moves drawn from a
+seeded generator) and reports the best time per operation over a few
+repeats:
+
+    copy, forecast_move, get_legal_moves, get_legal_moves_not_moved (the
+    full-board first move), apply_move, utility, to_string, and alphabeta
+    (fixed-depth `CustomPlayer.alphabeta` searches, per node)
+
+`--sizes` repeats the benchmarks on larger square boards (results named
+e.g. "copy@15x15") to show how each operation scales with the board, and
+`--board` benchmarks another implementation such as `isolation:BitBoard`:
+
+    python benchmark.py --board isolation:BitBoard --sizes 7 10 15
+
+Results are written as JSON. Given a baseline file from an earlier run on
+the same machine, the benchmarks that became slower by more than
+`threshold` are reported and the script exits with status 1:
+
+    python benchmark.py --save-baseline bench_baseline.json
+    ... change the code ...
+    python benchmark.py --baseline bench_baseline.json --threshold 0.1
+"""
+
+import argparse
+import json
+import platform
+import random
+import sys
+import timeit
+
+from collections import Counter
+
+from isolation import Board
+from game_agent import CustomPlayer
+from perft import load_class
+from sample_players import improved_score
+
+STAGES = [1, 2, 6, 12, 18, 24]
+POSITIONS_PER_STAGE = 4
+SEARCH_DEPTH = 4
+
+
+def corpus(width=7, height=7, stages=STAGES, count=POSITIONS_PER_STAGE, seed=0):
+    """
+    Return the move sequences of the benchmark positions: `count` games
+    after each number of plies in `stages`, played with moves drawn from a
+    seeded generator. Games that end early are replaced, so every position
+    has a legal move.
+    """
+    rng = random.Random(seed)
+    sequences = []
+    for plies in stages:
+        found = 0
+        while found < count:
+            game = Board("player 1", "player 2", width=width, height=height)
+            moves = []
+            for _ in range(plies):
+                legal = sorted(game.get_legal_moves())
+                if not legal:
+                    break
+                moves.append(legal[rng.randrange(len(legal))])
+                game.apply_move(moves[-1])
+            if len(moves) == plies and game.get_legal_moves():
+                sequences.append(moves)
+                found += 1
+    return sequences
+
+
+def build(moves, player_1="player 1", player_2="player 2", width=7, height=7,
+          board_class=Board):
+    """ Play a move sequence from the corpus on a new board. """
+    game = board_class(player_1, player_2, width=width, height=height)
+    for move in moves:
+        game.apply_move(move)
+    return game
+
+
+def _bench_copy(boards, number):
+    start = timeit.default_timer()
+    for _ in range(number):
+        for game in boards:
+            game.copy()
+    return timeit.default_timer() - start, number * len(boards)
+
+
+def _bench_forecast_move(boards, number):
+    moves = [game.get_legal_moves() for game in boards]
+    start = timeit.default_timer()
+    for _ in range(number):
+        for game, legal in zip(boards, moves):
+            for move in legal:
+                game.forecast_move(move)
+    return timeit.default_timer() - start, number * sum(len(legal) for legal in moves)
+
+
+def _bench_get_legal_moves(boards, number):
+    start = timeit.default_timer()
+    for _ in range(number):
+        for game in boards:
+            game.get_legal_moves()
+            game.get_legal_moves(game.inactive_player)
+    return timeit.default_timer() - start, 2 * number * len(boards)
+
+
+def _bench_get_legal_moves_not_moved(boards, number):
+    game = boards[0].__class__("player 1", "player 2", width=boards[0].width,
+                               height=boards[0].height)
+    start = timeit.default_timer()
+    for _ in range(number * len(boards)):
+        game.get_legal_moves()
+    return timeit.default_timer() - start, number * len(boards)
+
+
+def _bench_apply_move(boards, number):
+    copies = [(game.copy(), game.get_legal_moves()[0]) for _ in range(number) for game in boards]
+    start = timeit.default_timer()
+    for game, move in copies:
+        game.apply_move(move)
+    return timeit.default_timer() - start, len(copies)
+
+
+def _bench_utility(boards, number):
+    start = timeit.default_timer()
+    for _ in range(number):
+        for game in boards:
+            game.utility(game.active_player)
+    return timeit.default_timer() - start, number * len(boards)
+
+
+def _bench_to_string(boards, number):
+    start = timeit.default_timer()
+    for _ in range(number):
+        for game in boards:
+            game.to_string()
+    return timeit.default_timer() - start, number * len(boards)
+
+
+BENCHMARKS = [("copy", _bench_copy),
+              ("forecast_move", _bench_forecast_move),
+              ("get_legal_moves", _bench_get_legal_moves),
+              ("get_legal_moves_not_moved", _bench_get_legal_moves_not_moved),
+              ("apply_move", _bench_apply_move),
+              ("utility", _bench_utility),
+              ("to_string", _bench_to_string)]
+
+
+def bench_alphabeta(sequences, depth=SEARCH_DEPTH, width=7, height=7, board_class=Board,
+                    counts=None):
+    """
+    Search every position of the corpus to a fixed depth; return the elapsed
+    time and the number of nodes. If `counts` (a Counter) is given, the
+    boards are instrumented and the board operations and evaluations of the
+    searches are added to it.
+    """
+    elapsed = 0.
+    nodes = 0
+    for moves in sequences:
+        player = CustomPlayer(search_depth=depth, score_fn=improved_score, iterative=False,
+                              method='alphabeta')
+        player.time_left = lambda: float("inf")
+        seats = (player, "opponent") if len(moves) % 2 == 0 else ("opponent", player)
+        game = build(moves, *seats, width=width, height=height, board_class=board_class)
+        if counts is not None:
+            instrumentation = game.instrument()
+        start = timeit.default_timer()
+        player.alphabeta(game, depth)
+        elapsed += timeit.default_timer() - start
+        nodes += player.nodes
+        if counts is not None:
+            counts.update(instrumentation.counts)
+    return elapsed, nodes
+
+
+def run(number=50, repeats=15, depth=SEARCH_DEPTH, width=7, height=7, board_class=Board):
+    """
+    Run every benchmark and return {name: {"us_per_op": ..., "ops": ...}},
+    keeping the best of `repeats` runs. Board operations are repeated
+    `number` times over the corpus; the search runs once per repeat, and
+    one more time on instrumented boards to add the number of calls to each
+    board operation per search node under "calls".
+    """
+    sequences = corpus(width, height)
+    boards = [build(moves, width=width, height=height, board_class=board_class)
+              for moves in sequences]
+    results = {}
+    timings = [(name, lambda fn=fn: fn(boards, number)) for name, fn in BENCHMARKS]
+    timings.append(("alphabeta", lambda: bench_alphabeta(sequences, depth, width, height,
+                                                         board_class)))
+    for name, fn in timings:
+        best = None
+        for _ in range(repeats):
+            elapsed, ops = fn()
+            if best is None or elapsed / ops < best[0] / best[1]:
+                best = (elapsed, ops)
+        results[name] = {"us_per_op": round(1e6 * best[0] / best[1], 4), "ops": best[1]}
+    counts = Counter()
+    _, nodes = bench_alphabeta(sequences, depth, width, height, board_class, counts)
+    results["alphabeta"]["calls"] = {event: round(count / float(nodes), 3)
+                                     for event, count in sorted(counts.items())}
+    return results
+
+
+def scaling(sizes, number=50, repeats=15, depth=SEARCH_DEPTH, board_class=Board):
+    """
+    Run the benchmarks on square boards of every size; return the results of
+    all sizes in one dict, named "<benchmark>@<size>x<size>" except on 7x7.
+    """
+    results = {}
+    for size in sizes:
+        suffix = "" if size == 7 else "@{0}x{0}".format(size)
+        for name, result in run(number, repeats, depth, size, size, board_class).items():
+            results[name + suffix] = result
+    return results
+
+
+def compare(results, baseline, threshold=0.1):
+    """
+    Return (name, baseline us/op, current us/op) for every benchmark more
+    than `threshold` (a fraction) slower than in the baseline.
+    """
+    regressions = []
+    for name, result in sorted(results.items()):
+        if name not in baseline:
+            continue
+        before, now = baseline[name]["us_per_op"], result["us_per_op"]
+        if now > before * (1. + threshold):
+            regressions.append((name, before, now))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the board operations and search.")
+    parser.add_argument("--number", type=int, default=50,
+                        help="repetitions of each board operation over the corpus")
+    parser.add_argument("--repeats", type=int, default=15,
+                        help="keep the best of this many runs; many short runs filter out " +
+                             "noise from other processes best (default: %(default)s)")
+    parser.add_argument("--depth", type=int, default=SEARCH_DEPTH, help="alpha-beta search depth")
+    parser.add_argument("--board", default="isolation:Board", metavar="MODULE:CLASS",
+                        help="board implementation to benchmark (default: %(default)s)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[7], metavar="N",
+                        help="benchmark on N x N boards (default: 7)")
+    parser.add_argument("--output", default="benchmark.json", help="where to write the results")
+    parser.add_argument("--baseline", help="compare with the results in this file")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="fail if an operation is slower than the baseline by more than " +
+                             "this fraction (default: %(default)s)")
+    parser.add_argument("--save-baseline", metavar="PATH",
+                        help="also write the results to this baseline file")
+    args = parser.parse_args()
+
+    # read before writing: --output may be the baseline file itself
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+
+    results = scaling(args.sizes, args.number, args.repeats, args.depth, load_class(args.board))
+    report = {"python": platform.python_version(),
+              "machine": platform.machine(),
+              "board": args.board,
+              "results": results}
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, "w") as f:
+            json.dump(report, f, indent=1)
+
+    for name, result in sorted(results.items()):
+        line = "{:<34}{:>10.3f} us/op".format(name, result["us_per_op"])
+        if name in baseline:
+            line += "{:>+9.1f}%".format(100. * (result["us_per_op"] / baseline[name]["us_per_op"] - 1.))
+        print(line)
+
+    for name in sorted(name for name in results if name.startswith("alphabeta")):
+        print("{} calls per node: ".format(name) + ", ".join(
+            "{} {}".format(event, count) for event, count in sorted(results[name]["calls"].items())))
+
+    regressions = compare(results, baseline, args.threshold)
+    for name, before, now in regressions:
+        print("REGRESSION {}: {:.3f} -> {:.3f} us/op".format(name, before, now))
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
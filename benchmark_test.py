@@ -0,0 +1,64 @@
+"""
+Tests for the benchmark suite
+"""
+
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from unittest import mock
+
+import benchmark
+
+
+class BenchmarkTest(unittest.TestCase):
+
+    def test_corpus_is_fixed(self):
+        self.assertEqual(benchmark.corpus(), benchmark.corpus())
+        self.assertEqual(len(benchmark.corpus()),
+                         len(benchmark.STAGES) * benchmark.POSITIONS_PER_STAGE)
+
+    def test_run(self):
+        results = benchmark.run(number=1, repeats=1, depth=2)
+        self.assertEqual(set(results),
+                         set(name for name, _ in benchmark.BENCHMARKS) | {"alphabeta"})
+        for result in results.values():
+            self.assertGreater(result["ops"], 0)
+        calls = results["alphabeta"]["calls"]
+        self.assertGreater(calls["score"], 0.)
+        self.assertEqual(calls["forecast_move"], calls["copy"])
+
+    def test_compare(self):
+        baseline = {"copy": {"us_per_op": 10.}, "utility": {"us_per_op": 2.}}
+        results = {"copy": {"us_per_op": 10.5}, "utility": {"us_per_op": 3.},
+                   "to_string": {"us_per_op": 1.}}
+        self.assertEqual(benchmark.compare(results, baseline, 0.1), [("utility", 2., 3.)])
+
+    def test_baseline_is_output(self):
+        """ A baseline overwritten by --output is read before the run """
+        tmp = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmp, "benchmark.json")
+            names = [name for name, _ in benchmark.BENCHMARKS]
+            with open(path, "w") as f:
+                json.dump({"results": {name: {"us_per_op": 1e-6} for name in names}}, f)
+            argv = ["benchmark.py", "--number", "1", "--repeats", "1", "--depth", "1",
+                    "--output", path, "--baseline", path]
+            with mock.patch.object(sys, "argv", argv), \
+                    contextlib.redirect_stdout(io.StringIO()) as out:
+                with self.assertRaises(SystemExit):
+                    benchmark.main()
+            self.assertIn("REGRESSION", out.getvalue())
+            with open(path) as f:
+                self.assertGreater(json.load(f)["results"]["copy"]["us_per_op"], 1e-6)
+        finally:
+            shutil.rmtree(tmp)
+
+
+if __name__ == '__main__':
+    unittest.main()
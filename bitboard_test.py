@@ -0,0 +1,213 @@
+"""
+Tests for the bitmask flood fill and the territory heuristic
+"""
+
+import random
+import unittest
+
+import fuzz
+import isolation
+import perft
+import scoring
+
+from isolation import bitboard
+
+
+def bfs_layers(game, player):
+    """ Reference distance layers built with the Board API only. """
+    location = game.get_player_location(player)
+    if location is None:
+        return [set(game.get_blank_spaces())] if game.get_blank_spaces() else []
+
+    directions = bitboard.KNIGHT_DIRECTIONS
+    seen = {location}
+    frontier = {location}
+    layers = []
+    while True:
+        nxt = set()
+        for r, c in frontier:
+            for dr, dc in directions:
+                move = (r + dr, c + dc)
+                if move not in seen and game.move_is_legal(move):
+                    nxt.add(move)
+        if not nxt:
+            return layers
+        layers.append(nxt)
+        seen |= nxt
+        frontier = nxt
+
+
+def random_game(width, height, plies, seed):
+    rng = random.Random(seed)
+    game = isolation.Board("p1", "p2", width, height)
+    for _ in range(plies):
+        moves = game.get_legal_moves()
+        if not moves:
+            break
+        game.apply_move(rng.choice(moves))
+    return game
+
+
+class BitboardTest(unittest.TestCase):
+
+    def test_knight_attacks_matches_legal_moves(self):
+        """ Single cell attack masks agree with Board.get_legal_moves """
+        for width, height in [(7, 7), (5, 9), (11, 4)]:
+            game = isolation.Board("p1", "p2", width, height)
+            for r in range(height):
+                for c in range(width):
+                    game.__last_player_move__["p1"] = (r, c)
+                    bits = bitboard.knight_attacks(1 << bitboard.cell_index((r, c), width),
+                                                   width, height)
+                    self.assertEqual(set(bitboard.iter_cells(bits, width)),
+                                     set(game.get_legal_moves("p1")))
+
+    def test_distance_layers(self):
+        """ Flood fill layers agree with a breadth first search """
+        for seed in range(30):
+            width, height = 7 + seed % 3, 7 - seed % 2
+            game = random_game(width, height, seed % 12, seed)
+            own, opp = bitboard.distance_layers(game, game.active_player)
+            expected_own = bfs_layers(game, game.active_player)
+            expected_opp = bfs_layers(game, game.inactive_player)
+            self.assertEqual([set(bitboard.iter_cells(l, width)) for l in own], expected_own)
+            self.assertEqual([set(bitboard.iter_cells(l, width)) for l in opp], expected_opp)
+
+    def test_voronoi(self):
+        """
+        | 1 |   |   |
+        |   | 2 |   |
+        |   |   |   |
+
+        A knight in the centre of a 3x3 board can't move, so player 1 owns
+        the seven remaining open cells.
+        """
+        game = isolation.Board("p1", "p2", 3, 3)
+        game.apply_move((0, 0))
+        game.apply_move((1, 1))
+        self.assertEqual(bitboard.territory(game, "p1"), (7, 0))
+        self.assertEqual(scoring.voronoi(game, "p1"), 7.)
+        self.assertEqual(scoring.voronoi(game, "p2"), -7.)
+
+    def test_voronoi_contested(self):
+        """
+        |   |   |   |
+        | 1 |   |   |
+        |   |   | 2 |
+
+        Both players walk the same knight tour around the edge in opposite
+        directions, each reaching three cells first.
+        """
+        game = isolation.Board("p1", "p2", 3, 3)
+        game.apply_move((1, 0))
+        game.apply_move((2, 2))
+        self.assertEqual(bitboard.territory(game, "p1"), (3, 3))
+        self.assertEqual(scoring.voronoi(game, "p1"), 0.)
+
+    def test_encode_state(self):
+        """ Decoding an encoded state gives back the same board """
+        for seed in range(10):
+            game = random_game(7, 6 + seed % 3, seed, seed)
+            decoded = bitboard.decode_state(bitboard.encode_state(game), "p1", "p2")
+            self.assertEqual(decoded.to_string(), game.to_string())
+            self.assertEqual(decoded.active_player, game.active_player)
+            self.assertEqual(decoded.move_count, game.move_count)
+            self.assertEqual(decoded.get_legal_moves(), game.get_legal_moves())
+
+    def test_to_bytes(self):
+        """ Fixed-size encoding that both board classes decode alike """
+        game = isolation.Board("p1", "p2")
+        self.assertEqual(game.to_bytes(), b"\x00" * 7 + b"\xff\xff\x00")
+        game.apply_move((0, 1))
+        self.assertEqual(game.to_bytes(), b"\x02" + b"\x00" * 6 + b"\x01\xff\x01")
+        for seed in range(10):
+            width, height = 7 + seed, 6 + seed % 3
+            game = random_game(width, height, seed, seed)
+            data = game.to_bytes()
+            self.assertEqual(len(data), isolation.Board.record_size(width, height))
+            for board_class in (isolation.Board, isolation.BitBoard):
+                decoded = board_class.from_bytes(data, "p1", "p2", width, height)
+                self.assertIsInstance(decoded, board_class)
+                self.assertEqual(decoded.to_bytes(), data)
+                self.assertEqual(bitboard.encode_state(decoded), bitboard.encode_state(game))
+        with self.assertRaises(ValueError):
+            isolation.Board.from_bytes(data, "p1", "p2")
+
+    def test_large_board_bytes(self):
+        """ Two bytes per location once the cells don't fit in one """
+        game = isolation.BitBoard("p1", "p2", 16, 16)
+        game.apply_move((15, 15))
+        self.assertEqual(isolation.Board.record_size(16, 16), 32 + 4 + 1)
+        self.assertEqual(game.to_bytes()[32:], b"\xff\x00\xff\xff\x01")
+
+    def test_pack_boards(self):
+        import numpy as np
+
+        games = [random_game(7, 7, plies, plies) for plies in range(12)]
+        buffer = bitboard.pack_boards(games)
+        rows = np.frombuffer(buffer, np.uint8).reshape(len(games), -1)
+        self.assertEqual(rows.shape, (12, isolation.Board.record_size()))
+        for source, expected in ((buffer, games), (rows, games), (rows[::2].copy(), games[::2])):
+            decoded = bitboard.unpack_boards(source, "p1", "p2", board_class=isolation.BitBoard)
+            self.assertEqual([g.to_string() for g in decoded], [g.to_string() for g in expected])
+        with self.assertRaises(ValueError):
+            bitboard.unpack_boards(buffer[:-1], "p1", "p2")
+        with self.assertRaises(ValueError):
+            bitboard.pack_boards(games + [isolation.Board("p1", "p2", 5, 5)])
+
+
+class BitBoardTest(unittest.TestCase):
+
+    def test_fuzz(self):
+        """ Same observations as Board, moves in the same order """
+        sizes = fuzz.SIZES + [(13, 11)]
+        self.assertEqual(fuzz.fuzz(isolation.BitBoard, games=60, sizes=sizes, seed=0), [])
+
+    def test_perft(self):
+        self.assertEqual(perft.check(isolation.BitBoard, max_depth=4), [])
+
+    def test_copy_is_independent(self):
+        game = isolation.BitBoard("p1", "p2", 15, 15)
+        game.apply_move((7, 7))
+        child = game.forecast_move((0, 14))
+        self.assertIsInstance(child, isolation.BitBoard)
+        self.assertTrue(game.move_is_legal((0, 14)))
+        self.assertFalse(child.move_is_legal((0, 14)))
+        self.assertIsNone(game.get_player_location("p2"))
+        self.assertEqual(child.get_player_location("p2"), (0, 14))
+
+    def test_board_state(self):
+        """ The rows are rebuilt from the bitmask and can be assigned """
+        reference = random_game(9, 8, 20, 3)
+        game = isolation.BitBoard("p1", "p2", 9, 8)
+        game.__last_player_move__ = dict(reference.__last_player_move__)
+        game.__board_state__ = reference.__board_state__
+        self.assertEqual(game.get_blank_spaces(), reference.get_blank_spaces())
+        self.assertEqual([[cell != 0 for cell in row] for row in game.__board_state__],
+                         [[cell != 0 for cell in row] for row in reference.__board_state__])
+
+    def test_decode_state(self):
+        game = random_game(11, 10, 15, 4)
+        decoded = bitboard.decode_state(bitboard.encode_state(game), "p1", "p2",
+                                        isolation.BitBoard)
+        self.assertIsInstance(decoded, isolation.BitBoard)
+        self.assertEqual(decoded.to_string(), game.to_string())
+        self.assertEqual(bitboard.to_bits(decoded), bitboard.to_bits(game))
+
+    def test_large_board_opening(self):
+        """ Placements on a 15x15 board are searched among central cells """
+        from game_agent import CustomPlayer
+        from sample_players import improved_score
+
+        player = CustomPlayer(search_depth=2, score_fn=improved_score, iterative=False,
+                              method='minimax', opening_moves=9)
+        game = isolation.BitBoard(player, "opponent", 15, 15)
+        instrumentation = game.instrument()
+        move = player.get_move(game, game.get_legal_moves(), lambda: 1000.)
+        self.assertIn(move, [(r, c) for r in range(6, 9) for c in range(6, 9)])
+        # 9 placements, each answered by 9 placements
+        self.assertEqual(instrumentation.counts["score"], 81)
+
+
+if __name__ == '__main__':
+    unittest.main()
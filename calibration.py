@@ -0,0 +1,128 @@
+"""
+Measure the search speed of this machine and scale time limits to match.
+
+`tournament.py` gives every agent TIME_LIMIT milliseconds per move, which
+buys a different number of search nodes on every computer; the
+`ID_Improved` agent only lets results be compared after the fact. Instead,
+`calibrate` runs a fixed search workload (fixed-depth alpha-beta
+`CustomPlayer` searches from a fixed set of positions), counts the nodes
+visited per second and compares the speed with REFERENCE_NPS, measured on
+the machine the time limits were tuned on. Time limits multiplied by the
+resulting `scale` give every machine the same effective node budget.
+
+    python calibration.py
+"""
+
+import argparse
+import platform
+import random
+import socket
+import timeit
+
+from isolation import Board
+from isolation import TimeControl
+from isolation.bitboard import decode_state
+from isolation.bitboard import encode_state
+from game_agent import CustomPlayer
+from sample_players import improved_score
+
+# nodes per second of the reference machine on the default workload
+REFERENCE_NPS = 21000.
+
+NUM_POSITIONS = 6
+OPENING_PLIES = 6
+SEARCH_DEPTH = 6
+
+
+def positions(count=NUM_POSITIONS, plies=OPENING_PLIES, seed=0):
+    """
+    Return the fixed calibration positions: 7x7 boards after `plies` random
+    moves drawn from a seeded generator, so every machine searches the same
+    trees.
+    """
+    rng = random.Random(seed)
+    boards = []
+    while len(boards) < count:
+        game = Board("player 1", "player 2")
+        for _ in range(plies):
+            moves = game.get_legal_moves()
+            if not moves:
+                break
+            game.apply_move(sorted(moves)[rng.randrange(len(moves))])
+        if game.get_legal_moves():
+            boards.append(game)
+    return boards
+
+
+def measure_nps(boards=None, depth=SEARCH_DEPTH, repeats=5):
+    """
+    Search every board to a fixed depth and return the nodes visited per
+    second, keeping the fastest of `repeats` runs to filter out noise from
+    other processes.
+    """
+    boards = boards or positions()
+    best = 0.
+    for _ in range(repeats):
+        nodes = 0
+        elapsed = 0.
+        for board in boards:
+            player = CustomPlayer(search_depth=depth, score_fn=improved_score,
+                                  iterative=False, method='alphabeta')
+            state = encode_state(board)
+            seats = (player, "opponent") if state[5] else ("opponent", player)
+            game = decode_state(state, *seats)
+
+            start = timeit.default_timer()
+            player.get_move(game, game.get_legal_moves(), lambda: float("inf"))
+            elapsed += timeit.default_timer() - start
+            nodes += player.nodes
+        best = max(best, nodes / elapsed)
+    return best
+
+
+def calibrate(reference_nps=REFERENCE_NPS, **kwargs):
+    """
+    Measure this machine and describe the result.
+
+    Returns
+    ----------
+    dict
+        `nps` measured here, `reference_nps`, `scale` (the factor to apply
+        to time limits), `host`, `processor` and `python`; suitable for a
+        JSON log.
+    """
+    nps = measure_nps(**kwargs)
+    return {"nps": round(nps),
+            "reference_nps": reference_nps,
+            "scale": round(reference_nps / nps, 4),
+            "host": socket.gethostname(),
+            "processor": platform.processor() or platform.machine(),
+            "python": platform.python_version()}
+
+
+def scale_time_control(time_control, calibration):
+    """ Return a copy of `time_control` with every budget scaled. """
+    if calibration is None:
+        return time_control
+    scale = calibration["scale"]
+    base = time_control.base_millis
+    return TimeControl(move_millis=time_control.move_millis * scale,
+                       base_millis=None if base is None else base * scale,
+                       increment_millis=time_control.increment_millis * scale,
+                       clock=time_control.clock)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure search speed and time limit scale.")
+    parser.add_argument("--depth", type=int, default=SEARCH_DEPTH)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    result = calibrate(depth=args.depth, repeats=args.repeats)
+    print("Nodes per second: {}".format(result["nps"]))
+    print("Reference:        {:.0f}".format(result["reference_nps"]))
+    print("Time limit scale: {}".format(result["scale"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+Tests for the hardware calibration benchmark
+"""
+
+import unittest
+
+import calibration
+import tournament
+
+from isolation import TimeControl
+from sample_players import RandomPlayer
+
+
+class CalibrationTest(unittest.TestCase):
+
+    def test_positions_are_fixed(self):
+        first = [b.to_string() for b in calibration.positions()]
+        second = [b.to_string() for b in calibration.positions()]
+        self.assertEqual(first, second)
+        self.assertEqual(len(first), calibration.NUM_POSITIONS)
+
+    def test_calibrate(self):
+        result = calibration.calibrate(reference_nps=1000., depth=2, repeats=1)
+        self.assertGreater(result["nps"], 0)
+        self.assertAlmostEqual(result["scale"], 1000. / result["nps"], places=3)
+
+    def test_scale_time_control(self):
+        scaled = calibration.scale_time_control(
+            TimeControl(move_millis=100, base_millis=1000, increment_millis=10, clock="process"),
+            {"scale": 2.})
+        self.assertEqual((scaled.move_millis, scaled.base_millis, scaled.increment_millis),
+                         (200, 2000, 20))
+        self.assertEqual(scaled.clock, "process")
+
+    def test_recorded_with_games(self):
+        agents = [tournament.Agent(RandomPlayer(), "A"), tournament.Agent(RandomPlayer(), "B")]
+        job = tournament._match_jobs(agents[0], agents[1], 0, 0, 1, 1, None, {"scale": 1.5})[0]
+        _, _, _, _, records = tournament._play_match_job(job)
+        self.assertEqual([r["calibration"] for r in records], [{"scale": 1.5}] * 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
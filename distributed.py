@@ -0,0 +1,285 @@
+"""
+A job queue shared by a tournament coordinator and any number of workers.
+
+The queue is a SQLite database. The coordinator inserts one row per job
+(a pickled `tournament._match_jobs` entry) and polls for results; workers
+claim pending jobs, send heartbeats while they play, and store the pickled
+result. A job whose worker stops sending heartbeats for longer than the
+lease is handed to the next worker that asks for work, so a crashed or
+killed worker only costs the games it was playing. A job that raises is
+stored as failed with its traceback, and so is a job whose workers kept
+dying on it `max_attempts` times; `JobQueue.map` raises `JobFailed` for
+both instead of waiting forever.
+
+Workers on other machines need the same code and a path to the database
+on a filesystem with working POSIX locks; on one machine, start as many
+local workers as there are cores:
+
+    python tournament.py --queue games.db &                 # coordinator
+    python tournament.py --worker --queue games.db &        # worker(s)
+"""
+
+import multiprocessing
+import os
+import pickle
+import socket
+import sqlite3
+import threading
+import time
+import traceback
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    key TEXT UNIQUE NOT NULL,
+    payload BLOB NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    heartbeat REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result BLOB,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, heartbeat);
+"""
+
+
+class JobFailed(RuntimeError):
+    """ Raised by `JobQueue.map` for a job that failed. """
+
+
+def worker_name():
+    """ Identify this worker process across the farm. """
+    return "{}:{}".format(socket.gethostname(), os.getpid())
+
+
+class JobQueue():
+    """SQLite-backed job queue with leases.
+
+    Parameters
+    ----------
+    path : str
+        Database file, created if needed.
+
+    lease : float (optional)
+        Seconds without a heartbeat after which a running job is considered
+        abandoned and may be claimed by another worker.
+
+    max_attempts : int (optional)
+        Number of claims after which an abandoned job is marked as failed
+        instead of being handed out again.
+    """
+
+    def __init__(self, path, lease=30., max_attempts=3):
+        self.path = path
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.db = sqlite3.connect(path, timeout=60., isolation_level=None,
+                                  check_same_thread=False)
+        self.lock = threading.Lock()
+        self.db.executescript(SCHEMA)
+        # queues created before jobs could fail
+        if "error" not in [row[1] for row in self.db.execute("PRAGMA table_info(jobs)")]:
+            self.db.execute("ALTER TABLE jobs ADD COLUMN error TEXT")
+
+    def _transaction(self, fn):
+        with self.lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                value = fn(self.db)
+            except Exception:
+                self.db.execute("ROLLBACK")
+                raise
+            self.db.execute("COMMIT")
+            return value
+
+    def put(self, key, job):
+        """ Add a job unless a job with the same key exists already. """
+        self._transaction(lambda db: db.execute(
+            "INSERT OR IGNORE INTO jobs (key, payload) VALUES (?, ?)",
+            (key, pickle.dumps(job))))
+
+    def claim(self, worker):
+        """
+        Reserve the next pending or abandoned job for `worker`. Abandoned
+        jobs that were claimed `max_attempts` times already are marked as
+        failed instead.
+
+        Returns
+        ----------
+        (int, object) or None
+            The job id and the unpickled job, or None if there is no work.
+        """
+        def claim(db):
+            now = time.time()
+            db.execute(
+                "UPDATE jobs SET status = 'failed', error = 'abandoned after ' || attempts || "
+                "' attempts' WHERE status = 'running' AND heartbeat < ? AND attempts >= ?",
+                (now - self.lease, self.max_attempts))
+            row = db.execute(
+                "SELECT id, payload FROM jobs WHERE status = 'pending' "
+                "OR (status = 'running' AND heartbeat < ?) ORDER BY id LIMIT 1",
+                (now - self.lease,)).fetchone()
+            if row is None:
+                return None
+            db.execute("UPDATE jobs SET status = 'running', worker = ?, heartbeat = ?, "
+                       "attempts = attempts + 1 WHERE id = ?", (worker, now, row[0]))
+            return row[0], pickle.loads(row[1])
+        return self._transaction(claim)
+
+    def heartbeat(self, job_id, worker):
+        """ Extend the lease of a running job; False if it was reassigned. """
+        cursor = self._transaction(lambda db: db.execute(
+            "UPDATE jobs SET heartbeat = ? WHERE id = ? AND worker = ? AND status = 'running'",
+            (time.time(), job_id, worker)))
+        return cursor.rowcount == 1
+
+    def complete(self, job_id, worker, result):
+        """
+        Store the result of a job. The first result wins: a worker that lost
+        its lease but finished anyway only fills in a job nobody completed.
+        """
+        self._transaction(lambda db: db.execute(
+            "UPDATE jobs SET status = 'done', worker = ?, result = ? "
+            "WHERE id = ? AND status != 'done'", (worker, pickle.dumps(result), job_id)))
+
+    def fail(self, job_id, worker, error):
+        """ Mark a job held by `worker` as failed with an error message. """
+        self._transaction(lambda db: db.execute(
+            "UPDATE jobs SET status = 'failed', error = ? "
+            "WHERE id = ? AND worker = ? AND status = 'running'", (error, job_id, worker)))
+
+    def result(self, key):
+        """ The unpickled result of the job `key`, or None if not done. """
+        with self.lock:
+            row = self.db.execute("SELECT result FROM jobs WHERE key = ? AND status = 'done'",
+                                  (key,)).fetchone()
+        return None if row is None else pickle.loads(row[0])
+
+    def failure(self, key):
+        """ The error message of the job `key`, or None if it didn't fail. """
+        with self.lock:
+            row = self.db.execute("SELECT error FROM jobs WHERE key = ? AND status = 'failed'",
+                                  (key,)).fetchone()
+        return None if row is None else row[0]
+
+    def counts(self):
+        """ Number of jobs per status. """
+        with self.lock:
+            return dict(self.db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status"))
+
+    def map(self, jobs, key, poll=0.5):
+        """
+        Enqueue `jobs` and yield their results as workers complete them, in
+        completion order. `key` maps a job to its unique key; jobs whose key
+        is already done (e.g. from an earlier, interrupted run) are yielded
+        without being played again. Raises `JobFailed` as soon as one of the
+        jobs is found to have failed.
+        """
+        pending = {}
+        for job in jobs:
+            self.put(key(job), job)
+            pending[key(job)] = job
+        while pending:
+            for k in list(pending):
+                result = self.result(k)
+                if result is not None:
+                    del pending[k]
+                    yield result
+                    continue
+                error = self.failure(k)
+                if error is not None:
+                    raise JobFailed("Job {} failed:\n{}".format(k, error))
+            if pending:
+                time.sleep(poll)
+
+    def close(self):
+        self.db.close()
+
+
+def _run_job(conn, fn, job):
+    """ Body of the process running a job: send back (True, result) or
+    (False, traceback). """
+    try:
+        outcome = True, fn(job)
+    except BaseException:
+        outcome = False, traceback.format_exc()
+    conn.send(outcome)
+    conn.close()
+
+
+def work(job_queue, fn, worker=None, max_idle=None, poll=1.):
+    """
+    Worker loop: claim jobs from `job_queue`, run `fn(job)` in a child
+    process while keeping the lease alive, and store the result. A job that
+    raises is stored as failed with its traceback; a job whose lease is
+    lost (it was handed to another worker) is stopped by killing its
+    process.
+
+    Parameters
+    ----------
+    job_queue : JobQueue
+        The shared queue.
+
+    fn : callable
+        Computes the result of a job; it must be picklable where processes
+        are not forked.
+
+    worker : str (optional)
+        Name of this worker; defaults to host:pid.
+
+    max_idle : float (optional)
+        Exit after this many seconds without work; run forever if None.
+
+    poll : float (optional)
+        Seconds between attempts to claim work when the queue is empty.
+
+    Returns
+    ----------
+    int
+        The number of jobs completed.
+    """
+    worker = worker or worker_name()
+    ctx = multiprocessing.get_context()
+    done = 0
+    idle_since = time.time()
+    while True:
+        claimed = job_queue.claim(worker)
+        if claimed is None:
+            if max_idle is not None and time.time() - idle_since > max_idle:
+                return done
+            time.sleep(poll)
+            continue
+
+        job_id, job = claimed
+        receiver, sender = ctx.Pipe(duplex=False)
+        # not daemonic: jobs may start processes of their own
+        process = ctx.Process(target=_run_job, args=(sender, fn, job))
+        process.start()
+        sender.close()
+        outcome = None
+        try:
+            while not receiver.poll(job_queue.lease / 3.):
+                if not job_queue.heartbeat(job_id, worker):
+                    break
+            else:
+                try:
+                    outcome = receiver.recv()
+                except EOFError:
+                    process.join()
+                    outcome = False, "job process exited with code {}".format(process.exitcode)
+        finally:
+            # the lease was lost (or this worker is interrupted): stop the job
+            if outcome is None and process.is_alive():
+                process.kill()
+            process.join()
+            receiver.close()
+
+        if outcome is not None:
+            ok, value = outcome
+            if ok:
+                job_queue.complete(job_id, worker, value)
+                done += 1
+            else:
+                job_queue.fail(job_id, worker, value)
+        idle_since = time.time()
@@ -0,0 +1,153 @@
+"""
+Tests for the distributed tournament job queue
+"""
+
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+import distributed
+import tournament
+
+from sample_players import RandomPlayer
+
+
+def _square(job):
+    return job * job
+
+
+def _fail_on_odd(job):
+    if job % 2:
+        raise ValueError("odd job {}".format(job))
+    return job
+
+
+def _sleep(job):
+    time.sleep(job)
+    return job
+
+
+def _run_worker(path, name):
+    distributed.work(distributed.JobQueue(path, lease=1.), _square, worker=name,
+                     max_idle=1., poll=0.05)
+
+
+class JobQueueTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "queue.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_claim_complete(self):
+        queue = distributed.JobQueue(self.path)
+        queue.put("a", 3)
+        queue.put("a", 4)  # duplicate keys are ignored
+        job_id, job = queue.claim("w1")
+        self.assertEqual(job, 3)
+        self.assertIsNone(queue.claim("w2"))
+        self.assertIsNone(queue.result("a"))
+        queue.complete(job_id, "w1", 9)
+        self.assertEqual(queue.result("a"), 9)
+        self.assertEqual(queue.counts(), {"done": 1})
+        queue.close()
+
+    def test_reassign_after_lease(self):
+        """ A job without heartbeats goes to another worker """
+        queue = distributed.JobQueue(self.path, lease=0.1)
+        queue.put("a", 3)
+        job_id, _ = queue.claim("dead")
+        self.assertIsNone(queue.claim("w2"))
+        time.sleep(0.2)
+        self.assertEqual(queue.claim("w2"), (job_id, 3))
+        self.assertFalse(queue.heartbeat(job_id, "dead"))
+        self.assertTrue(queue.heartbeat(job_id, "w2"))
+        queue.complete(job_id, "w2", 9)
+        queue.complete(job_id, "dead", 10)  # the first result wins
+        self.assertEqual(queue.result("a"), 9)
+        queue.close()
+
+    def test_failed_jobs(self):
+        """ A job that raises is stored with its traceback and stops map() """
+        queue = distributed.JobQueue(self.path)
+        for i in range(3):
+            queue.put(str(i), i)
+        self.assertEqual(distributed.work(queue, _fail_on_odd, max_idle=0., poll=0.), 2)
+        self.assertEqual(queue.counts(), {"done": 2, "failed": 1})
+        self.assertIn("ValueError: odd job 1", queue.failure("1"))
+        self.assertIsNone(queue.failure("0"))
+        with self.assertRaises(distributed.JobFailed):
+            list(queue.map(range(3), str, poll=0.))
+        queue.close()
+
+    def test_max_attempts(self):
+        """ A job abandoned too many times is marked as failed """
+        queue = distributed.JobQueue(self.path, lease=0.05, max_attempts=2)
+        queue.put("a", 3)
+        for worker in ("dead 1", "dead 2"):
+            self.assertIsNotNone(queue.claim(worker))
+            time.sleep(0.1)
+        self.assertIsNone(queue.claim("w"))
+        self.assertEqual(queue.counts(), {"failed": 1})
+        self.assertEqual(queue.failure("a"), "abandoned after 2 attempts")
+        queue.close()
+
+    def test_lost_lease_stops_job(self):
+        queue = distributed.JobQueue(self.path, lease=0.3)
+        queue.put("a", 30)
+        thread = threading.Thread(target=distributed.work, args=(queue, _sleep),
+                                  kwargs={"worker": "w1", "max_idle": 0., "poll": 0.})
+        start = time.time()
+        thread.start()
+        thief = distributed.JobQueue(self.path, lease=0.3)
+        while thief.counts() != {"running": 1}:
+            time.sleep(0.01)
+        thief.db.execute("UPDATE jobs SET worker = 'w2'")
+        thread.join(10.)
+        self.assertFalse(thread.is_alive())
+        self.assertLess(time.time() - start, 10.)
+        self.assertEqual(thief.counts(), {"running": 1})
+        thief.close()
+        queue.close()
+
+    def test_local_workers(self):
+        """ Several worker processes drain the queue, one of them killed """
+        queue = distributed.JobQueue(self.path, lease=1.)
+        for i in range(5):
+            queue.put(str(i), i)
+        # a worker that claimed a job and died
+        queue.claim("killed")
+
+        ctx = multiprocessing.get_context("spawn")
+        workers = [ctx.Process(target=_run_worker, args=(self.path, "w{}".format(i)))
+                   for i in range(2)]
+        for w in workers:
+            w.start()
+        results = sorted(queue.map(range(5), str, poll=0.05))
+        for w in workers:
+            w.join()
+        self.assertEqual(results, [0, 1, 4, 9, 16])
+        queue.close()
+
+    def test_play_round(self):
+        """ play_round returns the same tally through the queue """
+        queue = distributed.JobQueue(self.path)
+        agents = [tournament.Agent(RandomPlayer(), "A"), tournament.Agent(RandomPlayer(), "B")]
+        jobs = tournament._match_jobs(agents[1], agents[0], 0, 0, 2, 7, None)
+        for job in jobs:
+            queue.put("7:" + job[2], job)
+        distributed.work(queue, tournament._play_match_job, max_idle=0., poll=0.)
+        self.assertEqual(queue.counts(), {"done": 4})
+        ratio = tournament.play_round(agents, 2, seed=7, queue=queue)
+        self.assertTrue(0. <= ratio <= 100.)
+        queue.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,494 @@
+"""
+Line-based engine protocol for Isolation agents, in the spirit of UCI.
+
+An engine is a subprocess reading commands on stdin and writing replies on
+stdout, one per line:
+
+    isolation                   -> id name <name>
+                                   isolationok
+    isready                     -> readyok
+    newgame
+    position <W>x<H> <blocked> <p1> <p2> <side>
+        <blocked> is the hexadecimal mask of blocked cells (bit
+        row * W + col), <p1>/<p2> the players' cells as `row,col` or `-` if
+        they haven't moved yet, and <side> the player to move (1 or 2).
+    go movetime <ms>            -> info depth <d> nodes <n> score <s>  (zero or more)
+                                   bestmove <row>,<col>  (or bestmove none)
+    stop                           end the current search now
+    quit
+
+Run an agent as an engine with, for example:
+
+    python engine.py --agent custom --method alphabeta --score improved_score
+
+`EnginePlayer` is the other side of the protocol: it starts an engine
+command once and keeps it warm across moves and games, and it can be used
+anywhere a player is expected (`Board.play`, `tournament.py --engine`).
+`AsyncEnginePlayer` talks to the engine with asyncio instead of a reader
+thread, for `Board.play_async` and `arena.py`, which run many games in one
+event loop.
+"""
+
+import argparse
+import asyncio
+import os
+import queue
+import subprocess
+import sys
+import threading
+import timeit
+
+from isolation import TIMED_OUT
+from isolation.bitboard import decode_state
+from isolation.bitboard import encode_state
+from isolation.bitboard import index_cell
+from isolation.bitboard import popcount
+from remote import Opponent
+
+
+def format_move(move):
+    """ Render a move as `row,col`, or `none` for no move. """
+    if move is None or tuple(move) == (-1, -1):
+        return "none"
+    return "{},{}".format(*move)
+
+
+def parse_move(text):
+    """ Parse the output of `format_move`. """
+    if text == "none":
+        return (-1, -1)
+    row, col = text.split(",")
+    return (int(row), int(col))
+
+
+def format_position(game):
+    """ Render the arguments of the `position` command for a board. """
+    width, height, blocked, loc_1, loc_2, p1_active, _ = encode_state(game)
+    cells = ["-" if loc < 0 else format_move(index_cell(loc, width)) for loc in (loc_1, loc_2)]
+    return "{}x{} {:x} {} {} {}".format(width, height, blocked, cells[0], cells[1],
+                                        1 if p1_active else 2)
+
+
+def parse_position(args, player, opponent):
+    """
+    Build a board from the arguments of the `position` command, with
+    `player` registered in the seat of the side to move.
+    """
+    size, blocked, p1, p2, side = args
+    width, height = [int(v) for v in size.split("x")]
+    blocked = int(blocked, 16)
+    locations = [-1 if loc == "-" else (lambda m: m[0] * width + m[1])(parse_move(loc))
+                 for loc in (p1, p2)]
+    p1_active = side == "1"
+    players = (player, opponent) if p1_active else (opponent, player)
+    state = (width, height, blocked, locations[0], locations[1], p1_active, popcount(blocked))
+    return decode_state(state, *players)
+
+
+class Engine():
+    """Serve an agent over the engine protocol.
+
+    Parameters
+    ----------
+    player : object
+        The agent answering `go` commands. If it has an `info` attribute
+        (like `CustomPlayer`) it is used to emit `info` lines.
+
+    name : str
+        Reported in reply to the `isolation` command.
+
+    out : file (optional)
+        Where replies are written.
+    """
+
+    def __init__(self, player, name, out=sys.stdout):
+        self.player = player
+        self.name = name
+        self.out = out
+        self.lock = threading.Lock()
+        self.game = None
+        self.search = None
+        self.stopped = threading.Event()
+
+    def send(self, line):
+        with self.lock:
+            self.out.write(line + "\n")
+            self.out.flush()
+
+    def _go(self, movetime):
+        start = 1000 * timeit.default_timer()
+        time_left = lambda: 0. if self.stopped.is_set() else \
+            movetime - (1000 * timeit.default_timer() - start)
+        if hasattr(self.player, "info"):
+            self.player.info = lambda depth, nodes, score: self.send(
+                "info depth {} nodes {} score {}".format(depth, nodes, score))
+        move = self.player.get_move(self.game, self.game.get_legal_moves(), time_left)
+        self.send("bestmove " + format_move(move))
+
+    def wait(self):
+        """ Block until the current search (if any) has sent its bestmove. """
+        if self.search is not None:
+            self.search.join()
+            self.search = None
+
+    def handle(self, line):
+        """ Execute one command; return False when the engine should exit. """
+        tokens = line.split()
+        if not tokens:
+            return True
+        command, args = tokens[0], tokens[1:]
+
+        if command == "isolation":
+            self.send("id name " + self.name)
+            self.send("isolationok")
+        elif command == "isready":
+            self.wait()
+            self.send("readyok")
+        elif command == "newgame":
+            self.wait()
+            self.game = None
+        elif command == "position":
+            self.wait()
+            self.game = parse_position(args, self.player, Opponent())
+        elif command == "go":
+            self.wait()
+            movetime = float(args[args.index("movetime") + 1]) if "movetime" in args else float("inf")
+            self.stopped.clear()
+            self.search = threading.Thread(target=self._go, args=(movetime,))
+            self.search.start()
+        elif command == "stop":
+            self.stopped.set()
+            self.wait()
+        elif command == "quit":
+            self.stopped.set()
+            self.wait()
+            return False
+        return True
+
+    def run(self, stream=sys.stdin):
+        """ Read commands until `quit` or the end of the stream. """
+        for line in stream:
+            if not self.handle(line):
+                return
+        self.stopped.set()
+        self.wait()
+
+
+class EngineError(Exception):
+    """The engine process did not follow the protocol."""
+    pass
+
+
+class EnginePlayer():
+    """Player backed by an engine subprocess.
+
+    Parameters
+    ----------
+    command : list<str>
+        The command starting the engine, e.g.
+        ["python", "engine.py", "--agent", "random"].
+
+    margin : float (optional)
+        Milliseconds kept from the turn's budget for sending the command and
+        reading the answer.
+
+    cpu : int (optional)
+        Pin the engine process to this CPU (Linux only).
+
+    startup : float (optional)
+        Seconds to wait for the engine handshake.
+    """
+
+    def __init__(self, command, margin=10., cpu=None, startup=10.):
+        self.command = list(command)
+        self.margin = margin
+        self.cpu = cpu
+        self.startup = startup
+        self.name = None
+        self.last_info = None
+        self.timeouts = 0
+        self.process = None
+        self.lines = None
+
+    def __getstate__(self):
+        """ The engine process belongs to the process that started it. """
+        state = self.__dict__.copy()
+        state['process'] = None
+        state['lines'] = None
+        return state
+
+    def start(self):
+        """ Start the engine and perform the handshake if it isn't running. """
+        if self.process is not None and self.process.poll() is None:
+            return
+        self.process = subprocess.Popen(self.command, stdin=subprocess.PIPE,
+                                        stdout=subprocess.PIPE, universal_newlines=True,
+                                        bufsize=1)
+        if self.cpu is not None and hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(self.process.pid, {self.cpu})
+
+        # a reader thread lets us wait for replies with a deadline
+        self.lines = queue.Queue()
+
+        def read(stdout, lines):
+            for line in stdout:
+                lines.put(line.strip())
+            lines.put(None)
+
+        threading.Thread(target=read, args=(self.process.stdout, self.lines), daemon=True).start()
+
+        self.send("isolation")
+        while True:
+            line = self.readline(self.startup)
+            if line is None:
+                self.kill()
+                raise EngineError("No handshake from engine {}".format(self.command))
+            if line.startswith("id name "):
+                self.name = line[len("id name "):]
+            if line == "isolationok":
+                return
+
+    def send(self, line):
+        self.process.stdin.write(line + "\n")
+        self.process.stdin.flush()
+
+    def readline(self, timeout):
+        """ Next line from the engine, or None on timeout or exit. """
+        try:
+            return self.lines.get(timeout=max(timeout, 0.))
+        except queue.Empty:
+            return None
+
+    def kill(self):
+        """ Terminate the engine process. """
+        if self.process is not None:
+            self.process.kill()
+            self.process.wait()
+        self.process = None
+
+    def close(self):
+        """ Ask the engine to quit, killing it if it doesn't. """
+        if self.process is None:
+            return
+        try:
+            self.send("quit")
+            self.process.wait(1.)
+        except (OSError, subprocess.TimeoutExpired):
+            pass
+        self.kill()
+
+    def get_move(self, game, legal_moves, time_left):
+        """Ask the engine for a move within the time left.
+
+        Parameters
+        ----------
+        game : `isolation.Board`
+            An instance of `isolation.Board` encoding the current state of the
+            game (e.g., player locations and blocked cells).
+
+        legal_moves : list<(int, int)>
+            A list containing legal moves. Moves are encoded as tuples of pairs
+            of ints defining the next (row, col) for the agent to occupy.
+
+        time_left : callable
+            A function that returns the number of milliseconds left in the
+            current turn. Returning with any less than 0 ms remaining forfeits
+            the game.
+
+        Returns
+        ----------
+        (int, int)
+            The engine's bestmove, or `isolation.TIMED_OUT` if it didn't
+            answer in time (the engine is then restarted on the next move).
+        """
+        self.start()
+        self.send("position " + format_position(game))
+        self.send("go movetime {:.0f}".format(max(time_left() - self.margin, 0.)))
+
+        stopped = False
+        while True:
+            line = self.readline(time_left() / 1000.)
+            if line is None:
+                if stopped or self.process.poll() is not None:
+                    break
+                # out of time: give the engine one last chance to answer
+                self.send("stop")
+                stopped = True
+                line = self.readline(self.margin / 1000.)
+                if line is None:
+                    break
+            if line.startswith("info "):
+                tokens = line.split()
+                self.last_info = dict(zip(tokens[1::2], tokens[2::2]))
+            elif line.startswith("bestmove "):
+                return parse_move(line.split()[1])
+
+        self.timeouts += 1
+        self.kill()
+        return TIMED_OUT
+
+    def __repr__(self):
+        return "EnginePlayer({!r})".format(self.name or self.command)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class AsyncEnginePlayer():
+    """Player backed by an engine subprocess, driven by asyncio.
+
+    Its get_move() is a coroutine (see `Board.play_async`), so the event
+    loop serves other games while the engine thinks. An engine process
+    plays one game at a time: use one instance per concurrent game.
+
+    Parameters
+    ----------
+    command : list<str>
+        The command starting the engine.
+
+    margin : float (optional)
+        Milliseconds kept from the turn's budget for sending the command and
+        reading the answer.
+
+    startup : float (optional)
+        Seconds to wait for the engine handshake.
+    """
+
+    def __init__(self, command, margin=10., startup=10.):
+        self.command = list(command)
+        self.margin = margin
+        self.startup = startup
+        self.name = None
+        self.last_info = None
+        self.timeouts = 0
+        self.process = None
+
+    async def start(self):
+        """ Start the engine and perform the handshake if it isn't running. """
+        if self.process is not None and self.process.returncode is None:
+            return
+        self.process = await asyncio.create_subprocess_exec(
+            *self.command, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        self.send("isolation")
+        while True:
+            line = await self.readline(self.startup)
+            if line is None:
+                await self.kill()
+                raise EngineError("No handshake from engine {}".format(self.command))
+            if line.startswith("id name "):
+                self.name = line[len("id name "):]
+            if line == "isolationok":
+                return
+
+    def send(self, line):
+        self.process.stdin.write((line + "\n").encode())
+
+    async def readline(self, timeout):
+        """ Next line from the engine, or None on timeout or exit. """
+        try:
+            line = await asyncio.wait_for(self.process.stdout.readline(), max(timeout, 0.))
+        except asyncio.TimeoutError:
+            return None
+        return line.decode().strip() if line else None
+
+    async def kill(self):
+        """ Terminate the engine process. """
+        if self.process is not None:
+            if self.process.returncode is None:
+                self.process.kill()
+            await self.process.wait()
+        self.process = None
+
+    async def close(self):
+        """ Ask the engine to quit, killing it if it doesn't. """
+        if self.process is None:
+            return
+        try:
+            self.send("quit")
+            await asyncio.wait_for(self.process.wait(), 1.)
+        except (OSError, asyncio.TimeoutError):
+            pass
+        await self.kill()
+
+    async def get_move(self, game, legal_moves, time_left):
+        """
+        Ask the engine for a move within the time left; see
+        `EnginePlayer.get_move`. If the game cancels the move, the engine is
+        killed and restarted on the next move.
+        """
+        await self.start()
+        try:
+            self.send("position " + format_position(game))
+            self.send("go movetime {:.0f}".format(max(time_left() - self.margin, 0.)))
+
+            stopped = False
+            while True:
+                line = await self.readline(time_left() / 1000.)
+                if line is None:
+                    if stopped or self.process.returncode is not None:
+                        break
+                    # out of time: give the engine one last chance to answer
+                    self.send("stop")
+                    stopped = True
+                    line = await self.readline(self.margin / 1000.)
+                    if line is None:
+                        break
+                if line.startswith("info "):
+                    tokens = line.split()
+                    self.last_info = dict(zip(tokens[1::2], tokens[2::2]))
+                elif line.startswith("bestmove "):
+                    return parse_move(line.split()[1])
+        except asyncio.CancelledError:
+            self.timeouts += 1
+            await self.kill()
+            raise
+
+        self.timeouts += 1
+        await self.kill()
+        return TIMED_OUT
+
+    def __repr__(self):
+        return "AsyncEnginePlayer({!r})".format(self.name or self.command)
+
+
+def make_player(args):
+    """ Build the agent described by the command line arguments. """
+    import game_agent
+    import sample_players
+    import scoring
+
+    if args.agent == "random":
+        return sample_players.RandomPlayer()
+
+    score_fn = None
+    for module in (sample_players, scoring, game_agent):
+        score_fn = score_fn or getattr(module, args.score, None)
+    if score_fn is None:
+        raise SystemExit("Unknown score function: " + args.score)
+
+    if args.agent == "greedy":
+        return sample_players.GreedyPlayer(score_fn=score_fn)
+    return game_agent.CustomPlayer(search_depth=args.depth, score_fn=score_fn,
+                                   iterative=not args.fixed_depth, method=args.method)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run an Isolation agent as an engine on stdin/stdout.")
+    parser.add_argument("--agent", choices=["custom", "greedy", "random"], default="custom")
+    parser.add_argument("--method", choices=["minimax", "alphabeta"], default="alphabeta")
+    parser.add_argument("--score", default="custom_score",
+                        help="heuristic from sample_players, scoring or game_agent")
+    parser.add_argument("--depth", type=int, default=3, help="search depth with --fixed-depth")
+    parser.add_argument("--fixed-depth", action="store_true",
+                        help="search to --depth instead of iterative deepening")
+    parser.add_argument("--name", help="name reported to the controller")
+    args = parser.parse_args()
+
+    Engine(make_player(args), args.name or args.agent).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Tests for the line-based engine protocol
+"""
+
+import io
+import multiprocessing
+import os
+import pickle
+import sys
+import unittest
+
+import isolation
+import game_agent
+import engine
+
+from sample_players import RandomPlayer
+from sample_players import improved_score
+from bitboard_test import random_game
+
+ENGINE = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "engine.py")]
+
+
+def play_jobs(jobs, pids):
+    """ Play pickled tournament jobs and send the pids of the engines used """
+    import tournament
+
+    for job in jobs:
+        tournament._play_match_job(pickle.loads(job))
+    pids.send(sorted(p.process.pid for p in tournament._ENGINES.values()))
+
+
+class EngineTest(unittest.TestCase):
+
+    def test_position_round_trip(self):
+        for seed in range(8):
+            game = random_game(7, 7, seed, seed)
+            player = game.active_player
+            decoded = engine.parse_position(engine.format_position(game).split(), player, "other")
+            self.assertEqual(decoded.to_string(), game.to_string())
+            self.assertEqual(decoded.get_legal_moves(), game.get_legal_moves())
+            self.assertEqual(decoded.active_player, player)
+
+    def test_engine_commands(self):
+        out = io.StringIO()
+        player = game_agent.CustomPlayer(score_fn=improved_score, method="alphabeta")
+        served = engine.Engine(player, "test", out)
+        commands = ["isolation", "isready", "newgame", "position 7x7 1 0,0 - 2",
+                    "go movetime 100", "isready", "quit"]
+        for command in commands:
+            served.handle(command)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(lines[:3], ["id name test", "isolationok", "readyok"])
+        self.assertTrue(lines[3].startswith("info depth 1 nodes "))
+        self.assertTrue(lines[-2].startswith("bestmove "))
+        self.assertEqual(lines[-1], "readyok")
+        # player 2 hasn't moved: any cell but player 1's is legal
+        self.assertNotEqual(lines[-2], "bestmove 0,0")
+
+    def test_engine_player(self):
+        """ An engine subprocess plays complete games as a regular player """
+        command = ENGINE + ["--agent", "greedy", "--score", "open_move_score", "--name", "greedy"]
+        with engine.EnginePlayer(command) as player:
+            for _ in range(2):
+                opponent = RandomPlayer()
+                game = isolation.Board(player, opponent)
+                winner, _, termination = game.play(time_limit=1000)
+                self.assertIn(winner, (player, opponent))
+                self.assertEqual(termination, "illegal move")
+            self.assertEqual(player.name, "greedy")
+            self.assertEqual(player.timeouts, 0)
+
+    def test_engine_timeout_with_cpu_clock(self):
+        """ A silent engine loses on time even when the game clock is CPU time """
+        silent = [sys.executable, "-c", "import sys\nfor line in sys.stdin:\n"
+                  "    if line.strip() == 'isolation': print('isolationok', flush=True)"]
+        with engine.EnginePlayer(silent, margin=10.) as player:
+            opponent = RandomPlayer()
+            game = isolation.Board(player, opponent)
+            winner, history, termination = game.play(
+                time_control=isolation.TimeControl(move_millis=100, clock="process"))
+            self.assertEqual((winner, termination), (opponent, "timeout"))
+            self.assertEqual(history, [[None]])
+            self.assertEqual(player.timeouts, 1)
+
+    def test_tournament_engine_per_worker(self):
+        """ Tournament jobs share one engine per agent and process, closed at exit """
+        import tournament
+
+        command = ENGINE + ["--agent", "greedy", "--score", "open_move_score"]
+        agents = [tournament.Agent(engine.EnginePlayer(command), "A"),
+                  tournament.Agent(RandomPlayer(), "B")]
+        jobs = [pickle.dumps(job) for job in
+                tournament._match_jobs(agents[0], agents[1], 0, 0, 2, 1, None)]
+        receiver, sender = multiprocessing.Pipe(duplex=False)
+        worker = multiprocessing.Process(target=play_jobs, args=(jobs, sender))
+        worker.start()
+        self.assertTrue(receiver.poll(60.))
+        pids = receiver.recv()
+        worker.join()
+        self.assertEqual(len(pids), 1)
+        self.assertFalse(os.path.exists("/proc/{}".format(pids[0])))
+        self.assertEqual(tournament._ENGINES, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
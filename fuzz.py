@@ -0,0 +1,212 @@
+"""
+Differential fuzzer for alternative `isolation.Board` implementations.
+
+Random games are played in lockstep on the reference `Board` and on every
+backend under test, on boards of random sizes. Before each ply the fuzzer
+compares what the two boards report:
+
+    get_legal_moves for both players, get_blank_spaces, utility,
+    is_winner and is_loser for both players, the active player, the move
+    count, the players' locations and to_string
+
+Moves and blank spaces must come in the same order as on the reference,
+since search results depend on the move order; with `ordered=False`
+(--unordered) they are compared as sets instead. A backend that raises an
+exception diverges too. Each divergence is shrunk to a short move sequence
+that still reproduces it, first by cutting the game at the first diverging
+ply, then by dropping single moves while the sequence stays legal.
+
+    python fuzz.py mymodule:FastBoard --games 2000 --seed 1
+
+Without arguments the backends in BACKENDS are fuzzed.
+"""
+
+import argparse
+import random
+import sys
+
+from isolation import Board
+from perft import load_class
+
+SIZES = [(3, 3), (4, 4), (5, 5), (7, 7), (8, 6), (6, 9), (10, 10), (15, 15)]
+
+PLAYERS = ("player 1", "player 2")
+
+# the board implementations shipped with the package
+BACKENDS = ["isolation:BitBoard"]
+
+
+def observe(game, ordered=True):
+    """
+    Return everything the fuzzer compares about a board, as a dict of plain
+    values (or the repr of the exception raised while computing one).
+    """
+    normalize = list if ordered else sorted
+    checks = [("legal_moves_1", lambda: normalize(game.get_legal_moves(PLAYERS[0]))),
+              ("legal_moves_2", lambda: normalize(game.get_legal_moves(PLAYERS[1]))),
+              ("blank_spaces", lambda: normalize(game.get_blank_spaces())),
+              ("utility_1", lambda: game.utility(PLAYERS[0])),
+              ("utility_2", lambda: game.utility(PLAYERS[1])),
+              ("is_winner_1", lambda: game.is_winner(PLAYERS[0])),
+              ("is_winner_2", lambda: game.is_winner(PLAYERS[1])),
+              ("is_loser_1", lambda: game.is_loser(PLAYERS[0])),
+              ("is_loser_2", lambda: game.is_loser(PLAYERS[1])),
+              ("active_player", lambda: game.active_player),
+              ("move_count", lambda: game.move_count),
+              ("location_1", lambda: game.get_player_location(PLAYERS[0])),
+              ("location_2", lambda: game.get_player_location(PLAYERS[1])),
+              ("to_string", lambda: game.to_string())]
+    observed = {}
+    for name, check in checks:
+        try:
+            observed[name] = check()
+        except Exception as e:
+            observed[name] = "raised {!r}".format(e)
+    return observed
+
+
+def first_divergence(backend, size, moves, ordered=True, rule=None):
+    """
+    Replay `moves` on the reference board and on `backend`; return
+    (ply, {check: (reference, backend)}) for the first ply at which they
+    disagree, or None. Ply k is the position after k moves.
+    """
+    options = {} if rule is None else {"rule": rule}
+    reference = Board(*PLAYERS, width=size[0], height=size[1], **options)
+    try:
+        other = backend(*PLAYERS, width=size[0], height=size[1], **options)
+    except Exception as e:
+        return 0, {"constructor": (None, "raised {!r}".format(e))}
+
+    for ply in range(len(moves) + 1):
+        expected = observe(reference, ordered)
+        observed = observe(other, ordered)
+        diff = {name: (expected[name], observed[name]) for name in expected
+                if expected[name] != observed[name]}
+        if diff:
+            return ply, diff
+        if ply == len(moves):
+            return None
+        reference.apply_move(moves[ply])
+        try:
+            other.apply_move(moves[ply])
+        except Exception as e:
+            return ply + 1, {"apply_move": (None, "raised {!r}".format(e))}
+
+
+def is_legal(size, moves, rule=None):
+    """ Test whether `moves` can be played in order from an empty board. """
+    game = Board(*PLAYERS, width=size[0], height=size[1], rule=rule)
+    for move in moves:
+        if move not in game.get_legal_moves():
+            return False
+        game.apply_move(move)
+    return True
+
+
+def shrink(backend, size, moves, ordered=True, rule=None):
+    """
+    Return a short legal move sequence on which `backend` still diverges
+    from the reference board.
+    """
+    ply, _ = first_divergence(backend, size, moves, ordered, rule)
+    moves = list(moves[:ply])
+    changed = True
+    while changed:
+        changed = False
+        for i in reversed(range(len(moves))):
+            candidate = moves[:i] + moves[i + 1:]
+            if not is_legal(size, candidate, rule):
+                continue
+            found = first_divergence(backend, size, candidate, ordered, rule)
+            if found is not None:
+                moves = candidate[:found[0]]
+                changed = True
+                break
+    return moves
+
+
+def random_game(size, rng, rule=None):
+    """ Play a random game on the reference board and return its moves. """
+    game = Board(*PLAYERS, width=size[0], height=size[1], rule=rule)
+    moves = []
+    while True:
+        legal = sorted(game.get_legal_moves())
+        if not legal:
+            return moves
+        moves.append(legal[rng.randrange(len(legal))])
+        game.apply_move(moves[-1])
+
+
+def fuzz(backend, games=100, sizes=SIZES, seed=None, ordered=True, rule=None):
+    """
+    Compare `backend` with the reference board on random games.
+
+    Parameters
+    ----------
+    backend : class
+        A board class with the constructor and methods of `isolation.Board`.
+
+    games : int (optional)
+        Number of random games.
+
+    sizes : list<(int, int)> (optional)
+        Board sizes (width, height) drawn for each game.
+
+    seed : int (optional)
+        Seed of the random games.
+
+    ordered : bool (optional)
+        Require moves and blank spaces in the same order as the reference;
+        compare them as sets if False.
+
+    rule : str or `isolation.rules.MoveRule` (optional)
+        Movement rule passed to both boards; the backend's default if None.
+
+    Returns
+    ----------
+    list<dict>
+        One entry per diverging game with its `size`, the shrunk `moves`,
+        the `ply` (number of moves) at which the boards disagree and the
+        differing checks in `diff`.
+    """
+    rng = random.Random(seed)
+    failures = []
+    for _ in range(games):
+        size = rng.choice(sizes)
+        moves = random_game(size, rng, rule)
+        if first_divergence(backend, size, moves, ordered, rule) is None:
+            continue
+        small = shrink(backend, size, moves, ordered, rule)
+        ply, diff = first_divergence(backend, size, small, ordered, rule)
+        failures.append({"size": size, "moves": small, "ply": ply, "diff": diff})
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare board backends with the reference Board.")
+    parser.add_argument("backends", nargs="*", default=BACKENDS, metavar="MODULE:CLASS",
+                        help="board classes to test (default: {})".format(" ".join(BACKENDS)))
+    parser.add_argument("--games", type=int, default=500)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--unordered", action="store_true",
+                        help="accept the moves in another order than the reference")
+    parser.add_argument("--rule", help="movement rule of both boards, e.g. queen (default: knight)")
+    args = parser.parse_args()
+
+    failed = False
+    for spec in args.backends:
+        failures = fuzz(load_class(spec), args.games, seed=args.seed, ordered=not args.unordered,
+                        rule=args.rule)
+        print("{}: {} of {} games diverged".format(spec, len(failures), args.games))
+        for failure in failures[:5]:
+            print("  {}x{} after {}:".format(failure["size"][0], failure["size"][1],
+                                            failure["moves"]))
+            for name, (expected, observed) in sorted(failure["diff"].items()):
+                print("    {}: expected {!r}, got {!r}".format(name, expected, observed))
+        failed = failed or bool(failures)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Tests for the differential board fuzzer
+"""
+
+import unittest
+
+import isolation
+import fuzz
+
+
+class EdgeBugBoard(isolation.Board):
+    """ Forgets knight moves onto the last row """
+
+    def get_legal_moves(self, player=None):
+        moves = super().get_legal_moves(player)
+        if self.get_player_location(player or self.active_player) is None:
+            return moves
+        return [m for m in moves if m[0] != self.height - 1]
+
+
+class ReversedBoard(isolation.Board):
+    """ Right moves, in reverse order """
+
+    def get_legal_moves(self, player=None):
+        return super().get_legal_moves(player)[::-1]
+
+
+class FuzzTest(unittest.TestCase):
+
+    def test_reference_agrees(self):
+        self.assertEqual(fuzz.fuzz(isolation.Board, games=20, seed=0), [])
+
+    def test_divergence_is_shrunk(self):
+        failures = fuzz.fuzz(EdgeBugBoard, games=10, sizes=[(5, 5), (7, 7)], seed=1)
+        self.assertTrue(failures)
+        for failure in failures:
+            # one move is enough to stand within a knight move of the last row
+            self.assertEqual(len(failure["moves"]), 1)
+            self.assertEqual(failure["ply"], 1)
+            self.assertIn("legal_moves_1", failure["diff"])
+
+    def test_move_order(self):
+        """ Moves in another order diverge unless compared as sets """
+        failures = fuzz.fuzz(ReversedBoard, games=5, seed=3)
+        self.assertEqual(len(failures), 5)
+        self.assertIn("legal_moves_1", failures[0]["diff"])
+        self.assertEqual(fuzz.fuzz(ReversedBoard, games=5, seed=3, ordered=False), [])
+
+    def test_exceptions_diverge(self):
+        class Broken(isolation.Board):
+            def to_string(self):
+                raise RuntimeError("no")
+        failures = fuzz.fuzz(Broken, games=1, seed=2)
+        self.assertEqual(failures[0]["moves"], [])
+        self.assertIn("raised", failures[0]["diff"]["to_string"][1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -12,6 +12,20 @@ from collections import deque
 from scoring import custom_score
 
 
+_CENTRAL_CELLS = {}
+
+
+def central_cells(width, height):
+    """ Return every cell of a board, sorted by distance to the centre. """
+    cells = _CENTRAL_CELLS.get((width, height))
+    if cells is None:
+        centre = ((height - 1) / 2., (width - 1) / 2.)
+        cells = sorted(((r, c) for r in range(height) for c in range(width)),
+                       key=lambda m: ((m[0] - centre[0]) ** 2 + (m[1] - centre[1]) ** 2, m))
+        _CENTRAL_CELLS[(width, height)] = cells
+    return cells
+
+
 class Timeout(Exception):
     """Subclass base exception for code clarity."""
     pass
@@ -32,7 +46,9 @@ class CustomPlayer:
         current state.)
 
     score_fn : callable (optional)
-        A function to use for heuristic evaluation of game states.
+        A function to use for heuristic evaluation of game states. If it also
+        has a `score_batch(games, player)` method, the children of nodes one
+        ply above the search horizon are scored together in a single call.
 
     iterative : boolean (optional)
         Flag indicating whether to perform fixed-depth search (False) or
@@ -45,16 +61,43 @@ class CustomPlayer:
         Time remaining (in milliseconds) when search is aborted. Should be a
         positive value large enough to allow the function to return before the
         timer expires.
+
+    opening_moves : int (optional)
+        Widest placement to search: where the player to move hasn't been
+        placed yet and more cells are open, only this many cells closest to
+        the centre are searched. The default keeps the full width on 7x7
+        boards and stops large boards from spending the search on the
+        first ply.
+
+    Attributes
+    ----------
+    nodes : int
+        Number of nodes visited by the last call to get_move().
+
+    info : callable
+        If set, called as info(depth, nodes, score) after each completed
+        iteration of iterative deepening (used by the engine protocol).
     """
 
     def __init__(self, search_depth=3, score_fn=custom_score,
-                 iterative=True, method='minimax', timeout=10.):
+                 iterative=True, method='minimax', timeout=10., opening_moves=49):
         self.search_depth = search_depth
         self.iterative = iterative
         self.score = score_fn
         self.method = method
         self.time_left = None
         self.TIMER_THRESHOLD = timeout
+        self.opening_moves = opening_moves
+        self.nodes = 0
+        self.info = None
+
+    def __getstate__(self):
+        """Drop the timer of the last move (a closure over the board) so that
+        players can be pickled and sent to worker processes."""
+        state = self.__dict__.copy()
+        state['time_left'] = None
+        state['info'] = None
+        return state
 
     def get_move(self, game, legal_moves, time_left):
         """Search for the best move from the available legal moves and return a
@@ -96,10 +139,11 @@ class CustomPlayer:
             return (-1, -1)
 
         self.time_left = time_left
+        self.nodes = 0
 
         next_move = random.choice(legal_moves)
         depth = 1
-        search_method = self.minimax if self.method is 'minimax' else self.alphabeta
+        search_method = self.minimax if self.method == 'minimax' else self.alphabeta
 
         try:
             # The search method call (alpha beta or minimax) should happen in
@@ -111,7 +155,9 @@ class CustomPlayer:
                 while True:
                     if self.time_left() < self.TIMER_THRESHOLD:
                         return next_move
-                    _, next_move = search_method(game, depth)
+                    score, next_move = search_method(game, depth)
+                    if self.info is not None:
+                        self.info(depth, self.nodes, score)
                     depth += 1
             else:
                 _, next_move = search_method(game, self.search_depth)
@@ -154,7 +200,7 @@ class CustomPlayer:
         """
         nm = [(float("-inf"), (-1, -1))]
 
-        for move in game.get_legal_moves():
+        for move in self.__search_moves(game):
             game_child = game.forecast_move(move)
             nm.append((self.__mm_min_value(game_child, depth - 1), move))
 
@@ -162,10 +208,13 @@ class CustomPlayer:
 
     def __mm_min_value(self, game, depth):
         if self.__cutoff_test(game, depth):
-            return self.score(game, self)
+            return self.__evaluate(game)
+
+        if depth == 1 and hasattr(self.score, 'score_batch'):
+            return float(min(self.__leaf_values(game)))
 
         value = float("+inf")
-        for move in game.get_legal_moves():
+        for move in self.__search_moves(game):
             game_child = game.forecast_move(move)
             value = min(value, self.__mm_max_value(game_child, depth - 1))
 
@@ -173,10 +222,13 @@ class CustomPlayer:
 
     def __mm_max_value(self, game, depth):
         if self.__cutoff_test(game, depth):
-            return self.score(game, self)
+            return self.__evaluate(game)
+
+        if depth == 1 and hasattr(self.score, 'score_batch'):
+            return float(max(self.__leaf_values(game)))
 
         value = float("-inf")
-        for move in game.get_legal_moves():
+        for move in self.__search_moves(game):
             game_child = game.forecast_move(move)
             value = max(value, self.__mm_min_value(game_child, depth - 1))
 
@@ -222,7 +274,17 @@ class CustomPlayer:
         """
         best_move = (-1, -1)
 
-        for move in game.get_legal_moves():
+        if not maximizing_player:
+            # the opponent is to move: return the lowest value it can reach
+            for move in self.__search_moves(game):
+                value = self.__ab_max_value(game.forecast_move(move), depth - 1, alpha, beta)
+                if value <= beta:
+                    beta, best_move = value, move
+                if beta <= alpha:
+                    break
+            return beta, best_move
+
+        for move in self.__search_moves(game):
             game_child = game.forecast_move(move)
             value = self.__ab_min_value(game_child, depth - 1, alpha, beta)
 
@@ -239,10 +301,13 @@ class CustomPlayer:
 
     def __ab_min_value(self, game, depth, alpha, beta):
         if self.__cutoff_test(game, depth):
-            return self.score(game, self)
+            return self.__evaluate(game)
+
+        if depth == 1 and hasattr(self.score, 'score_batch'):
+            return float(min(self.__leaf_values(game)))
 
         value = float("+inf")
-        for move in game.get_legal_moves():
+        for move in self.__search_moves(game):
             value = min(value, self.__ab_max_value(game.forecast_move(move), depth - 1, alpha, beta))
             beta = min(beta, value)
             if beta <= alpha:
@@ -252,10 +317,13 @@ class CustomPlayer:
 
     def __ab_max_value(self, game, depth, alpha, beta):
         if self.__cutoff_test(game, depth):
-            return self.score(game, self)
+            return self.__evaluate(game)
+
+        if depth == 1 and hasattr(self.score, 'score_batch'):
+            return float(max(self.__leaf_values(game)))
 
         value = float("-inf")
-        for move in game.get_legal_moves():
+        for move in self.__search_moves(game):
             value = max(value, self.__ab_min_value(game.forecast_move(move), depth - 1, alpha, beta))
             alpha = max(alpha, value)
             if beta <= alpha:
@@ -263,6 +331,43 @@ class CustomPlayer:
 
         return value
 
+    def __leaf_values(self, game):
+        """
+        Score every child of a node sitting one ply above the search horizon
+        with a single call to the batch evaluator. The children are leaves, so
+        computing all of them before applying the alpha-beta bounds only
+        returns a tighter (fail-soft) value.
+        """
+        if self.time_left() < self.TIMER_THRESHOLD:
+            raise Timeout()
+
+        children = [game.forecast_move(move) for move in self.__search_moves(game)]
+        instrumentation = getattr(game, "instrumentation", None)
+        if instrumentation is not None:
+            for child in children:
+                instrumentation.record("score", child, self)
+        return self.score.score_batch(children, self)
+
+    def __evaluate(self, game):
+        """ Score a leaf, recording it on instrumented boards. """
+        instrumentation = getattr(game, "instrumentation", None)
+        if instrumentation is not None:
+            instrumentation.record("score", game, self)
+        return self.score(game, self)
+
+    def __search_moves(self, game):
+        """
+        Return the moves searched from a node: the legal moves, narrowed to
+        the `opening_moves` most central open cells on a wide placement.
+        """
+        moves = game.get_legal_moves()
+        if len(moves) > self.opening_moves and \
+                game.get_player_location(game.active_player) is None:
+            open_cells = set(moves)
+            moves = [move for move in central_cells(game.width, game.height)
+                     if move in open_cells][:self.opening_moves]
+        return moves
+
     def __cutoff_test(self, game, depth):
         """
         Assumming that get_legal_moves returns the available legal move for the current min or max player
@@ -270,6 +375,7 @@ class CustomPlayer:
         if self.time_left() < self.TIMER_THRESHOLD:
             raise Timeout()
 
+        self.nodes += 1
         return not game.get_legal_moves() or depth == 0
 
 
@@ -0,0 +1,285 @@
+"""
+Indexed SQLite database of recorded games.
+
+Games are imported from `gamelog` JSON Lines files (or added one record at a
+time) into a single `games` table. The full move sequence of a game
+(opening included) is stored as a blob with one byte per ply holding the
+cell index `row * width + col` (two bytes on boards of more than 255
+cells), and the largest value of a byte (or two) for a turn without a move.
+The players, the winner, the opening and the number of plies are plain
+columns with indexes, so queries such as
+
+    SELECT player_1, winner, COUNT(*) FROM games
+    WHERE opening = ? AND plies > 20 GROUP BY player_1, winner
+
+run over hundreds of thousands of games without touching the moves.
+`replay` rebuilds the board at any ply directly from the encoded moves.
+
+    python gamedb.py import games.jsonl --db games.db
+    python gamedb.py stats --db games.db
+    python gamedb.py show 42 --ply 10 --db games.db
+"""
+
+import argparse
+import array
+import json
+import sqlite3
+
+from isolation import Board
+from isolation.bitboard import decode_state
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY,
+    match TEXT,
+    game INTEGER,
+    seed INTEGER,
+    player_1 TEXT NOT NULL,
+    player_2 TEXT NOT NULL,
+    winner TEXT,
+    termination TEXT,
+    width INTEGER NOT NULL,
+    height INTEGER NOT NULL,
+    opening INTEGER,
+    plies INTEGER NOT NULL,
+    moves BLOB NOT NULL,
+    move_times BLOB,
+    UNIQUE (match, game)
+);
+CREATE INDEX IF NOT EXISTS games_agents ON games (player_1, player_2);
+CREATE INDEX IF NOT EXISTS games_player_2 ON games (player_2);
+CREATE INDEX IF NOT EXISTS games_winner ON games (winner);
+CREATE INDEX IF NOT EXISTS games_opening ON games (opening);
+CREATE INDEX IF NOT EXISTS games_plies ON games (plies);
+"""
+
+
+def _encoding(width, height):
+    """ Array typecode of the moves and the value of a missing move. """
+    return ("B", 0xFF) if width * height < 0xFF else ("H", 0xFFFF)
+
+
+def encode_moves(moves, width, height):
+    """
+    Encode a list of (row, col) moves as bytes; None and (-1, -1) (no move)
+    are stored as the largest value of the encoding.
+    """
+    typecode, no_move = _encoding(width, height)
+    return array.array(typecode, [no_move if move is None or tuple(move) == (-1, -1)
+                                  else move[0] * width + move[1] for move in moves]).tobytes()
+
+
+def decode_moves(blob, width, height):
+    """ Decode the output of `encode_moves`; missing moves become None. """
+    typecode, no_move = _encoding(width, height)
+    cells = array.array(typecode)
+    cells.frombytes(blob)
+    return [None if cell == no_move else divmod(cell, width) for cell in cells]
+
+
+def encode_opening(opening, width, height):
+    """ Index of an opening (pair of moves) for the `opening` column. """
+    cells = width * height
+    first, second = [move[0] * width + move[1] for move in opening]
+    return first * cells + second
+
+
+def decode_opening(value, width, height):
+    """ Inverse of `encode_opening`. """
+    cells = width * height
+    return tuple(divmod(cell, width) for cell in divmod(value, cells))
+
+
+def record_moves(record):
+    """
+    Return every ply of a `gamelog` record, opening included, and the number
+    of plies that were applied to the board: `Board.play` ends a game with
+    the move (if any) that lost on an illegal move or on time, which was
+    never applied.
+    """
+    moves = [tuple(m) if m is not None else None for m in record.get("opening", [])]
+    for turn in record["moves"]:
+        moves.extend(tuple(m) if m is not None else None for m in turn)
+    applied = len(moves) - 1 if record.get("termination") else len(moves)
+    return moves, applied
+
+
+class GameDB():
+    """SQLite store of recorded games.
+
+    Parameters
+    ----------
+    path : str
+        Database file, created if needed (":memory:" for a temporary one).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+
+    def _row(self, record, width, height):
+        moves, plies = record_moves(record)
+        opening = record.get("opening")
+        times = record.get("move_times")
+        return (record.get("match"), record.get("game"), record.get("seed"),
+                record["player_1"], record["player_2"], record.get("winner"),
+                record.get("termination"), width, height,
+                encode_opening(opening, width, height) if opening and len(opening) == 2 else None,
+                plies, encode_moves(moves, width, height),
+                array.array("f", times).tobytes() if times is not None else None)
+
+    def add(self, records, width=7, height=7):
+        """
+        Store `gamelog` records (replacing earlier copies of the same match
+        and game) in a single transaction and return how many were added.
+        """
+        with self.db:
+            cursor = self.db.executemany(
+                "INSERT OR REPLACE INTO games (match, game, seed, player_1, player_2, winner, "
+                "termination, width, height, opening, plies, moves, move_times) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (self._row(record, width, height) for record in records))
+        return cursor.rowcount
+
+    def import_log(self, path, width=7, height=7, batch=10000):
+        """ Import a `gamelog` JSON Lines file; return the number of games. """
+        count = 0
+        with open(path) as f:
+            records = []
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+                if len(records) >= batch:
+                    count += self.add(records, width, height)
+                    records = []
+            count += self.add(records, width, height)
+        return count
+
+    def execute(self, sql, params=()):
+        """ Run an arbitrary query and return all rows. """
+        return self.db.execute(sql, params).fetchall()
+
+    def find(self, player=None, opponent=None, winner=None, opening=None,
+             min_plies=None, max_plies=None, termination=None, width=7, height=7):
+        """
+        Return the ids of the games matching every given criterion. `player`
+        and `opponent` match either seat; `opening` is a pair of moves on a
+        width x height board.
+        """
+        clauses, params = [], []
+        if player is not None and opponent is not None:
+            clauses.append("((player_1 = ? AND player_2 = ?) OR (player_1 = ? AND player_2 = ?))")
+            params += [player, opponent, opponent, player]
+        elif player is not None or opponent is not None:
+            name = player if player is not None else opponent
+            clauses.append("(player_1 = ? OR player_2 = ?)")
+            params += [name, name]
+        if winner is not None:
+            clauses.append("winner = ?")
+            params.append(winner)
+        if opening is not None:
+            clauses.append("opening = ? AND width = ? AND height = ?")
+            params += [encode_opening(opening, width, height), width, height]
+        if min_plies is not None:
+            clauses.append("plies >= ?")
+            params.append(min_plies)
+        if max_plies is not None:
+            clauses.append("plies <= ?")
+            params.append(max_plies)
+        if termination is not None:
+            clauses.append("termination = ?")
+            params.append(termination)
+        where = " WHERE " + " AND ".join(clauses) if clauses else ""
+        return [row[0] for row in self.db.execute("SELECT id FROM games" + where + " ORDER BY id",
+                                                  params)]
+
+    def get(self, game_id):
+        """ Return a game as a dict with its moves and move times decoded. """
+        cursor = self.db.execute("SELECT * FROM games WHERE id = ?", (game_id,))
+        row = cursor.fetchone()
+        if row is None:
+            raise KeyError(game_id)
+        game = dict(zip([c[0] for c in cursor.description], row))
+        game["moves"] = decode_moves(game["moves"], game["width"], game["height"])
+        if game["opening"] is not None:
+            game["opening"] = decode_opening(game["opening"], game["width"], game["height"])
+        if game["move_times"] is not None:
+            times = array.array("f")
+            times.frombytes(game["move_times"])
+            game["move_times"] = times.tolist()
+        return game
+
+    def replay(self, game_id, ply=None, player_1=1, player_2=2):
+        """
+        Return the board of a game after `ply` plies (the final position by
+        default), with the given objects registered as the players.
+        """
+        width, height, plies, blob = self.db.execute(
+            "SELECT width, height, plies, moves FROM games WHERE id = ?", (game_id,)).fetchone()
+        ply = plies if ply is None else min(ply, plies)
+        moves = decode_moves(blob, width, height)[:ply]
+        blocked = 0
+        for r, c in moves:
+            blocked |= 1 << (r * width + c)
+        # player 1 made the even plies
+        loc_1, loc_2 = [seat[-1][0] * width + seat[-1][1] if seat else -1
+                        for seat in (moves[0::2], moves[1::2])]
+        return decode_state((width, height, blocked, loc_1, loc_2, ply % 2 == 0, ply),
+                            player_1, player_2, Board)
+
+    def standings(self):
+        """
+        Return (player, games, wins) for every agent, from a single indexed
+        aggregate query.
+        """
+        return self.execute(
+            "SELECT name, COUNT(*), SUM(won) FROM ("
+            " SELECT player_1 AS name, winner = player_1 AS won FROM games"
+            " UNION ALL SELECT player_2, winner = player_2 FROM games)"
+            " GROUP BY name ORDER BY SUM(won) * 1.0 / COUNT(*) DESC")
+
+    def __len__(self):
+        return self.db.execute("SELECT COUNT(*) FROM games").fetchone()[0]
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Store and query recorded games.")
+    parser.add_argument("--db", default="games.db", help="database file (default: %(default)s)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    load = commands.add_parser("import", help="import gamelog JSON Lines files")
+    load.add_argument("logs", nargs="+")
+    load.add_argument("--width", type=int, default=7)
+    load.add_argument("--height", type=int, default=7)
+    commands.add_parser("stats", help="print the games and wins of every agent")
+    show = commands.add_parser("show", help="print a game at a given ply")
+    show.add_argument("game", type=int)
+    show.add_argument("--ply", type=int)
+    args = parser.parse_args()
+
+    with GameDB(args.db) as db:
+        if args.command == "import":
+            for path in args.logs:
+                print("{}: {} games".format(path, db.import_log(path, args.width, args.height)))
+        elif args.command == "stats":
+            for name, games, wins in db.standings():
+                print("{!s:<15}{:>8} games{:>8.1f}%".format(name, games, 100. * wins / games))
+        else:
+            game = db.get(args.game)
+            print("{player_1} vs {player_2}: {winner} won ({termination}, {plies} plies)".format(**game))
+            print(db.replay(args.game, args.ply).to_string())
+
+
+if __name__ == "__main__":
+    main()
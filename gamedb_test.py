@@ -0,0 +1,83 @@
+"""
+Tests for the game database
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import isolation
+import tournament
+
+from gamedb import GameDB
+from gamedb import decode_moves
+from gamedb import encode_moves
+from gamelog import GameLog
+from sample_players import GreedyPlayer
+from sample_players import RandomPlayer
+
+
+class GameDBTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.records = []
+        for seed in range(3):
+            records = []
+            tournament.play_match(RandomPlayer(), GreedyPlayer(), seed=seed, records=records)
+            for record in records:
+                record["match"] = str(seed)
+            self.records.extend(records)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_encoding(self):
+        moves = [(0, 0), (6, 6), None, (-1, -1)]
+        self.assertEqual(len(encode_moves(moves, 7, 7)), 4)
+        self.assertEqual(decode_moves(encode_moves(moves, 7, 7), 7, 7), moves[:3] + [None])
+        self.assertEqual(decode_moves(encode_moves([(15, 15)], 16, 16), 16, 16), [(15, 15)])
+
+    def test_replay(self):
+        """ The replayed final position is the one of the recorded game """
+        with GameDB(":memory:") as db:
+            self.assertEqual(db.add(self.records), 6)
+            for game_id, record in zip(db.find(), self.records):
+                board = isolation.Board(1, 2)
+                for move in record["opening"]:
+                    board.apply_move(move)
+                for turn in record["moves"]:
+                    for move in turn:
+                        if move in board.get_legal_moves():
+                            board.apply_move(move)
+                self.assertEqual(db.replay(game_id).to_string(), board.to_string())
+                self.assertEqual(db.replay(game_id, 1).move_count, 1)
+                self.assertEqual(db.get(game_id)["plies"], board.move_count)
+
+    def test_import_and_find(self):
+        path = os.path.join(self.dir, "games.jsonl")
+        with GameLog(path) as log:
+            for record in self.records:
+                log.write(record)
+        with GameDB(os.path.join(self.dir, "games.db")) as db:
+            self.assertEqual(db.import_log(path), 6)
+            db.import_log(path)  # importing again replaces the games
+            self.assertEqual(len(db), 6)
+
+            winners = [r["winner"] for r in self.records]
+            name = winners[0]
+            self.assertEqual(len(db.find(winner=name)), winners.count(name))
+            opening = self.records[0]["opening"]
+            self.assertEqual(len(db.find(opening=opening)),
+                             sum(r["opening"] == opening for r in self.records))
+            total = sum(games for _, games, _ in db.standings())
+            self.assertEqual(total, 12)
+
+    def test_game_as_text_is_stateless(self):
+        history = [[(0, 0), (1, 2)]]
+        self.assertEqual(isolation.game_as_text(1, history), isolation.game_as_text(1, history))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+"""
+Append-only JSON Lines log of tournament games.
+
+Every finished game is written as one JSON object per line and flushed to
+disk immediately, so a tournament that dies loses at most the games in
+progress. Records are grouped by a `match` key naming the pairing, the
+ordering and the match number; when a log is reopened, the matches whose
+games are all present are reported by `completed` and can be skipped. A
+partially logged match is played again in full, and the later record of a
+game replaces the earlier one.
+
+A record looks like:
+
+    {"match": "Student|AB_Open|0|3", "game": 1, "seed": 1234,
+     "player_1": "AB_Open", "player_2": "Student", "opening": [[2, 3], [0, 5]],
+     "moves": [[[4, 4], [1, 3]], ...], "winner": "Student",
+     "termination": "illegal move", "move_times": [12.1, 150.3, ...]}
+"""
+
+import json
+import os
+
+
+GAMES_PER_MATCH = 2
+
+
+class GameLog():
+    """Stream game records to a JSON Lines file and remember which matches
+    it already holds.
+
+    Parameters
+    ----------
+    path : str
+        The log file; existing records are loaded and new ones appended.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.matches = {}
+        if os.path.exists(path):
+            with open(path, "r+") as f:
+                valid = 0
+                for line in iter(f.readline, ""):
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # a run killed mid-write leaves a truncated last line
+                        break
+                    self.matches.setdefault(record["match"], {})[record["game"]] = record
+                    valid = f.tell()
+                f.truncate(valid)
+        self.file = open(path, "a")
+
+    def completed(self, match):
+        """
+        Return the records of `match` ordered by game if all of its games
+        were logged, otherwise None.
+        """
+        games = self.matches.get(match, {})
+        if len(games) < GAMES_PER_MATCH:
+            return None
+        return [games[i] for i in sorted(games)]
+
+    def write(self, record):
+        """ Append a record and flush it to disk. """
+        self.matches.setdefault(record["match"], {})[record["game"]] = record
+        self.file.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
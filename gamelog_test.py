@@ -0,0 +1,67 @@
+"""
+Tests for the JSON Lines game log
+"""
+
+import os
+import tempfile
+import unittest
+
+from gamelog import GameLog
+
+
+def record(match, game, winner="a"):
+    return {"match": match, "game": game, "winner": winner}
+
+
+class GameLogTest(unittest.TestCase):
+
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), "games.jsonl")
+
+    def test_resume(self):
+        with GameLog(self.path) as log:
+            log.write(record("m1", 0))
+            log.write(record("m1", 1, "b"))
+            log.write(record("m2", 0))
+            self.assertEqual([r["winner"] for r in log.completed("m1")], ["a", "b"])
+
+        with GameLog(self.path) as log:
+            self.assertEqual([r["winner"] for r in log.completed("m1")], ["a", "b"])
+            self.assertIsNone(log.completed("m2"))
+            self.assertIsNone(log.completed("m3"))
+
+    def test_truncated_line(self):
+        with GameLog(self.path) as log:
+            log.write(record("m1", 0))
+            log.write(record("m1", 1))
+        with open(self.path, "a") as f:
+            f.write('{"match": "m2", "ga')
+
+        with GameLog(self.path) as log:
+            self.assertIsNotNone(log.completed("m1"))
+            log.write(record("m2", 0))
+            log.write(record("m2", 1))
+
+        with GameLog(self.path) as log:
+            self.assertIsNotNone(log.completed("m2"))
+
+    def test_resumed_round_rates_each_match_once(self):
+        import contextlib
+        import io
+        import tournament
+        from rating import RatingTable
+        from sample_players import RandomPlayer
+
+        agents = [tournament.Agent(RandomPlayer(), "A"), tournament.Agent(RandomPlayer(), "B")]
+        ratings = RatingTable()
+        ratios = []
+        for _ in range(2):
+            with GameLog(self.path) as log, contextlib.redirect_stdout(io.StringIO()):
+                ratios.append(tournament.play_round(agents, 3, ratings=ratings, log=log, seed=5))
+            # 3 matches in both orderings, two games each
+            self.assertEqual(ratings.games("A", "B"), 12)
+        self.assertEqual(ratios[0], ratios[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -11,9 +11,15 @@ import io
 
 # Make the Board class available at the root of the module for imports
 from .isolation import Board
+from .isolation import BoardView
+from .isolation import Instrumentation
+from .isolation import TimeControl
+from .isolation import TIMED_OUT
+from .bitboard import BitBoard
+from .rules import MoveRule
 
 
-def game_as_text(winner, move_history, termination="", board=Board(1, 2)):
+def game_as_text(winner, move_history, termination="", board=None):
     """
     Generate a printable representation for a game of isolation.
 
@@ -35,9 +41,10 @@ def game_as_text(winner, move_history, termination="", board=Board(1, 2)):
         Valid reasons for termination include "" (none), "timeout", and
         "illegal move".
 
-    board : isolation.Board
+    board : isolation.Board (optional)
         An instance of `isolation.Board` encoding the game state (e.g., player
-        locations and blocked cells) for a game of isolation.
+        locations and blocked cells) for a game of isolation; the moves are
+        applied to it. A new 7x7 board is used by default.
 
     Returns
     ----------
@@ -45,6 +52,9 @@ def game_as_text(winner, move_history, termination="", board=Board(1, 2)):
         A string representation of a game of isolation.
     """
 
+    if board is None:
+        board = Board(1, 2)
+
     ans = io.StringIO()
 
     for i, move in enumerate(move_history):
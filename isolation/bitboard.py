@@ -0,0 +1,395 @@
+"""
+Bitmask helpers for reasoning about an `isolation.Board` several moves ahead.
+
+A board of size width x height is encoded as a Python integer where bit
+`row * width + col` represents the cell (row, col). Because Python integers
+have arbitrary precision the same code works for any board size.
+
+Knight moves are generated for a whole set of cells at once by shifting the
+mask by `dr * width + dc` and discarding the cells that would wrap around the
+edge of the board, so a flood fill costs eight shifts per distance layer
+instead of one `move_is_legal` call per cell. Other step rules (see
+`isolation.rules`) shift by their own offsets; sliding rules OR the ray
+masks of every cell in the set.
+
+`BitBoard` is a `Board` built on the same encoding, for large boards and
+fast searches.
+"""
+
+from .isolation import Board
+from .rules import KNIGHT
+
+
+KNIGHT_DIRECTIONS = KNIGHT.offsets
+
+_SHIFT_TABLES = {}
+
+
+def popcount(bits):
+    """ Return the number of set bits in a mask. """
+    return bin(bits).count("1")
+
+
+def full_mask(width, height):
+    """ Return a mask with every cell of a width x height board set. """
+    return (1 << (width * height)) - 1
+
+
+def cell_index(move, width):
+    """ Convert a (row, col) pair into a bit index. """
+    return move[0] * width + move[1]
+
+
+def index_cell(index, width):
+    """ Convert a bit index into a (row, col) pair. """
+    return divmod(index, width)
+
+
+def iter_cells(bits, width):
+    """ Yield the (row, col) pair of every cell set in the mask. """
+    while bits:
+        low = bits & -bits
+        yield divmod(low.bit_length() - 1, width)
+        bits ^= low
+
+
+def shift_table(width, height, offsets=KNIGHT_DIRECTIONS):
+    """
+    Return the list of (shift, source_mask) pairs for a piece stepping by
+    `offsets` (a knight by default) on a width x height board.
+    `source_mask` holds the cells from which the move (dr, dc) stays on the
+    board, and `shift` is the signed bit offset of that move.
+    """
+    key = (width, height, tuple(offsets))
+    table = _SHIFT_TABLES.get(key)
+    if table is None:
+        table = []
+        for dr, dc in offsets:
+            source = 0
+            for r in range(max(0, -dr), min(height, height - dr)):
+                for c in range(max(0, -dc), min(width, width - dc)):
+                    source |= 1 << (r * width + c)
+            table.append((dr * width + dc, source))
+        _SHIFT_TABLES[key] = table
+    return table
+
+
+def knight_attacks(bits, width, height):
+    """
+    Return the mask of every cell reachable with a single knight move from
+    any of the cells set in `bits`.
+    """
+    return attacks(bits, 0, width, height, KNIGHT)
+
+
+def attacks(bits, open_cells, width, height, rule=KNIGHT):
+    """
+    Return the mask of every cell reachable with a single move of `rule`
+    (an `isolation.rules.MoveRule`) from any of the cells set in `bits`.
+    Step rules shift the whole set at once and ignore `open_cells`; sliding
+    rules stop before the cells missing from `open_cells`.
+    """
+    if not rule.sliding:
+        out = 0
+        for shift, source in shift_table(width, height, rule.offsets):
+            if shift > 0:
+                out |= (bits & source) << shift
+            else:
+                out |= (bits & source) >> -shift
+        return out
+    tables = rule.tables(width, height)
+    out = 0
+    while bits:
+        low = bits & -bits
+        out |= tables.move_mask(low.bit_length() - 1, open_cells)
+        bits ^= low
+    return out
+
+
+def to_bits(game):
+    """
+    Encode a game state as bitmasks.
+
+    Parameters
+    ----------
+    game : `isolation.Board`
+        An instance of `isolation.Board` encoding the current state of the
+        game (e.g., player locations and blocked cells).
+
+    Returns
+    ----------
+    (int, dict)
+        The mask of open cells and a dict mapping each player to the mask of
+        its current cell (0 if the player has not moved yet).
+    """
+    width = game.width
+    if isinstance(game, BitBoard):
+        open_cells = game.__open__
+    else:
+        open_cells = 0
+        for i, row in enumerate(game.__board_state__):
+            base = i * width
+            for j, cell in enumerate(row):
+                if cell == Board.BLANK:
+                    open_cells |= 1 << (base + j)
+
+    locations = {}
+    for player, move in game.__last_player_move__.items():
+        locations[player] = 0 if move is Board.NOT_MOVED else 1 << cell_index(move, width)
+
+    return open_cells, locations
+
+
+def flood_fill(start, open_cells, width, height, rule=KNIGHT):
+    """
+    Return the breadth-first distance layers of the moves of `rule` (the
+    knight by default) from the `start` mask through `open_cells`; layer k
+    holds the cells first reached after k + 1 moves. A start mask of 0 means
+    the piece has not been placed yet, so every open cell is reachable in
+    one move.
+    """
+    if not start:
+        return [open_cells] if open_cells else []
+
+    layers = []
+    seen = start
+    frontier = start
+    while True:
+        frontier = attacks(frontier, open_cells, width, height, rule) & open_cells & ~seen
+        if not frontier:
+            return layers
+        layers.append(frontier)
+        seen |= frontier
+
+
+def distance_layers(game, player):
+    """
+    Compute the distance layers of both players under the movement rule of
+    the board.
+
+    Parameters
+    ----------
+    game : `isolation.Board`
+        An instance of `isolation.Board` encoding the current state of the
+        game (e.g., player locations and blocked cells).
+
+    player : hashable
+        One of the objects registered by the game object as a valid player.
+
+    Returns
+    ----------
+    (list<int>, list<int>)
+        The distance layers of `player` and of its opponent. Element k of
+        each list is the mask of open cells first reachable in k + 1 moves.
+    """
+    open_cells, locations = to_bits(game)
+    opponent = game.get_opponent(player)
+    rule = getattr(game, "rule", KNIGHT)
+    return (flood_fill(locations[player], open_cells, game.width, game.height, rule),
+            flood_fill(locations[opponent], open_cells, game.width, game.height, rule))
+
+
+def territory(game, player):
+    """
+    Split the open cells of the board Voronoi-style between both players.
+
+    A cell belongs to a player when that player reaches it in strictly fewer
+    moves than the opponent; cells reached at the same distance by
+    both players are contested and belong to nobody.
+
+    Returns
+    ----------
+    (int, int)
+        The number of cells owned by `player` and by its opponent.
+    """
+    own_layers, opp_layers = distance_layers(game, player)
+
+    own_cells = 0
+    opp_cells = 0
+    own_seen = 0
+    opp_seen = 0
+    for k in range(max(len(own_layers), len(opp_layers))):
+        own = own_layers[k] if k < len(own_layers) else 0
+        opp = opp_layers[k] if k < len(opp_layers) else 0
+        own_cells += popcount(own & ~opp_seen & ~opp)
+        opp_cells += popcount(opp & ~own_seen & ~own)
+        own_seen |= own
+        opp_seen |= opp
+
+    return own_cells, opp_cells
+
+
+def encode_state(game):
+    """
+    Encode a game state as a compact tuple of integers (board size, blocked
+    cells mask, bit index of each player or -1, whether player 1 is active
+    and the move count), cheap to pickle and send to another process.
+    """
+    open_cells, _ = to_bits(game)
+    locations = [game.__last_player_move__[p] for p in (game.__player_1__, game.__player_2__)]
+    loc_1, loc_2 = [-1 if move is Board.NOT_MOVED else cell_index(move, game.width)
+                    for move in locations]
+    return (game.width, game.height, full_mask(game.width, game.height) & ~open_cells,
+            loc_1, loc_2, game.active_player == game.__player_1__, game.move_count)
+
+
+def decode_state(state, player_1, player_2, board_class=Board, rule=None):
+    """
+    Rebuild a board from `encode_state` output with the given players
+    registered as player 1 and player 2. The state doesn't hold the movement
+    rule: boards use `rule` if given, the knight otherwise.
+    """
+    width, height, blocked, loc_1, loc_2, p1_active, move_count = state
+    if rule is None:
+        game = board_class(player_1, player_2, width=width, height=height)
+    else:
+        game = board_class(player_1, player_2, width=width, height=height, rule=rule)
+    symbols = game.__player_symbols__
+    rows = [[Board.BLANK] * width for _ in range(height)]
+    for r, c in iter_cells(blocked, width):
+        rows[r][c] = symbols[player_1]
+    for player, loc in ((player_1, loc_1), (player_2, loc_2)):
+        if loc >= 0:
+            move = index_cell(loc, width)
+            game.__last_player_move__[player] = move
+            rows[move[0]][move[1]] = symbols[player]
+    game.__board_state__ = rows
+    if not p1_active:
+        game.__active_player__, game.__inactive_player__ = player_2, player_1
+    game.move_count = move_count
+    return game
+
+
+def pack_boards(games):
+    """
+    Concatenate the `Board.to_bytes` encodings of boards of the same size
+    into one buffer of `Board.record_size(width, height)` bytes per board,
+    e.g. to store positions or send them to another process in one piece.
+    `numpy.frombuffer(buffer, numpy.uint8).reshape(len(games), -1)` views
+    the buffer as one row per position.
+    """
+    sizes = {(game.width, game.height) for game in games}
+    if len(sizes) > 1:
+        raise ValueError("All boards must have the same size, got {}".format(sorted(sizes)))
+    return b"".join(game.to_bytes() for game in games)
+
+
+def unpack_boards(buffer, player_1, player_2, width=7, height=7, board_class=Board, rule=None):
+    """
+    Rebuild the boards of a `pack_boards` buffer, or of any bytes-like
+    object holding whole records such as a C-contiguous uint8 NumPy array,
+    with the given players registered as player 1 and player 2.
+    """
+    data = memoryview(buffer).cast("B")
+    size = Board.record_size(width, height)
+    if len(data) % size:
+        raise ValueError("Buffer of {} bytes doesn't hold whole {}-byte records".format(
+            len(data), size))
+    return [board_class.from_bytes(data[k:k + size], player_1, player_2, width, height, rule)
+            for k in range(0, len(data), size)]
+
+
+class BitBoard(Board):
+    """Drop-in `isolation.Board` storing the open cells as a bitmask.
+
+    The open cells are a single Python integer (bit `row * width + col`), so
+    the representation works for boards of any size, a copy costs one
+    integer and one small dict instead of a deep copy of the rows, and the
+    legal moves are read from the move tables of the board's rule (see
+    `isolation.rules.MoveTables`) in the same order as `Board`; sliding
+    moves are cut at the first blocked cell of each ray with mask
+    operations. Boards of 15x15 and larger are as cheap to copy as 7x7
+    ones.
+
+    `__board_state__` is kept for code that reads the rows: it builds them
+    from the bitmask on every access (blocked cells hold player 1's symbol,
+    as in `decode_state`), and assigning rows to it replaces the bitmask.
+    Changes made to the returned rows are not seen by the board.
+    """
+
+    def __get_rows(self):
+        symbols = self.__player_symbols__
+        blocked = symbols[self.__player_1__]
+        rows = [[Board.BLANK] * self.width for _ in range(self.height)]
+        for r, c in iter_cells(full_mask(self.width, self.height) & ~self.__open__, self.width):
+            rows[r][c] = blocked
+        for player in (self.__player_1__, self.__player_2__):
+            move = self.__last_player_move__[player]
+            if move is not Board.NOT_MOVED:
+                rows[move[0]][move[1]] = symbols[player]
+        return rows
+
+    def __set_rows(self, rows):
+        open_cells = 0
+        for i, row in enumerate(rows):
+            base = i * self.width
+            for j, cell in enumerate(row):
+                if cell == Board.BLANK:
+                    open_cells |= 1 << (base + j)
+        self.__open__ = open_cells
+
+    __board_state__ = property(__get_rows, __set_rows)
+
+    def copy(self):
+        """ Return a copy of the current board. """
+        if self.instrumentation is not None:
+            self.instrumentation.record("copy", self)
+        new_board = object.__new__(self.__class__)
+        new_board.__dict__.update(self.__dict__)
+        new_board.__last_player_move__ = self.__last_player_move__.copy()
+        return new_board
+
+    def move_is_legal(self, move):
+        row, col = move
+        return 0 <= row < self.height and 0 <= col < self.width and \
+            (self.__open__ >> (row * self.width + col)) & 1 == 1
+
+    def get_blank_spaces(self):
+        open_cells = self.__open__
+        return [cell for bit, cell in self.__move_tables__.order if open_cells & bit]
+
+    def get_legal_moves(self, player=None):
+        if player is None:
+            player = self.__active_player__
+        if self.instrumentation is not None:
+            self.instrumentation.record("get_legal_moves", self, player)
+        move = self.__last_player_move__[player]
+        open_cells = self.__open__
+        tables = self.__move_tables__
+        if move is Board.NOT_MOVED:
+            return [cell for bit, cell in tables.order if open_cells & bit]
+        if tables.sliding:
+            return tables.moves(move[0] * self.width + move[1], open_cells)
+        return [cell for bit, cell in tables.steps[move[0] * self.width + move[1]]
+                if open_cells & bit]
+
+    def apply_move(self, move):
+        row, col = move
+        self.__last_player_move__[self.__active_player__] = move
+        self.__open__ &= ~(1 << (row * self.width + col))
+        self.__active_player__, self.__inactive_player__ = self.__inactive_player__, self.__active_player__
+        self.move_count += 1
+        if self.instrumentation is not None:
+            self.instrumentation.record("apply_move", self, move)
+
+    def to_bytes(self):
+        return self.__pack__(full_mask(self.width, self.height) & ~self.__open__)
+
+    def __place__(self, blocked, locations):
+        self.__open__ = full_mask(self.width, self.height) & ~blocked
+        for player, move in zip((self.__player_1__, self.__player_2__), locations):
+            if move is not Board.NOT_MOVED:
+                self.__last_player_move__[player] = move
+
+    def to_string(self):
+        p1_loc = self.__last_player_move__[self.__player_1__]
+        p2_loc = self.__last_player_move__[self.__player_2__]
+        # bit i of the mask is character i of the reversed binary string
+        bits = format(self.__open__, "0{}b".format(self.width * self.height))[::-1]
+        cells = list(bits.replace("0", "-").replace("1", " "))
+        if p1_loc:
+            cells[p1_loc[0] * self.width + p1_loc[1]] = '1'
+        if p2_loc:
+            cells[p2_loc[0] * self.width + p2_loc[1]] = '2'
+        return ''.join(' | ' + ' | '.join(cells[i:i + self.width]) + ' | \n\r'
+                       for i in range(0, len(cells), self.width))
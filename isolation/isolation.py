@@ -1,26 +1,247 @@
 """
 This file contains the `Board` class, which implements the rules for the
 game Isolation as described in lecture, modified so that the players move
-like knights in chess rather than queens.
+like knights in chess rather than queens by default; the movement rule is a
+parameter of the board (see `isolation.rules`).
 
 You MAY use and modify this class, however ALL function signatures must
 remain compatible with the defaults provided, and none of your changes will
 be available to project reviewers.
 """
 
+import asyncio
+import inspect
+import time
 import timeit
 
+from collections import Counter
 from copy import deepcopy
 from copy import copy
 
+from .rules import get_rule
+
 
 TIME_LIMIT_MILLIS = 200
 
+# returned by a player (or sent by `play_async`) in place of a move that was
+# cut off by the player's own deadline: the player loses on timeout even if
+# the game clock, e.g. a CPU time clock, hasn't run out
+TIMED_OUT = object()
+
+CLOCKS = {
+    "wall": timeit.default_timer,
+    "process": time.process_time,
+    "thread": time.thread_time,
+}
+
+
+def _location_size(width, height):
+    """ Bytes per player location in `Board.to_bytes`, leaving room for the
+    all-ones value of a player that hasn't moved. """
+    return ((width * height).bit_length() + 7) // 8
+
+
+class TimeControl(object):
+    """
+    Describe how much time each player gets and how it is measured.
+
+    By default every move gets a fixed `move_millis` budget, as in the
+    original `Board.play`. When `base_millis` is given, each player instead
+    owns a time bank that starts at `base_millis`; a move may use everything
+    left in the bank, the time used is deducted afterwards and
+    `increment_millis` is added back (a Fischer clock). A player whose move
+    overdraws the bank loses on timeout. With a time bank `time_left()`
+    reports a soft budget for the move, `bank / moves_to_go + increment`
+    capped by the bank, so that agents searching until `time_left()` runs
+    out (like iterative deepening) don't spend the whole bank on one move.
+
+    Parameters
+    ----------
+    move_millis : numeric (optional)
+        Fixed budget of every move when no time bank is used.
+
+    base_millis : numeric (optional)
+        Initial time bank of each player, or None for a fixed budget per move.
+
+    increment_millis : numeric (optional)
+        Time added to the bank after every move.
+
+    clock : {'wall', 'process', 'thread'} (optional)
+        Clock used to measure the players: wall-clock time, CPU time of the
+        whole process, or CPU time of the thread calling get_move(). CPU time
+        clocks don't charge a player for time the scheduler spent running
+        other processes, so many games can share a machine.
+
+    moves_to_go : numeric (optional)
+        Number of moves the bank is expected to last, used for the soft
+        budget of every move.
+    """
+
+    def __init__(self, move_millis=TIME_LIMIT_MILLIS, base_millis=None,
+                 increment_millis=0, clock="wall", moves_to_go=20):
+        if clock not in CLOCKS:
+            raise ValueError("`clock` must be one of {}".format(sorted(CLOCKS)))
+        self.move_millis = move_millis
+        self.base_millis = base_millis
+        self.increment_millis = increment_millis
+        self.clock = clock
+        self.moves_to_go = moves_to_go
+
+    def now(self):
+        """ Current reading of the clock in milliseconds. """
+        return 1000 * CLOCKS[self.clock]()
+
+    def start(self):
+        """ Time bank of a player at the start of the game. """
+        return self.move_millis if self.base_millis is None else self.base_millis
+
+    def allowance(self, bank):
+        """ Milliseconds available for the next move given the time bank. """
+        return self.move_millis if self.base_millis is None else bank
+
+    def budget(self, bank):
+        """ Milliseconds the next move should use given the time bank. """
+        if self.base_millis is None:
+            return self.move_millis
+        return min(bank, bank / self.moves_to_go + self.increment_millis)
+
+    def update(self, bank, elapsed):
+        """ Time bank after a move that took `elapsed` milliseconds. """
+        if self.base_millis is None:
+            return bank
+        return bank - elapsed + self.increment_millis
+
+
+class Instrumentation(object):
+    """
+    Count the calls to the board operations of a search, optionally passing
+    each one to a hook. Enabled on a board with `Board.instrument()`; every
+    board copied from it shares the same instance, so the counts cover the
+    whole game tree explored from that board.
+
+    The events are "copy", "forecast_move", "get_legal_moves", "apply_move"
+    (recorded once the move is applied) and "score" (recorded by
+    `game_agent.CustomPlayer` for every evaluation). A forecast also counts
+    as a copy and an apply_move.
+
+    Parameters
+    ----------
+    hook : callable (optional)
+        Called as hook(event, board, arg) on every event, where `arg` is the
+        move for forecast_move and apply_move, the player for
+        get_legal_moves and score, and None for copy.
+    """
+
+    def __init__(self, hook=None):
+        self.hook = hook
+        self.counts = Counter()
+
+    def record(self, event, board, arg=None):
+        """ Count an event and pass it to the hook. """
+        self.counts[event] += 1
+        if self.hook is not None:
+            self.hook(event, board, arg)
+
+    def reset(self):
+        """ Clear the counts. """
+        self.counts.clear()
+
+
+class BoardView(object):
+    """
+    Read-only view of a board, handed to the players by `Board.play` in
+    place of a copy of the board on every turn.
+
+    The view forwards the read-only methods and attributes of the board
+    (listed in `READERS`) to the board it wraps, so reading the game costs
+    no copy: get_legal_moves(), forecast_move(), copy(), utility() and the
+    like behave as on the board, and `isinstance` sees the class of the
+    board. Everything else, such as apply_move(), an attribute assignment
+    or the mutable containers of the board state (`__board_state__`,
+    `__last_player_move__`), makes the view copy the board and work on its
+    private copy from then on; the game itself is never changed.
+
+    A view follows the game until it is copied, so it is only meant to be
+    used during the get_move() call that received it; keep `view.copy()` to
+    remember a position. `replace` gives a view of the same position with
+    other players or instrumentation, still without copying the board.
+
+    Parameters
+    ----------
+    board : `isolation.Board` or `BoardView`
+        The board to look at.
+    """
+    __slots__ = ("_board", "_private")
+
+    # read-only methods and immutable (or shared) attributes; any other
+    # name copies the board first
+    READERS = frozenset((
+        "active_player", "inactive_player", "get_opponent", "copy", "forecast_move",
+        "move_is_legal", "get_blank_spaces", "get_player_location", "get_legal_moves",
+        "is_winner", "is_loser", "utility", "print_board", "to_string", "to_bytes",
+        "record_size", "width", "height", "rule", "move_count", "instrumentation",
+        "BLANK", "NOT_MOVED", "__player_1__", "__player_2__", "__active_player__",
+        "__inactive_player__", "__move_tables__", "__open__"))
+
+    def __init__(self, board):
+        if type(board) is BoardView:
+            board = board._board
+        object.__setattr__(self, "_board", board)
+        object.__setattr__(self, "_private", False)
+
+    @property
+    def __class__(self):
+        return self._board.__class__
+
+    def replace(self, players=None, instrumentation=None):
+        """
+        Return a view of the same position in which every player `p` found
+        in the dict `players` is replaced by `players[p]` and whose board
+        reports its operations to `instrumentation`. The new view shares
+        the board state with this one until it is written to.
+        """
+        board = self._board
+        other = object.__new__(board.__class__)
+        other.__dict__.update(board.__dict__)
+        if players:
+            swap = lambda player: players.get(player, player)
+            for name in ("__player_1__", "__player_2__", "__active_player__",
+                         "__inactive_player__"):
+                setattr(other, name, swap(getattr(board, name)))
+            other.__last_player_move__ = {swap(player): move for player, move
+                                          in board.__last_player_move__.items()}
+            other.__player_symbols__ = {swap(player): symbol for player, symbol
+                                        in board.__player_symbols__.items()}
+        other.instrumentation = instrumentation
+        return BoardView(other)
+
+    def materialize(self):
+        """ Switch the view to a private copy of the board and return it. """
+        if not self._private:
+            object.__setattr__(self, "_board", self._board.copy())
+            object.__setattr__(self, "_private", True)
+        return self._board
+
+    def __getattr__(self, name):
+        if name in BoardView.READERS:
+            return getattr(self._board, name)
+        return getattr(self.materialize(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self.materialize(), name, value)
+
+    def __delattr__(self, name):
+        delattr(self.materialize(), name)
+
+    def __reduce_ex__(self, protocol):
+        """ Pickling and copy.deepcopy() give the board itself. """
+        return self._board.__reduce_ex__(protocol)
+
 
 class Board(object):
     """
     Implement a model for the game Isolation assuming each player moves like
-    a knight in chess.
+    a knight in chess, or according to another movement rule.
 
     Parameters
     ----------
@@ -37,13 +258,20 @@ class Board(object):
 
     height : int (optional)
         The number of rows that the board should have.
+
+    rule : str, `isolation.rules.MoveRule` or list<(int, int)> (optional)
+        How the players move: "knight" (the default), "king", "queen", a
+        `MoveRule` or a list of (row, col) offsets (see
+        `isolation.rules.get_rule`).
     """
     BLANK = 0
     NOT_MOVED = None
 
-    def __init__(self, player_1, player_2, width=7, height=7):
+    def __init__(self, player_1, player_2, width=7, height=7, rule=None):
         self.width = width
         self.height = height
+        self.rule = get_rule(rule)
+        self.__move_tables__ = self.rule.tables(width, height)
         self.move_count = 0
         self.__player_1__ = player_1
         self.__player_2__ = player_2
@@ -52,6 +280,7 @@ class Board(object):
         self.__board_state__ = [[Board.BLANK for i in range(width)] for j in range(height)]
         self.__last_player_move__ = {player_1: Board.NOT_MOVED, player_2: Board.NOT_MOVED}
         self.__player_symbols__ = {Board.BLANK: Board.BLANK, player_1: 1, player_2: 2}
+        self.instrumentation = None
 
     @property
     def active_player(self):
@@ -91,15 +320,39 @@ class Board(object):
             return self.__active_player__
         raise RuntimeError("`player` must be an object registered as a player in the current game.")
 
+    def instrument(self, hook=None):
+        """
+        Start counting the operations on this board and on every board
+        copied from it; return the `Instrumentation` holding the counts.
+        Boards without instrumentation (the default) only pay for a test of
+        the `instrumentation` attribute.
+
+        Parameters
+        ----------
+        hook : callable (optional)
+            Called as hook(event, board, arg) on every event (see
+            `Instrumentation`).
+
+        Returns
+        ----------
+        `isolation.Instrumentation`
+        """
+        self.instrumentation = Instrumentation(hook)
+        return self.instrumentation
+
     def copy(self):
-        """ Return a deep copy of the current board. """
-        new_board = Board(self.__player_1__, self.__player_2__, width=self.width, height=self.height)
+        """ Return a deep copy of the current board, of the same class. """
+        if self.instrumentation is not None:
+            self.instrumentation.record("copy", self)
+        new_board = self.__class__(self.__player_1__, self.__player_2__, width=self.width,
+                                   height=self.height, rule=self.rule)
         new_board.move_count = self.move_count
         new_board.__active_player__ = self.__active_player__
         new_board.__inactive_player__ = self.__inactive_player__
         new_board.__last_player_move__ = copy(self.__last_player_move__)
         new_board.__player_symbols__ = copy(self.__player_symbols__)
         new_board.__board_state__ = deepcopy(self.__board_state__)
+        new_board.instrumentation = self.instrumentation
         return new_board
 
     def forecast_move(self, move):
@@ -118,6 +371,8 @@ class Board(object):
         `isolation.Board`
             A deep copy of the board with the input move applied.
         """
+        if self.instrumentation is not None:
+            self.instrumentation.record("forecast_move", self, move)
         new_board = self.copy()
         new_board.apply_move(move)
         return new_board
@@ -183,6 +438,8 @@ class Board(object):
         """
         if player is None:
             player = self.active_player
+        if self.instrumentation is not None:
+            self.instrumentation.record("get_legal_moves", self, player)
         return self.__get_moves__(self.__last_player_move__[player])
 
     def apply_move(self, move):
@@ -204,6 +461,8 @@ class Board(object):
         self.__board_state__[row][col] = self.__player_symbols__[self.active_player]
         self.__active_player__, self.__inactive_player__ = self.__inactive_player__, self.__active_player__
         self.move_count += 1
+        if self.instrumentation is not None:
+            self.instrumentation.record("apply_move", self, move)
 
     def is_winner(self, player):
         """ Test whether the specified player has won the game. """
@@ -249,22 +508,142 @@ class Board(object):
 
     def __get_moves__(self, move):
         """
-        Generate the list of possible moves for an L-shaped motion (like a
-        knight in chess).
+        Generate the list of possible moves from `move` under the movement
+        rule of the board (by default an L-shaped motion, like a knight in
+        chess), read from its precomputed move tables.
         """
 
         if move == Board.NOT_MOVED:
             return self.get_blank_spaces()
 
-        r, c = move
+        state = self.__board_state__
+        tables = self.__move_tables__
+        index = move[0] * self.width + move[1]
 
-        directions = [(-2, -1), (-2, 1), (-1, -2), (-1, 2),
-                      (1, -2),  (1, 2), (2, -1),  (2, 1)]
+        if not tables.sliding:
+            return [(r, c) for _, (r, c) in tables.steps[index] if state[r][c] == Board.BLANK]
 
-        valid_moves = [(r+dr,c+dc) for dr, dc in directions if self.move_is_legal((r+dr, c+dc))]
+        # The rows hold no bitmask of the open cells, and building one for
+        # `tables.moves` reads every cell of the board, so this walks each
+        # ray up to its first blocked cell instead. BitBoard keeps the mask
+        # up to date and uses the bit tricks of the tables.
+        valid_moves = []
+        for _, _, ray, _ in tables.rays[index]:
+            for r, c in ray:
+                if state[r][c] != Board.BLANK:
+                    break
+                valid_moves.append((r, c))
 
         return valid_moves
 
+    @staticmethod
+    def record_size(width=7, height=7):
+        """ Number of bytes of `to_bytes` for a width x height board. """
+        return (width * height + 7) // 8 + 2 * _location_size(width, height) + 1
+
+    def to_bytes(self):
+        """
+        Encode the game state in `record_size(width, height)` bytes: the
+        bitmap of the blocked cells (bit `row * width + col`, little-endian),
+        the cell index of player 1 and of player 2 (all bits set if the
+        player hasn't moved yet; one byte each up to 255 cells, two bytes
+        up to 65535 cells) and a last byte that is 0 if player 1 is to move
+        and 1 otherwise.
+
+        The size of the board, the players and the movement rule are not
+        part of the encoding; `from_bytes` takes them as arguments.
+
+        Returns
+        ----------
+        bytes
+        """
+        blocked = 0
+        for i, row in enumerate(self.__board_state__):
+            base = i * self.width
+            for j, cell in enumerate(row):
+                if cell != Board.BLANK:
+                    blocked |= 1 << (base + j)
+        return self.__pack__(blocked)
+
+    @classmethod
+    def from_bytes(cls, data, player_1, player_2, width=7, height=7, rule=None):
+        """
+        Rebuild a board from the output of `to_bytes`.
+
+        Parameters
+        ----------
+        data : bytes-like
+            An encoded game state.
+
+        player_1, player_2 : object
+            The players registered as player 1 and player 2.
+
+        width, height, rule : (optional)
+            The size and the movement rule of the encoded board.
+
+        Returns
+        ----------
+        `isolation.Board`
+            A board of this class; its move count is the number of blocked
+            cells.
+        """
+        game = cls(player_1, player_2, width=width, height=height, rule=rule)
+        blocked, locations, p1_active = game.__unpack__(data)
+        game.__place__(blocked, locations)
+        if not p1_active:
+            game.__active_player__, game.__inactive_player__ = player_2, player_1
+        game.move_count = bin(blocked).count("1")
+        return game
+
+    def __pack__(self, blocked):
+        """ The `to_bytes` encoding of the board given its blocked cells. """
+        width, height = self.width, self.height
+        size = _location_size(width, height)
+        data = blocked.to_bytes((width * height + 7) // 8, "little")
+        for player in (self.__player_1__, self.__player_2__):
+            move = self.__last_player_move__[player]
+            index = (1 << 8 * size) - 1 if move is Board.NOT_MOVED else move[0] * width + move[1]
+            data += index.to_bytes(size, "little")
+        return data + (b"\x00" if self.__active_player__ == self.__player_1__ else b"\x01")
+
+    def __place__(self, blocked, locations):
+        """
+        Set the blocked cells of a new board from a mask and put player 1
+        and player 2 on the given locations.
+        """
+        symbols = self.__player_symbols__
+        rows = [[Board.BLANK] * self.width for _ in range(self.height)]
+        while blocked:
+            low = blocked & -blocked
+            r, c = divmod(low.bit_length() - 1, self.width)
+            rows[r][c] = symbols[self.__player_1__]
+            blocked ^= low
+        for player, move in zip((self.__player_1__, self.__player_2__), locations):
+            if move is not Board.NOT_MOVED:
+                self.__last_player_move__[player] = move
+                rows[move[0]][move[1]] = symbols[player]
+        self.__board_state__ = rows
+
+    def __unpack__(self, data):
+        """
+        Decode `to_bytes` data for a board of this size into the mask of
+        blocked cells, the locations of both players and whether player 1
+        is to move.
+        """
+        width, height = self.width, self.height
+        data = bytes(data)
+        if len(data) != Board.record_size(width, height):
+            raise ValueError("Expected {} bytes for a {}x{} board, got {}".format(
+                Board.record_size(width, height), width, height, len(data)))
+        size = _location_size(width, height)
+        start = (width * height + 7) // 8
+        locations = []
+        for offset in (start, start + size):
+            index = int.from_bytes(data[offset:offset + size], "little")
+            locations.append(Board.NOT_MOVED if index == (1 << 8 * size) - 1
+                             else divmod(index, width))
+        return int.from_bytes(data[:start], "little"), locations, data[-1] == 0
+
     def print_board(self):
         """DEPRECATED - use Board.to_string()"""
         return self.to_string()
@@ -278,31 +657,24 @@ class Board(object):
         p1_loc = self.__last_player_move__[self.__player_1__]
         p2_loc = self.__last_player_move__[self.__player_2__]
 
-        out = ''
-
-        for i in range(self.height):
-            out += ' | '
-
-            for j in range(self.width):
+        rows = []
 
-                if not self.__board_state__[i][j]:
-                    out += ' '
-                elif p1_loc and i == p1_loc[0] and j == p1_loc[1]:
-                    out += '1'
-                elif p2_loc and i == p2_loc[0] and j == p2_loc[1]:
-                    out += '2'
-                else:
-                    out += '-'
+        for i, row in enumerate(self.__board_state__):
+            cells = ['-' if cell else ' ' for cell in row]
+            if p1_loc and p1_loc[0] == i:
+                cells[p1_loc[1]] = '1'
+            if p2_loc and p2_loc[0] == i:
+                cells[p2_loc[1]] = '2'
+            rows.append(' | ' + ' | '.join(cells) + ' | \n\r')
 
-                out += ' | '
-            out += '\n\r'
+        return ''.join(rows)
 
-        return out
-
-    def play(self, time_limit=TIME_LIMIT_MILLIS):
+    def play(self, time_limit=TIME_LIMIT_MILLIS, move_times=None, time_control=None):
         """
         Execute a match between the players by alternately soliciting them
-        to select a move and applying it in the game.
+        to select a move and applying it in the game. A player that enforces
+        its own deadline (like `remote.ProcessPlayer`) returns
+        `isolation.TIMED_OUT` instead of a move when it misses it.
 
         Parameters
         ----------
@@ -310,6 +682,14 @@ class Board(object):
             The maximum number of milliseconds to allow before timeout
             during each turn.
 
+        move_times : list (optional)
+            If given, the number of milliseconds used by each move is
+            appended to this list, in the same order as the move history.
+
+        time_control : `isolation.TimeControl` (optional)
+            Time budget and clock of the players; overrides `time_limit`.
+            Defaults to a fixed `time_limit` per move on the wall clock.
+
         Returns
         ----------
         (player, list<[(int, int),]>, str)
@@ -317,22 +697,84 @@ class Board(object):
             move history, and a string indicating the reason for losing
             (e.g., timeout or invalid move).
         """
+        match = self.__match(time_limit, move_times, time_control)
+        turn = next(match)
+        while True:
+            player, game_view, legal_player_moves, time_left, _ = turn
+            try:
+                turn = match.send(player.get_move(game_view, legal_player_moves, time_left))
+            except StopIteration as result:
+                return result.value
+
+    async def play_async(self, time_limit=TIME_LIMIT_MILLIS, move_times=None, time_control=None):
+        """
+        Coroutine version of `play` for running many games in one event
+        loop.
+
+        A player whose `get_move_async` method or `get_move` method is a
+        coroutine function is awaited with the arguments of get_move(); it
+        is cancelled when its allowance runs out on the wall clock and then
+        loses on timeout. Other players are called as in `play` and block
+        the event loop while they think. The parameters and the result are
+        those of `play`.
+        """
+        match = self.__match(time_limit, move_times, time_control)
+        turn = next(match)
+        while True:
+            player, game_view, legal_player_moves, time_left, allowance = turn
+            get_move = getattr(player, "get_move_async", None)
+            if get_move is None and inspect.iscoroutinefunction(player.get_move):
+                get_move = player.get_move
+            if get_move is None:
+                curr_move = player.get_move(game_view, legal_player_moves, time_left)
+            else:
+                try:
+                    curr_move = await asyncio.wait_for(
+                        get_move(game_view, legal_player_moves, time_left),
+                        max(allowance, 0.) / 1000.)
+                except asyncio.TimeoutError:
+                    curr_move = TIMED_OUT
+            try:
+                turn = match.send(curr_move)
+            except StopIteration as result:
+                return result.value
+
+    def __match(self, time_limit, move_times, time_control):
+        """
+        The rules of a match shared by `play` and `play_async`: a generator
+        yielding (player, board view, legal moves, time_left, allowance)
+        for every turn, to be sent the player's move (or TIMED_OUT for a
+        move cut off on timeout), and returning the result of the match.
+        """
         move_history = []
 
-        curr_time_millis = lambda: 1000 * timeit.default_timer()
+        if time_control is None:
+            time_control = TimeControl(move_millis=time_limit)
+        curr_time_millis = time_control.now
+        banks = {self.__player_1__: time_control.start(),
+                 self.__player_2__: time_control.start()}
 
         while True:
 
             legal_player_moves = self.get_legal_moves()
 
-            game_copy = self.copy()
+            game_view = BoardView(self)
 
+            allowance = time_control.allowance(banks[self.active_player])
+            budget = time_control.budget(banks[self.active_player])
             move_start = curr_time_millis()
-            time_left = lambda : time_limit - (curr_time_millis() - move_start)
-            curr_move = self.active_player.get_move(game_copy, legal_player_moves, time_left)
-            move_end = time_left()
-
-            # print move_end
+            time_left = lambda : budget - (curr_time_millis() - move_start)
+            curr_move = yield self.active_player, game_view, legal_player_moves, time_left, allowance
+            move_end = allowance - (curr_time_millis() - move_start)
+            cancelled = curr_move is TIMED_OUT
+            if cancelled:
+                curr_move = None
+                move_end = min(move_end, 0.)
+            banks[self.active_player] = time_control.update(banks[self.active_player],
+                                                            allowance - move_end)
+
+            if move_times is not None:
+                move_times.append(allowance - move_end)
 
             if curr_move is None:
                 curr_move = Board.NOT_MOVED
@@ -342,7 +784,7 @@ class Board(object):
             else:
                 move_history[-1].append(curr_move)
 
-            if move_end < 0:
+            if move_end < 0 or cancelled:
                 return self.__inactive_player__, move_history, "timeout"
 
             if curr_move not in legal_player_moves:
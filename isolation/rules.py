@@ -0,0 +1,196 @@
+"""
+Movement rules of the pieces.
+
+A `MoveRule` is a list of (row, col) offsets, either taken once per move
+(step rules such as the knight and the king) or repeated along a ray until
+the piece reaches the edge of the board or the cell before a blocked one
+(sliding rules such as the queen). The first time a rule is used on a board
+size it is compiled into `MoveTables`, with the step destinations and the
+rays of every cell precomputed, so generating moves never checks bounds or
+walks offsets:
+
+    step rules     the destinations of a cell, filtered by the open cells
+    sliding rules  one bitmask per ray; the reachable part of a ray is cut
+                   at its first blocked cell with a few integer operations
+
+Boards take the rule as a parameter:
+
+    Board(player_1, player_2, rule="queen")
+    Board(player_1, player_2, rule=MoveRule("camel", [(3, 1), (1, 3), ...]))
+"""
+
+
+class MoveTables(object):
+    """
+    The moves of a rule on a width x height board, indexed by the cell
+    index `row * width + col`.
+
+    Attributes
+    ----------
+    steps : list<list<(int, (int, int))>>
+        (bit, cell) of the destinations of a single step from every cell,
+        in the order of the rule's offsets (for sliding rules: the first
+        cell of every ray).
+
+    rays : list<list<(int, bool, list<(int, int)>, dict)>>
+        For sliding rules, the rays leaving every cell as (mask, whether
+        the ray runs towards higher indexes, cells from nearest to
+        farthest, {cell index: distance - 1 along the ray}); empty lists
+        for step rules.
+
+    targets : list<int>
+        Mask of the cells reachable from every cell on an empty board.
+
+    cells : list<(int, int)>
+        The cell of every index.
+
+    order : list<(int, (int, int))>
+        (bit, cell) of every cell in column-major order, the order of
+        `Board.get_blank_spaces`.
+    """
+
+    def __init__(self, rule, width, height):
+        self.width = width
+        self.height = height
+        self.sliding = rule.sliding
+        self.cells = [(r, c) for r in range(height) for c in range(width)]
+        self.order = [(1 << (r * width + c), (r, c)) for c in range(width) for r in range(height)]
+        self.steps = []
+        self.rays = []
+        self.targets = []
+        for r, c in self.cells:
+            steps, rays, targets = [], [], 0
+            for dr, dc in rule.offsets:
+                ray = []
+                row, col = r + dr, c + dc
+                while 0 <= row < height and 0 <= col < width:
+                    ray.append((row, col))
+                    if not rule.sliding:
+                        break
+                    row, col = row + dr, col + dc
+                if not ray:
+                    continue
+                mask = 0
+                for row, col in ray:
+                    mask |= 1 << (row * width + col)
+                steps.append((1 << (ray[0][0] * width + ray[0][1]), ray[0]))
+                if rule.sliding:
+                    position = {row * width + col: k for k, (row, col) in enumerate(ray)}
+                    rays.append((mask, dr * width + dc > 0, ray, position))
+                targets |= mask
+            self.steps.append(steps)
+            self.rays.append(rays)
+            self.targets.append(targets)
+
+    def move_mask(self, index, open_cells):
+        """ Return the mask of the cells a piece on `index` can move to. """
+        if not self.sliding:
+            return sum(bit for bit, _ in self.steps[index] if open_cells & bit)
+        moves = 0
+        for mask, ascending, _, _ in self.rays[index]:
+            blocked = mask & ~open_cells
+            if not blocked:
+                moves |= mask
+            elif ascending:
+                # cells below the lowest blocked one
+                moves |= mask & ((blocked & -blocked) - 1)
+            else:
+                # cells above the highest blocked one
+                moves |= mask & ~((1 << blocked.bit_length()) - 1)
+        return moves
+
+    def moves(self, index, open_cells):
+        """
+        Return the cells a piece on `index` can move to, ray by ray from the
+        nearest cell for sliding rules.
+        """
+        if not self.sliding:
+            return [cell for bit, cell in self.steps[index] if open_cells & bit]
+        moves = []
+        for mask, ascending, ray, position in self.rays[index]:
+            blocked = mask & ~open_cells
+            if not blocked:
+                moves.extend(ray)
+            else:
+                first = (blocked & -blocked if ascending else blocked).bit_length() - 1
+                moves.extend(ray[:position[first]])
+        return moves
+
+
+class MoveRule(object):
+    """
+    A movement rule of the pieces.
+
+    Parameters
+    ----------
+    name : str
+        Name of the rule.
+
+    offsets : list<(int, int)>
+        The (row, col) offset of every move; legal moves are listed in this
+        order.
+
+    sliding : bool (optional)
+        If True every offset may be repeated along a ray, like the moves of
+        a queen, as long as the cells are open.
+    """
+
+    def __init__(self, name, offsets, sliding=False):
+        self.name = name
+        self.offsets = [tuple(offset) for offset in offsets]
+        self.sliding = sliding
+        self._tables = {}
+
+    def tables(self, width, height):
+        """ Return the `MoveTables` of the rule on a width x height board. """
+        tables = self._tables.get((width, height))
+        if tables is None:
+            tables = self._tables[(width, height)] = MoveTables(self, width, height)
+        return tables
+
+    def __getstate__(self):
+        """ The tables are rebuilt where they are needed. """
+        state = self.__dict__.copy()
+        state['_tables'] = {}
+        return state
+
+    def __eq__(self, other):
+        return isinstance(other, MoveRule) and \
+            (self.offsets, self.sliding) == (other.offsets, other.sliding)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((tuple(self.offsets), self.sliding))
+
+    def __repr__(self):
+        return "MoveRule({!r})".format(self.name)
+
+
+KNIGHT = MoveRule("knight", [(-2, -1), (-2, 1), (-1, -2), (-1, 2),
+                             (1, -2), (1, 2), (2, -1), (2, 1)])
+
+KING = MoveRule("king", [(-1, -1), (-1, 0), (-1, 1), (0, -1),
+                         (0, 1), (1, -1), (1, 0), (1, 1)])
+
+QUEEN = MoveRule("queen", KING.offsets, sliding=True)
+
+RULES = {rule.name: rule for rule in (KNIGHT, KING, QUEEN)}
+
+
+def get_rule(rule=None):
+    """
+    Return the `MoveRule` named by `rule`: None for the knight, a name from
+    RULES, a `MoveRule`, or a list of offsets for a custom step rule.
+    """
+    if rule is None:
+        return KNIGHT
+    if isinstance(rule, MoveRule):
+        return rule
+    if isinstance(rule, str):
+        if rule not in RULES:
+            raise ValueError("Unknown movement rule {!r}; expected one of {}".format(
+                rule, ", ".join(sorted(RULES))))
+        return RULES[rule]
+    return MoveRule("custom", rule)
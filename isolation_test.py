@@ -0,0 +1,236 @@
+"""
+Tests for the game loop and the extensions of `isolation.Board`
+"""
+
+import time
+import unittest
+
+import isolation
+
+from sample_players import RandomPlayer
+
+
+class SleepyPlayer(RandomPlayer):
+    """ Random player that sleeps for a fixed time before every move """
+
+    def __init__(self, millis):
+        self.millis = millis
+
+    def get_move(self, game, legal_moves, time_left):
+        time.sleep(self.millis / 1000.)
+        return super(SleepyPlayer, self).get_move(game, legal_moves, time_left)
+
+
+class TimeControlTest(unittest.TestCase):
+
+    def play(self, player_1, player_2, time_control):
+        game = isolation.Board(player_1, player_2)
+        game.apply_move((3, 3))
+        game.apply_move((0, 0))
+        move_times = []
+        winner, history, termination = game.play(time_control=time_control, move_times=move_times)
+        return winner, termination, move_times
+
+    def test_wall_clock(self):
+        sleepy, fast = SleepyPlayer(30), RandomPlayer()
+        winner, termination, _ = self.play(sleepy, fast, isolation.TimeControl(move_millis=20))
+        self.assertEqual((winner, termination), (fast, "timeout"))
+
+    def test_cpu_clock(self):
+        """ Sleeping costs no CPU time, so the sleepy player never times out """
+        sleepy, fast = SleepyPlayer(30), RandomPlayer()
+        for clock in ("thread", "process"):
+            _, termination, move_times = self.play(
+                sleepy, fast, isolation.TimeControl(move_millis=20, clock=clock))
+            self.assertEqual(termination, "illegal move")
+            self.assertTrue(all(t < 20 for t in move_times))
+
+    def test_time_bank(self):
+        """ A 50ms bank with a 12ms increment pays for two 30ms moves """
+        now = [0.]
+        isolation.isolation.CLOCKS["fake"] = lambda: now[0]
+        self.addCleanup(isolation.isolation.CLOCKS.pop, "fake")
+
+        class SlowPlayer(RandomPlayer):
+            def get_move(self, game, legal_moves, time_left):
+                now[0] += 0.030
+                return super(SlowPlayer, self).get_move(game, legal_moves, time_left)
+
+        slow, fast = SlowPlayer(), RandomPlayer()
+        control = isolation.TimeControl(base_millis=50, increment_millis=12, clock="fake")
+        winner, termination, move_times = self.play(slow, fast, control)
+        self.assertEqual((winner, termination), (fast, "timeout"))
+        # the slow player moves first: bank 50 -> 32 -> 14 -> timeout
+        self.assertEqual(len(move_times[::2]), 3)
+
+    def test_soft_budget(self):
+        """ An iterative deepening agent doesn't spend the bank on one move """
+        from game_agent import CustomPlayer
+        from sample_players import improved_score
+
+        agent = CustomPlayer(score_fn=improved_score, method='alphabeta')
+        control = isolation.TimeControl(base_millis=1000, increment_millis=20,
+                                        clock="process", moves_to_go=20)
+        self.assertEqual(control.budget(1000), 70)
+        self.assertEqual(control.budget(10), 10)
+        game = isolation.Board(agent, RandomPlayer())
+        game.apply_move((3, 3))
+        game.apply_move((0, 0))
+        move_times = []
+        game.play(time_control=control, move_times=move_times)
+        self.assertLess(move_times[0], 200)
+        self.assertLessEqual(max(move_times[::2]), 200)
+
+    def test_bad_clock(self):
+        with self.assertRaises(ValueError):
+            isolation.TimeControl(clock="sundial")
+
+
+class InstrumentationTest(unittest.TestCase):
+
+    def test_disabled_by_default(self):
+        game = isolation.Board("player 1", "player 2")
+        self.assertIsNone(game.instrumentation)
+        self.assertIsNone(game.forecast_move((3, 3)).instrumentation)
+
+    def test_counts_shared_by_copies(self):
+        events = []
+        game = isolation.Board("player 1", "player 2")
+        counts = game.instrument(lambda event, board, arg: events.append((event, arg))).counts
+        child = game.forecast_move((3, 3))
+        grandchild = child.forecast_move((0, 0))
+        grandchild.get_legal_moves()
+        self.assertIs(grandchild.instrumentation, game.instrumentation)
+        self.assertEqual(counts, {"forecast_move": 2, "copy": 2, "apply_move": 2,
+                                  "get_legal_moves": 1})
+        self.assertEqual(events[:3], [("forecast_move", (3, 3)), ("copy", None),
+                                      ("apply_move", (3, 3))])
+        self.assertEqual(events[-1], ("get_legal_moves", "player 1"))
+
+    def test_search_counts(self):
+        from game_agent import CustomPlayer
+        from sample_players import improved_score
+
+        player = CustomPlayer(search_depth=2, score_fn=improved_score, iterative=False)
+        player.time_left = lambda: float("inf")
+        game = isolation.Board(player, "opponent")
+        game.apply_move((3, 3))
+        game.apply_move((0, 0))
+        instrumentation = game.instrument()
+        player.minimax(game, 2)
+        counts = instrumentation.counts
+        self.assertEqual(counts["forecast_move"], counts["copy"])
+        # every second-ply node is a leaf
+        leaves = sum(len(game.forecast_move(move).get_legal_moves())
+                     for move in game.get_legal_moves())
+        self.assertEqual(counts["score"], leaves)
+        instrumentation.reset()
+        self.assertEqual(sum(instrumentation.counts.values()), 0)
+
+
+class MutatingPlayer(RandomPlayer):
+    """ Random player that scribbles on the board it is given """
+
+    def get_move(self, game, legal_moves, time_left):
+        self.is_board = isinstance(game, isolation.Board)
+        for move in legal_moves:
+            game.apply_move(move)
+        game.__board_state__[0][0] = 1
+        game.move_count = -1
+        return super(MutatingPlayer, self).get_move(game, legal_moves, time_left)
+
+
+class BoardViewTest(unittest.TestCase):
+
+    def setUp(self):
+        self.game = isolation.Board("player 1", "player 2")
+        self.game.apply_move((3, 3))
+        self.game.apply_move((0, 1))
+
+    def test_reads_without_copy(self):
+        counts = self.game.instrument().counts
+        view = isolation.BoardView(self.game)
+        self.assertIsInstance(view, isolation.Board)
+        self.assertEqual(view.get_legal_moves(), self.game.get_legal_moves())
+        self.assertEqual(view.to_string(), self.game.to_string())
+        self.assertEqual((view.active_player, view.move_count, view.width),
+                         ("player 1", 2, 7))
+        self.assertEqual(counts["copy"], 0)
+        child = view.forecast_move((1, 2))
+        self.assertIs(type(child), isolation.Board)
+        self.assertEqual(counts["copy"], 1)
+
+    def test_copy_on_write(self):
+        expected = self.game.to_string()
+        view = isolation.BoardView(self.game)
+        view.apply_move((1, 2))
+        view.__last_player_move__["player 1"] = (6, 6)
+        view.width = 3
+        self.assertEqual(self.game.to_string(), expected)
+        self.assertEqual((self.game.move_count, self.game.width), (2, 7))
+        self.assertEqual((view.move_count, view.width), (3, 3))
+
+    def test_every_other_method_copies(self):
+        """ Readers leave the view shared, anything else copies the board """
+        arguments = {"get_opponent": ("player 1",), "forecast_move": ((1, 2),),
+                     "move_is_legal": ((1, 2),), "get_player_location": ("player 1",),
+                     "is_winner": ("player 1",), "is_loser": ("player 1",),
+                     "utility": ("player 1",)}
+        for board_class in (isolation.Board, isolation.BitBoard):
+            game = board_class("player 1", "player 2")
+            game.apply_move((3, 3))
+            game.apply_move((0, 1))
+            expected = (game.to_bytes(), game.get_legal_moves(), game.move_count)
+            methods = [name for name in dir(board_class)
+                       if callable(getattr(board_class, name)) and name not in dir(object)]
+            self.assertIn("__place__", methods)
+            for name in methods:
+                view = isolation.BoardView(game)
+                if name in isolation.BoardView.READERS:
+                    getattr(view, name)(*arguments.get(name, ()))
+                    self.assertFalse(view._private, name)
+                else:
+                    getattr(view, name)
+                    self.assertTrue(view._private, name)
+                self.assertEqual((game.to_bytes(), game.get_legal_moves(), game.move_count),
+                                 expected, name)
+            isolation.BoardView(game).__place__(0, [None, None])
+            self.assertEqual(game.get_legal_moves(), expected[1])
+
+    def test_replace(self):
+        """ Other players and instrumentation on a view of the same position """
+        for board_class in (isolation.Board, isolation.BitBoard):
+            game = board_class("player 1", "player 2")
+            game.apply_move((3, 3))
+            game.apply_move((0, 1))
+            expected = game.to_bytes()
+            instrumentation = isolation.Instrumentation()
+            view = isolation.BoardView(game).replace({"player 1": "agent"}, instrumentation)
+            self.assertIsInstance(view, board_class)
+            self.assertEqual((view.active_player, view.inactive_player), ("agent", "player 2"))
+            self.assertEqual(view.get_player_location("agent"), (3, 3))
+            self.assertEqual(view.get_legal_moves(), game.get_legal_moves())
+            self.assertFalse(view._private)
+            self.assertEqual(instrumentation.counts["get_legal_moves"], 1)
+            view.apply_move((1, 2))
+            self.assertEqual(view.get_player_location("agent"), (1, 2))
+            self.assertEqual(game.to_bytes(), expected)
+            self.assertIsNone(game.instrumentation)
+            self.assertEqual(game.active_player, "player 1")
+
+    def test_play_isolates_players(self):
+        """ Players mutating their view don't change the game """
+        player_1, player_2 = MutatingPlayer(), MutatingPlayer()
+        for board_class in (isolation.Board, isolation.BitBoard):
+            game = board_class(player_1, player_2)
+            winner, history, termination = game.play(time_limit=1000)
+            self.assertEqual(termination, "illegal move")
+            self.assertTrue(player_1.is_board)
+            replay = board_class(player_1, player_2)
+            for move in sum(history, [])[:-1]:
+                replay.apply_move(move)
+            self.assertEqual(replay.to_string(), game.to_string())
+
+
+if __name__ == '__main__':
+    unittest.main()
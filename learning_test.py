@@ -0,0 +1,96 @@
+"""
+Tests for the learned evaluation function
+"""
+
+import random
+import unittest
+
+import numpy as np
+
+import isolation
+import game_agent
+import learning
+
+from isolation import bitboard
+from bitboard_test import random_game
+
+
+class LearningTest(unittest.TestCase):
+
+    def test_features_match_board(self):
+        """ Vectorized features agree with the Board API and the flood fill """
+        games = [random_game(7, 7, plies, plies) for plies in range(1, 16)]
+        features, _, _ = learning.extract_features(games, "p1")
+        for game, row in zip(games, features):
+            own, opp = bitboard.territory(game, "p1")
+            self.assertEqual(row[learning.FEATURES.index("own_moves")],
+                             len(game.get_legal_moves("p1")))
+            self.assertEqual(row[learning.FEATURES.index("opp_moves")],
+                             len(game.get_legal_moves("p2")))
+            self.assertEqual(row[learning.FEATURES.index("own_territory")], own)
+            self.assertEqual(row[learning.FEATURES.index("opp_territory")], opp)
+
+    def test_features_follow_rule(self):
+        """ Moves are counted with the rule of the board; sliding rules raise """
+        rng = random.Random(0)
+        game = isolation.Board("p1", "p2", rule="king")
+        for _ in range(6):
+            game.apply_move(rng.choice(game.get_legal_moves()))
+        features, _, _ = learning.extract_features([game], "p1")
+        self.assertEqual(features[0][learning.FEATURES.index("own_moves")],
+                         len(game.get_legal_moves("p1")))
+        self.assertEqual(features[0][learning.FEATURES.index("opp_moves")],
+                         len(game.get_legal_moves("p2")))
+        with self.assertRaises(ValueError):
+            learning.learned_score(isolation.Board("p1", "p2", rule="queen"), "p1")
+
+    def test_batch_matches_single(self):
+        """ score_batch returns the same values as scoring one board at a time """
+        games = [random_game(7, 7, plies, 100 + plies) for plies in range(2, 30, 3)]
+        batch = learning.learned_score.score_batch(games, "p2")
+        single = [learning.learned_score(game, "p2") for game in games]
+        np.testing.assert_allclose(batch, single)
+
+    def test_fit_logistic(self):
+        """ Newton's method recovers a separating direction """
+        rng = np.random.RandomState(0)
+        X = np.column_stack([np.ones(500), rng.randn(500)])
+        y = (X[:, 1] + 0.1 * rng.randn(500) > 0).astype(float)
+        weights = learning.fit_logistic(X, y)
+        self.assertGreater(weights[1], 1.)
+
+    def test_custom_player(self):
+        """ The evaluator plugs into CustomPlayer as a score_fn """
+        for method in ("minimax", "alphabeta"):
+            agent = game_agent.CustomPlayer(3, learning.learned_score, False, method)
+            game = isolation.Board(agent, "opponent")
+            game.apply_move((3, 3))
+            game.apply_move((0, 0))
+            legal_moves = game.get_legal_moves()
+            self.assertIn(agent.get_move(game, legal_moves, lambda: 1e3), legal_moves)
+
+    def test_beats_improved_score(self):
+        """ At equal fixed depth the shipped weights win most games """
+        from sample_players import improved_score
+
+        rng = random.Random(0)
+        wins = 0
+        for _ in range(20):
+            game = isolation.Board("p1", "p2")
+            opening = [rng.choice(game.get_legal_moves())]
+            game.apply_move(opening[0])
+            opening.append(rng.choice(game.get_legal_moves()))
+            for learned_first in (True, False):
+                learned = game_agent.CustomPlayer(2, learning.learned_score, False, "alphabeta")
+                improved = game_agent.CustomPlayer(2, improved_score, False, "alphabeta")
+                players = (learned, improved) if learned_first else (improved, learned)
+                game = isolation.Board(*players)
+                for move in opening:
+                    game.apply_move(move)
+                winner, _, _ = game.play(time_limit=float("inf"))
+                wins += winner is learned
+        self.assertGreater(wins, 26)
+
+
+if __name__ == '__main__':
+    unittest.main()
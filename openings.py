@@ -0,0 +1,148 @@
+"""
+Generate a suite of balanced openings for tournaments.
+
+An opening is the pair of initial moves (player 1, player 2) that
+`tournament.play_match` otherwise draws at random. The generator enumerates
+every pair, keeps one representative of each class of pairs related by a
+symmetry of the board (rotations and reflections), and can drop lopsided
+openings whose fixed-depth alpha-beta value for the player to move exceeds a
+threshold, including forced wins. The suite is written as JSON:
+
+    {"width": 7, "height": 7, "depth": 6, "max_score": 0.0,
+     "openings": [[[0, 0], [0, 1]], ...]}
+
+and `tournament.py --openings FILE` plays match k from opening k, so every
+run covers the same pairings.
+
+    python openings.py --depth 6 --max-score 0 --output openings.json
+"""
+
+import argparse
+import json
+import math
+import random
+
+from isolation import Board
+from game_agent import CustomPlayer
+from sample_players import improved_score
+
+
+def symmetries(width, height):
+    """
+    Return the symmetries of a width x height board as functions mapping a
+    (row, col) cell to its image; 8 for square boards, 4 otherwise.
+    """
+    maps = [lambda r, c: (r, c),
+            lambda r, c: (height - 1 - r, c),
+            lambda r, c: (r, width - 1 - c),
+            lambda r, c: (height - 1 - r, width - 1 - c)]
+    if width == height:
+        maps += [lambda r, c: (c, r),
+                 lambda r, c: (width - 1 - c, r),
+                 lambda r, c: (c, height - 1 - r),
+                 lambda r, c: (width - 1 - c, height - 1 - r)]
+    return maps
+
+
+def canonical(opening, width, height):
+    """ Return the smallest image of an opening under the board symmetries. """
+    return min(tuple(f(*move) for move in opening) for f in symmetries(width, height))
+
+
+def enumerate_openings(width=7, height=7):
+    """
+    Return one representative of every class of symmetric openings, in
+    sorted order.
+    """
+    cells = [(r, c) for r in range(height) for c in range(width)]
+    return sorted(set(canonical((m1, m2), width, height)
+                      for m1 in cells for m2 in cells if m1 != m2))
+
+
+def opening_score(opening, width=7, height=7, depth=6, score_fn=improved_score):
+    """
+    Return the fixed-depth alpha-beta value of the position after `opening`
+    for player 1, who is to move.
+    """
+    player = CustomPlayer(search_depth=depth, score_fn=score_fn, iterative=False,
+                          method='alphabeta')
+    player.time_left = lambda: float("inf")
+    game = Board(player, "opponent", width=width, height=height)
+    for move in opening:
+        game.apply_move(move)
+    score, _ = player.alphabeta(game, depth)
+    return score
+
+
+def generate(width=7, height=7, depth=None, max_score=None):
+    """
+    Build an opening suite.
+
+    Parameters
+    ----------
+    width, height : int (optional)
+        Board size.
+
+    depth : int (optional)
+        Search depth used to evaluate every opening; no filtering if None.
+
+    max_score : float (optional)
+        Drop the openings whose absolute value at `depth` exceeds this (only
+        forced wins and losses are dropped if None).
+
+    Returns
+    ----------
+    dict
+        The suite, in the format written by `save`.
+    """
+    openings = enumerate_openings(width, height)
+    if depth is not None:
+        if max_score is None:
+            keep = lambda score: not math.isinf(score)
+        else:
+            keep = lambda score: abs(score) <= max_score
+        openings = [o for o in openings if keep(opening_score(o, width, height, depth))]
+    return {"width": width, "height": height, "depth": depth, "max_score": max_score,
+            "openings": [[list(m) for m in o] for o in openings]}
+
+
+def save(suite, path):
+    with open(path, "w") as f:
+        json.dump(suite, f, indent=1)
+
+
+def load(path, width=7, height=7):
+    """
+    Return the list of openings of a suite file as pairs of moves, checking
+    that the suite was generated for a width x height board.
+    """
+    with open(path) as f:
+        suite = json.load(f)
+    if (suite["width"], suite["height"]) != (width, height):
+        raise ValueError("{} holds openings for a {}x{} board, not {}x{}".format(
+            path, suite["width"], suite["height"], width, height))
+    return [tuple(tuple(m) for m in o) for o in suite["openings"]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a suite of balanced openings.")
+    parser.add_argument("--width", type=int, default=7)
+    parser.add_argument("--height", type=int, default=7)
+    parser.add_argument("--depth", type=int,
+                        help="evaluate every opening with an alpha-beta search of this depth")
+    parser.add_argument("--max-score", type=float,
+                        help="with --depth, keep the openings scored within +/- this value")
+    parser.add_argument("--shuffle", type=int, metavar="SEED",
+                        help="shuffle the suite, so that a prefix of it is a random sample")
+    parser.add_argument("--output", default="openings.json")
+    args = parser.parse_args()
+
+    suite = generate(args.width, args.height, args.depth, args.max_score)
+    if args.shuffle is not None:
+        random.Random(args.shuffle).shuffle(suite["openings"])
+    save(suite, args.output)
+    print("Wrote {} openings to {}".format(len(suite["openings"]), args.output))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Tests for the opening suite generator
+"""
+
+import math
+import os
+import shutil
+import tempfile
+import unittest
+
+import openings
+import tournament
+
+from sample_players import RandomPlayer
+
+
+class OpeningsTest(unittest.TestCase):
+
+    def test_symmetry_classes(self):
+        """ Every opening pair is the image of exactly one representative """
+        for width, height in ((5, 5), (4, 5)):
+            suite = openings.enumerate_openings(width, height)
+            covered = set()
+            for opening in suite:
+                for f in openings.symmetries(width, height):
+                    covered.add(tuple(f(*move) for move in opening))
+            cells = width * height
+            self.assertEqual(len(covered), cells * (cells - 1))
+            self.assertEqual(len(suite), len(set(suite)))
+            self.assertEqual(openings.canonical(suite[-1], width, height), suite[-1])
+
+    def test_filter_and_save(self):
+        tmp = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmp, "suite.json")
+            suite = openings.generate(4, 4, depth=2, max_score=0.)
+            openings.save(suite, path)
+            loaded = openings.load(path, 4, 4)
+            self.assertLess(len(loaded), len(openings.enumerate_openings(4, 4)))
+            for opening in loaded:
+                self.assertEqual(openings.opening_score(opening, 4, 4, depth=2), 0.)
+        finally:
+            shutil.rmtree(tmp)
+
+    def test_drops_forced_openings(self):
+        """ Without max_score only the openings decided at `depth` are dropped """
+        scores = {o: openings.opening_score(o, 4, 3, depth=6)
+                  for o in openings.enumerate_openings(4, 3)}
+        forced = [o for o, score in scores.items() if math.isinf(score)]
+        self.assertTrue(forced)
+        suite = openings.generate(4, 3, depth=6)
+        kept = [tuple(tuple(m) for m in o) for o in suite["openings"]]
+        self.assertEqual(len(kept), len(scores) - len(forced))
+        self.assertFalse(set(kept) & set(forced))
+
+    def test_load_checks_board_size(self):
+        tmp = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmp, "suite.json")
+            openings.save(openings.generate(5, 5), path)
+            self.assertEqual(len(openings.load(path, 5, 5)), len(openings.enumerate_openings(5, 5)))
+            with self.assertRaises(ValueError):
+                openings.load(path)
+        finally:
+            shutil.rmtree(tmp)
+
+    def test_match_jobs_play_every_opening_once(self):
+        """ play_match swaps colours itself, so no opening is repeated """
+        agents = [tournament.Agent(RandomPlayer(), "A"), tournament.Agent(RandomPlayer(), "B")]
+        suite = openings.enumerate_openings(3, 3)
+        jobs = tournament._match_jobs(agents[0], agents[1], 0, 0, len(suite), 1, None,
+                                      openings=suite)
+        self.assertEqual(len(jobs), len(suite))
+        pairs = [(job[6][0], job[9]) for job in jobs]
+        self.assertEqual(len(set(pairs)), len(pairs))
+        self.assertEqual(sorted(job[9] for job in jobs), sorted(suite))
+        self.assertEqual({job[1] for job in jobs}, {0, 1})
+
+    def test_play_match_from_opening(self):
+        records = []
+        tournament.play_match(RandomPlayer(), RandomPlayer(), seed=1, records=records,
+                              opening=((0, 0), (3, 4)))
+        self.assertEqual([r["opening"] for r in records], [[(0, 0), (3, 4)]] * 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+"""
+Perft: count the positions reachable in exactly N plies.
+
+Borrowed from chess engines, `perft(game, depth)` walks the game tree with
+nothing but `get_legal_moves` and `forecast_move`, so the count depends only
+on the rules and the speed only on the move generator and board copies.
+Comparing the counts with KNOWN_COUNTS (computed with the reference `Board`)
+validates a faster board implementation, and nodes per second measures its
+throughput.
+
+Lines ending before depth N add nothing to the count. At depth 1 the legal
+moves are counted without being played ("bulk counting").
+
+    python perft.py --depth 4
+    python perft.py --depth 5 --width 5 --height 5 --board mymodule:FastBoard
+"""
+
+import argparse
+import importlib
+import sys
+import timeit
+
+from isolation import Board
+
+# leaf counts from the empty board, indexed by (width, height) then depth - 1
+KNOWN_COUNTS = {
+    (7, 7): [49, 2352, 11280, 52672, 232416],
+    (5, 5): [25, 600, 2208, 7712, 24160, 73248],
+    (4, 4): [16, 240, 672, 1792, 3456, 6416, 10560, 16384],
+    (3, 3): [9, 72, 112, 160, 128, 96, 64, 32, 0],
+}
+
+# leaf counts from positions in the middle of a game: (size, moves, counts)
+KNOWN_POSITIONS = [
+    ((7, 7), [(3, 3), (0, 0)], [8, 14, 68, 264, 996, 4152, 16440, 62256]),
+]
+
+
+def load_class(spec):
+    """ Return the class named by a "module:Class" string. """
+    module, _, name = spec.partition(":")
+    return getattr(importlib.import_module(module), name)
+
+
+def perft(game, depth):
+    """
+    Count the leaf nodes `depth` plies below `game`.
+
+    Parameters
+    ----------
+    game : `isolation.Board`
+        Any object with the get_legal_moves() and forecast_move() methods of
+        `isolation.Board`.
+
+    depth : int
+        Number of plies; perft(game, 0) is 1.
+
+    Returns
+    ----------
+    int
+        The number of move sequences of length `depth`.
+    """
+    if depth == 0:
+        return 1
+    moves = game.get_legal_moves()
+    if depth == 1:
+        return len(moves)
+    return sum(perft(game.forecast_move(move), depth - 1) for move in moves)
+
+
+def divide(game, depth):
+    """ Return {move: perft count below that move} for every legal move. """
+    return {move: perft(game.forecast_move(move), depth - 1) for move in game.get_legal_moves()}
+
+
+def check(board_class=Board, sizes=None, max_depth=None):
+    """
+    Compare the perft counts of `board_class` with KNOWN_COUNTS and
+    KNOWN_POSITIONS. Raises TypeError if forecast_move() returns boards of
+    another class, since only the root position would then be tested.
+
+    Returns
+    ----------
+    list<((int, int), list, int, int, int)>
+        (size, moves, depth, expected, counted) for every mismatch.
+    """
+    cases = [(size, [], KNOWN_COUNTS[size]) for size in sorted(KNOWN_COUNTS)] + KNOWN_POSITIONS
+    mismatches = []
+    for size, moves, counts in cases:
+        if sizes is not None and size not in sizes:
+            continue
+        for depth, expected in enumerate(counts, 1):
+            if max_depth is not None and depth > max_depth:
+                break
+            game = board_class("player 1", "player 2", width=size[0], height=size[1])
+            for move in moves:
+                game.apply_move(move)
+            child = game.forecast_move(game.get_legal_moves()[0])
+            if type(child) is not board_class:
+                raise TypeError("{}.forecast_move() returns {} boards".format(
+                    board_class.__name__, type(child).__name__))
+            counted = perft(game, depth)
+            if counted != expected:
+                mismatches.append((size, moves, depth, expected, counted))
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Count leaf nodes of the game tree.")
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--width", type=int, default=7)
+    parser.add_argument("--height", type=int, default=7)
+    parser.add_argument("--board", default="isolation:Board", metavar="MODULE:CLASS",
+                        help="board implementation to test (default: %(default)s)")
+    parser.add_argument("--divide", action="store_true",
+                        help="print the count below each first move")
+    parser.add_argument("--check", action="store_true",
+                        help="compare every count in the known counts table")
+    args = parser.parse_args()
+    board_class = load_class(args.board)
+
+    if args.check:
+        mismatches = check(board_class, max_depth=args.depth)
+        for size, moves, depth, expected, counted in mismatches:
+            print("{}x{} after {} depth {}: expected {}, counted {}".format(
+                size[0], size[1], moves, depth, expected, counted))
+        print("FAILED" if mismatches else "OK")
+        sys.exit(1 if mismatches else 0)
+
+    game = board_class("player 1", "player 2", width=args.width, height=args.height)
+    if args.divide:
+        for move, count in sorted(divide(game, args.depth).items()):
+            print("{}: {}".format(move, count))
+    for depth in range(1, args.depth + 1):
+        start = timeit.default_timer()
+        count = perft(game, depth)
+        elapsed = timeit.default_timer() - start
+        known = KNOWN_COUNTS.get((args.width, args.height), [])
+        status = ""
+        if depth <= len(known):
+            status = "ok" if known[depth - 1] == count else "MISMATCH (expected {})".format(
+                known[depth - 1])
+        print("depth {:>2} {:>12} nodes {:>10.0f} nodes/s  {}".format(
+            depth, count, count / elapsed if elapsed else float("inf"), status))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Tests for the perft node counter
+"""
+
+import unittest
+
+import isolation
+import perft
+
+
+class SubclassedBoard(isolation.Board):
+    """ A board subclass must give the same counts """
+    pass
+
+
+class PerftTest(unittest.TestCase):
+
+    def test_known_counts(self):
+        self.assertEqual(perft.check(max_depth=4), [])
+        self.assertEqual(perft.check(SubclassedBoard, sizes=[(4, 4)]), [])
+
+    def test_detects_wrong_rules(self):
+        class NoFirstMoveBoard(isolation.Board):
+            def get_legal_moves(self, player=None):
+                return super().get_legal_moves(player)[1:]
+        self.assertNotEqual(perft.check(NoFirstMoveBoard, sizes=[(3, 3)], max_depth=2), [])
+
+    def test_detects_bugs_below_the_root(self):
+        """ Children keep the class, so a bug after the first ply shows up """
+        class DeepBugBoard(isolation.Board):
+            def get_legal_moves(self, player=None):
+                moves = super().get_legal_moves(player)
+                return moves[1:] if self.move_count >= 2 else moves
+        mismatches = perft.check(DeepBugBoard, sizes=[(4, 4)], max_depth=3)
+        self.assertEqual([depth for _, _, depth, _, _ in mismatches], [3])
+
+    def test_rejects_boards_copied_to_another_class(self):
+        class BaseCopyBoard(isolation.Board):
+            def copy(self):
+                board = isolation.Board(self.__player_1__, self.__player_2__,
+                                        width=self.width, height=self.height)
+                board.__board_state__ = [list(row) for row in self.__board_state__]
+                board.__last_player_move__ = dict(self.__last_player_move__)
+                board.__active_player__ = self.__active_player__
+                board.__inactive_player__ = self.__inactive_player__
+                return board
+        with self.assertRaises(TypeError):
+            perft.check(BaseCopyBoard, sizes=[(4, 4)], max_depth=2)
+
+    def test_divide(self):
+        game = isolation.Board(1, 2, width=5, height=5)
+        self.assertEqual(sum(perft.divide(game, 3).values()), perft.perft(game, 3))
+        self.assertEqual(perft.perft(game, 0), 1)
+
+    def test_load_class(self):
+        self.assertIs(perft.load_class("isolation:Board"), isolation.Board)
+
+
+if __name__ == '__main__':
+    unittest.main()
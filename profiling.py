@@ -0,0 +1,135 @@
+"""
+Profile agents under real match conditions.
+
+`ProfiledPlayer` wraps any object with a get_move() function. Every call to
+the wrapped agent's get_move runs under a `cProfile.Profile` owned by the
+wrapper, so a wrapper used in many games aggregates the profile of all of
+them. The agent gets an instrumented view of the board (see
+`isolation.BoardView.replace` and `isolation.Instrumentation`), which adds
+the number of board operations and evaluations to the report without
+copying the board on every move.
+
+    python tournament.py --profile profiles --matches 2
+
+writes one `<agent>.prof` file per agent (readable with `pstats` or
+snakeviz) and prints, for every agent, the time spent per move, the board
+operations and evaluations per move, the calls to the functions of
+`game_agent` and `scoring`, and its hottest functions ranked by own time.
+
+Profiling slows the agents down, so iterative deepening agents search less
+deeply and fixed-depth agents may time out more often than usual; compare
+the profiles with each other rather than with unprofiled timings.
+"""
+
+import cProfile
+import os
+import timeit
+
+from isolation import BoardView
+from isolation import Instrumentation
+
+MODULES = ("game_agent", "scoring")
+
+
+class ProfiledPlayer():
+    """Run a player's get_move() under a profiler.
+
+    Parameters
+    ----------
+    player : object
+        The agent to profile.
+
+    name : str (optional)
+        Name of the agent in reports and profile files.
+    """
+
+    def __init__(self, player, name=None):
+        self.player = player
+        self.name = name if name is not None else str(player)
+        self.profile = cProfile.Profile()
+        self.instrumentation = Instrumentation()
+        self.moves = 0
+        self.elapsed = 0.
+
+    def get_move(self, game, legal_moves, time_left):
+        """ Return the move of the wrapped player, profiling its search. """
+        # the same position, with the wrapped player in this wrapper's seat
+        board = BoardView(game).replace({self: self.player}, self.instrumentation)
+        start = timeit.default_timer()
+        self.profile.enable()
+        try:
+            return self.player.get_move(board, legal_moves, time_left)
+        finally:
+            self.profile.disable()
+            self.elapsed += timeit.default_timer() - start
+            self.moves += 1
+
+    def stats(self):
+        """ Return the raw profile table: {(file, line, function): entry}. """
+        self.profile.create_stats()
+        return self.profile.stats
+
+
+def hot_functions(player, limit=15):
+    """
+    Return the `limit` functions with the most own time in the profile of
+    `player` (a `ProfiledPlayer`) as (location, calls, own seconds,
+    cumulative seconds), hottest first.
+    """
+    rows = []
+    for (path, line, function), (_, calls, own, cumulative, _) in player.stats().items():
+        location = "{}:{}({})".format(os.path.basename(path), line, function) if line \
+            else function
+        rows.append((location, calls, own, cumulative))
+    rows.sort(key=lambda row: row[2], reverse=True)
+    return rows[:limit]
+
+
+def module_calls(player, modules=MODULES):
+    """
+    Return {"module.function": calls} for the profiled functions defined in
+    the given modules.
+    """
+    calls = {}
+    for (path, _, function), (_, count, _, _, _) in player.stats().items():
+        module = os.path.splitext(os.path.basename(path))[0]
+        if module in modules:
+            name = "{}.{}".format(module, function)
+            calls[name] = calls.get(name, 0) + count
+    return calls
+
+
+def dump(players, directory):
+    """ Write the profile of every player to `<directory>/<name>.prof`. """
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for player in players:
+        paths.append(os.path.join(directory, "{}.prof".format(player.name)))
+        player.profile.dump_stats(paths[-1])
+    return paths
+
+
+def report(players, limit=15):
+    """ Render the profile summary of every player as text. """
+    lines = []
+    for player in players:
+        moves = max(player.moves, 1)
+        lines.append("")
+        lines.append("{}: {} moves, {:.2f} ms per move".format(
+            player.name, player.moves, 1000. * player.elapsed / moves))
+        counts = player.instrumentation.counts
+        if counts:
+            lines.append("  per move: " + ", ".join(
+                "{} {:.1f}".format(event, count / float(moves))
+                for event, count in sorted(counts.items())))
+        calls = module_calls(player)
+        if calls:
+            lines.append("  calls:")
+            for name, count in sorted(calls.items(), key=lambda item: -item[1]):
+                lines.append("    {:<40}{:>12}".format(name, count))
+        lines.append("  {:<60}{:>10}{:>10}{:>10}".format("hot functions", "calls", "own s",
+                                                        "cum s"))
+        for location, count, own, cumulative in hot_functions(player, limit):
+            lines.append("  {:<60}{:>10}{:>10.3f}{:>10.3f}".format(location[-60:], count, own,
+                                                                   cumulative))
+    return "\n".join(lines)
@@ -0,0 +1,84 @@
+"""
+Tests for the profiled players of tournament --profile
+"""
+
+import os
+import tempfile
+import unittest
+
+import isolation
+import profiling
+
+from game_agent import CustomPlayer
+from sample_players import RandomPlayer
+from sample_players import improved_score
+
+
+class ProfiledPlayerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.profiled = profiling.ProfiledPlayer(
+            CustomPlayer(search_depth=2, score_fn=improved_score, iterative=False,
+                         method='alphabeta'), "AB_2")
+
+    def play(self):
+        game = isolation.Board(self.profiled, RandomPlayer())
+        game.apply_move((3, 3))
+        game.apply_move((0, 0))
+        return game.play(time_limit=1000)
+
+    def test_same_move_as_unprofiled(self):
+        game = isolation.Board(self.profiled.player, "opponent")
+        game.apply_move((2, 3))
+        game.apply_move((0, 0))
+        expected = self.profiled.player.get_move(game.copy(), game.get_legal_moves(),
+                                                 lambda: 1000.)
+        wrapped = isolation.Board(self.profiled, "opponent")
+        wrapped.apply_move((2, 3))
+        wrapped.apply_move((0, 0))
+        self.assertEqual(self.profiled.get_move(wrapped, wrapped.get_legal_moves(),
+                                                lambda: 1000.), expected)
+
+    def test_view_is_not_copied(self):
+        """ The wrapped player gets the game's view in its own seat, uncopied """
+        class ViewPlayer(RandomPlayer):
+            def get_move(self, game, legal_moves, time_left):
+                self.seen = (type(game), game.active_player, game._private)
+                return super(ViewPlayer, self).get_move(game, legal_moves, time_left)
+
+        profiled = profiling.ProfiledPlayer(ViewPlayer())
+        game = isolation.Board(profiled, "opponent")
+        view = isolation.BoardView(game)
+        profiled.get_move(view, game.get_legal_moves(), lambda: 1000.)
+        self.assertEqual(profiled.player.seen, (isolation.BoardView, profiled.player, False))
+        self.assertFalse(view._private)
+        self.assertEqual(profiled.instrumentation.counts["copy"], 0)
+
+    def test_aggregates_games(self):
+        _, history, termination = self.play()
+        moves = self.profiled.moves
+        self.assertEqual(termination, "illegal move")
+        self.assertGreater(moves, 0)
+        self.play()
+        self.assertGreater(self.profiled.moves, moves)
+
+        calls = profiling.module_calls(self.profiled)
+        self.assertGreater(calls["game_agent.get_move"], moves)
+        self.assertGreater(self.profiled.instrumentation.counts["score"], 0)
+        hot = profiling.hot_functions(self.profiled, 5)
+        self.assertEqual(len(hot), 5)
+        self.assertEqual([row[2] for row in hot], sorted((row[2] for row in hot), reverse=True))
+
+    def test_dump_and_report(self):
+        self.play()
+        directory = tempfile.mkdtemp()
+        paths = profiling.dump([self.profiled], directory)
+        self.assertEqual(paths, [os.path.join(directory, "AB_2.prof")])
+        self.assertTrue(os.path.getsize(paths[0]) > 0)
+        text = profiling.report([self.profiled], limit=3)
+        self.assertIn("AB_2:", text)
+        self.assertIn("game_agent.alphabeta", text)
+
+
+if __name__ == '__main__':
+    unittest.main()
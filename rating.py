@@ -0,0 +1,238 @@
+"""
+Maximum-likelihood Elo ratings for any number of agents.
+
+`RatingTable` keeps the aggregated win counts of every pairing that has been
+played and fits a Bradley-Terry model to them, in the spirit of BayesElo: a
+prior of a few virtual drawn games is added to every pairing so that agents
+with only wins or only losses still get a finite rating, and confidence
+intervals are derived from the curvature of the log-likelihood.
+
+Because only the win counts are stored, new agents and new games can be
+added at any time and the ratings refitted (starting from the previous
+solution) without replaying anything. `suggest_pairings` uses the current
+fit to pick the pairings whose next games are most informative.
+
+The table can be saved to and loaded from a JSON file:
+
+    python rating.py ratings.json
+"""
+
+import argparse
+import itertools
+import json
+import math
+
+from stats import normal_quantile
+
+ELO_SCALE = 400. / math.log(10.)  # Elo points per unit of natural log-strength
+
+
+def _invert(matrix):
+    """ Invert a small dense matrix with Gauss-Jordan elimination. """
+    n = len(matrix)
+    aug = [list(row) + [float(i == j) for j in range(n)] for i, row in enumerate(matrix)]
+    for col in range(n):
+        pivot = max(range(col, n), key=lambda r: abs(aug[r][col]))
+        if abs(aug[pivot][col]) < 1e-12:
+            raise ValueError("Singular matrix; are all agents connected by games?")
+        aug[col], aug[pivot] = aug[pivot], aug[col]
+        scale = aug[col][col]
+        aug[col] = [v / scale for v in aug[col]]
+        for r in range(n):
+            if r != col and aug[r][col]:
+                factor = aug[r][col]
+                aug[r] = [v - factor * p for v, p in zip(aug[r], aug[col])]
+    return [row[n:] for row in aug]
+
+
+class RatingTable():
+    """Aggregated game results and the Elo ratings fitted to them.
+
+    Parameters
+    ----------
+    prior : float (optional)
+        Number of virtual drawn games added to every pairing that has been
+        played (BayesElo uses 2).
+    """
+
+    def __init__(self, prior=2.):
+        self.prior = prior
+        self.agents = []
+        self.wins = {}        # (a, b) -> games a won against b
+        self.strength = {}    # agent -> natural log-strength from the last fit
+        self.variance = {}    # agent -> variance of the log-strength
+
+    def add_agent(self, name):
+        """ Register an agent; it starts at the average rating. """
+        if name not in self.strength:
+            self.agents.append(name)
+            self.strength[name] = 0.
+            self.variance[name] = float("inf")
+
+    def add_results(self, a, b, wins_a, wins_b):
+        """ Record that `a` won `wins_a` and `b` won `wins_b` games against each other. """
+        self.add_agent(a)
+        self.add_agent(b)
+        self.wins[(a, b)] = self.wins.get((a, b), 0.) + wins_a
+        self.wins[(b, a)] = self.wins.get((b, a), 0.) + wins_b
+
+    def add_game(self, winner, loser):
+        """ Record a single game. """
+        self.add_results(winner, loser, 1, 0)
+
+    def games(self, a, b):
+        """ Number of real games played between `a` and `b`. """
+        return self.wins.get((a, b), 0.) + self.wins.get((b, a), 0.)
+
+    def _opponents(self):
+        opponents = {name: [] for name in self.agents}
+        for a, b in itertools.combinations(self.agents, 2):
+            n = self.games(a, b)
+            if n:
+                opponents[a].append((b, n + self.prior))
+                opponents[b].append((a, n + self.prior))
+        return opponents
+
+    def fit(self, iterations=1000, tolerance=1e-9):
+        """
+        Fit the ratings with the minorization-maximization algorithm for the
+        Bradley-Terry model (Hunter, 2004), warm-started from the previous
+        fit, then compute the variance of every rating. Ratings are
+        normalized to an average of zero.
+        """
+        opponents = self._opponents()
+        scores = {name: sum(self.wins.get((name, b), 0.) + self.prior / 2.
+                            for b, _ in opponents[name])
+                  for name in self.agents}
+        gamma = {name: math.exp(self.strength[name]) for name in self.agents}
+
+        for _ in range(iterations):
+            change = 0.
+            for name in self.agents:
+                if not opponents[name]:
+                    continue
+                denominator = sum(n / (gamma[name] + gamma[b]) for b, n in opponents[name])
+                updated = scores[name] / denominator
+                change = max(change, abs(math.log(updated / gamma[name])))
+                gamma[name] = updated
+            if change < tolerance:
+                break
+
+        mean = sum(math.log(g) for g in gamma.values()) / len(gamma)
+        self.strength = {name: math.log(g) - mean for name, g in gamma.items()}
+        self._fit_variance(opponents)
+        return self.ratings()
+
+    def _fit_variance(self, opponents):
+        """
+        Variance of each log-strength from the inverse observed information,
+        with the average strength held fixed.
+        """
+        names = [name for name in self.agents if opponents[name]]
+        self.variance = {name: float("inf") for name in self.agents}
+        if len(names) < 2:
+            return
+
+        index = {name: i for i, name in enumerate(names)}
+        hessian = [[0.] * len(names) for _ in names]
+        for name in names:
+            i = index[name]
+            for b, n in opponents[name]:
+                j = index[b]
+                p = 1. / (1. + math.exp(self.strength[b] - self.strength[name]))
+                hessian[i][i] += n * p * (1. - p)
+                hessian[i][j] -= n * p * (1. - p)
+
+        # the likelihood is invariant to a common shift, so the Hessian is
+        # singular along (1, ..., 1); (H + 11'/n)^-1 - 11'/n is its
+        # pseudo-inverse, the covariance with the average strength held fixed
+        n = float(len(names))
+        for i in range(len(names)):
+            for j in range(len(names)):
+                hessian[i][j] += 1. / n
+
+        covariance = _invert(hessian)
+        for name in names:
+            i = index[name]
+            self.variance[name] = covariance[i][i] - 1. / n
+
+    def ratings(self):
+        """ Return a dict mapping every agent to its Elo rating. """
+        return {name: ELO_SCALE * s for name, s in self.strength.items()}
+
+    def intervals(self, confidence=0.95):
+        """
+        Return a dict mapping every agent to its (Elo, error bar) where the
+        error bar is the half-width of the confidence interval.
+        """
+        z = normal_quantile(0.5 + confidence / 2.)
+        return {name: (ELO_SCALE * self.strength[name],
+                       z * ELO_SCALE * math.sqrt(self.variance[name]))
+                for name in self.agents}
+
+    def suggest_pairings(self, count=1):
+        """
+        Return the `count` pairings expected to shrink the rating
+        uncertainty the most: the Fisher information of one more game,
+        p * (1 - p), weighted by the combined variance of both ratings.
+        """
+        def value(pair):
+            a, b = pair
+            p = 1. / (1. + math.exp(self.strength[b] - self.strength[a]))
+            uncertainty = self.variance[a] + self.variance[b]
+            if math.isinf(uncertainty):
+                uncertainty = 1e6
+            return p * (1. - p) * uncertainty / (1. + self.games(a, b))
+
+        pairs = list(itertools.combinations(self.agents, 2))
+        return sorted(pairs, key=value, reverse=True)[:count]
+
+    def to_string(self, confidence=0.95):
+        """ Render the table sorted by rating. """
+        rows = sorted(self.intervals(confidence).items(), key=lambda item: -item[1][0])
+        lines = ["{:<4}{:<20}{:>8}{:>10}{:>8}".format("#", "Agent", "Elo", "+/-", "Games")]
+        for rank, (name, (elo, margin)) in enumerate(rows):
+            played = sum(self.games(name, b) for b in self.agents if b != name)
+            lines.append("{:<4}{:<20}{:>8.0f}{:>10.0f}{:>8.0f}".format(
+                rank + 1, name, elo, margin, played))
+        return "\n".join(lines)
+
+    def save(self, path):
+        """ Write the results and the last fit to a JSON file. """
+        data = {"prior": self.prior,
+                "agents": self.agents,
+                "strength": self.strength,
+                "results": [[a, b, w] for (a, b), w in sorted(self.wins.items())]}
+        with open(path, "w") as f:
+            json.dump(data, f, indent=1)
+
+    @classmethod
+    def load(cls, path):
+        """ Read a table written by `save`. """
+        with open(path) as f:
+            data = json.load(f)
+        table = cls(prior=data["prior"])
+        for name in data["agents"]:
+            table.add_agent(name)
+        for a, b, w in data["results"]:
+            table.wins[(a, b)] = w
+        table.strength.update(data["strength"])
+        return table
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print the Elo table stored in a ratings file.")
+    parser.add_argument("path", help="JSON file written by RatingTable.save")
+    parser.add_argument("--suggest", type=int, default=0,
+                        help="also list this many informative pairings to play next")
+    args = parser.parse_args()
+
+    table = RatingTable.load(args.path)
+    table.fit()
+    print(table.to_string())
+    for a, b in table.suggest_pairings(args.suggest):
+        print("next: {} vs {}".format(a, b))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Tests for the maximum-likelihood Elo ratings
+"""
+
+import os
+import tempfile
+import unittest
+
+import stats
+
+from rating import RatingTable
+
+
+class RatingTest(unittest.TestCase):
+
+    def test_two_agents(self):
+        """ With two agents the fit reproduces the observed score """
+        table = RatingTable(prior=0.)
+        table.add_results("a", "b", 75, 25)
+        ratings = table.fit()
+        self.assertAlmostEqual(ratings["a"] - ratings["b"], stats.elo_from_score(0.75), places=4)
+        self.assertAlmostEqual(ratings["a"] + ratings["b"], 0.)
+
+    def test_intervals_shrink(self):
+        table = RatingTable()
+        table.add_results("a", "b", 6, 4)
+        table.fit()
+        wide = table.intervals()["a"][1]
+        table.add_results("a", "b", 54, 36)
+        table.fit()
+        self.assertLess(table.intervals()["a"][1], wide)
+
+    def test_incremental(self):
+        """ Adding an agent later matches fitting all results at once """
+        table = RatingTable()
+        table.add_results("a", "b", 30, 20)
+        table.add_results("b", "c", 35, 15)
+        table.fit()
+        table.add_results("d", "c", 10, 10)
+        incremental = table.fit()
+
+        fresh = RatingTable()
+        fresh.add_results("a", "b", 30, 20)
+        fresh.add_results("b", "c", 35, 15)
+        fresh.add_results("d", "c", 10, 10)
+        for name, elo in fresh.fit().items():
+            self.assertAlmostEqual(incremental[name], elo, places=4)
+
+        # the new agent is the least known, pairings involving it come first
+        self.assertIn("d", table.suggest_pairings(1)[0])
+
+    def test_save_load(self):
+        table = RatingTable()
+        table.add_results("a", "b", 3, 1)
+        table.fit()
+        path = os.path.join(tempfile.mkdtemp(), "ratings.json")
+        table.save(path)
+        loaded = RatingTable.load(path)
+        self.assertEqual(loaded.fit(), table.fit())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,173 @@
+"""
+Host game-playing agents in their own worker processes.
+
+`ProcessPlayer` wraps any object with a get_move() function. The wrapped
+agent is sent once to a dedicated worker process; on every turn only the
+`Board.to_bytes` encoding of the state, the board size, the movement rule
+and the time budget go through a pipe, and the worker answers with its move. If
+the answer doesn't arrive before the deadline the worker is killed, the
+player returns `isolation.TIMED_OUT` so that `Board.play` records a timeout
+loss whatever clock the game uses, and a fresh worker is started on the
+next turn.
+
+Because the agent no longer runs inside the game loop, an agent that hangs
+or overruns can't stall a tournament, and agents are free to use threads or
+processes of their own.
+
+    from remote import ProcessPlayer
+    player = ProcessPlayer(CustomPlayer(method='alphabeta'))
+    winner, history, termination = Board(player, RandomPlayer()).play()
+    player.close()
+"""
+
+import multiprocessing
+import timeit
+
+from isolation import Board
+from isolation import TIMED_OUT
+
+
+class Opponent():
+    """Placeholder registered as the opponent on boards rebuilt by the
+    worker process."""
+
+    def __repr__(self):
+        return "Opponent()"
+
+
+def _serve(conn, player):
+    """
+    Worker loop: rebuild the board sent by the parent with `player` in the
+    seat of the active player, and answer with the move it selects within
+    the given budget. A None message stops the worker.
+    """
+    opponent = Opponent()
+    while True:
+        message = conn.recv()
+        if message is None:
+            return
+        data, width, height, rule, budget = message
+        start = 1000 * timeit.default_timer()
+        # the last byte of the encoding is 0 when player 1 is to move
+        players = (player, opponent) if data[-1] == 0 else (opponent, player)
+        game = Board.from_bytes(data, *players, width=width, height=height, rule=rule)
+        time_left = lambda: budget - (1000 * timeit.default_timer() - start)
+        move = player.get_move(game, game.get_legal_moves(), time_left)
+        conn.send(move)
+
+
+class ProcessPlayer():
+    """Run a player in a separate process with a hard deadline per move.
+
+    Parameters
+    ----------
+    player : object
+        The agent to host; it must be picklable.
+
+    margin : float (optional)
+        Milliseconds subtracted from the budget reported to the hosted agent
+        to cover the cost of the round trip through the pipe.
+
+    context : str (optional)
+        The multiprocessing start method used for the worker ('fork',
+        'spawn' or 'forkserver'); the platform default if None.
+    """
+
+    def __init__(self, player, margin=5., context=None):
+        self.player = player
+        self.margin = margin
+        self.context = context
+        self.process = None
+        self.conn = None
+        self.timeouts = 0
+
+    def __getstate__(self):
+        """ The worker belongs to the process that started it. """
+        state = self.__dict__.copy()
+        state['process'] = None
+        state['conn'] = None
+        return state
+
+    def start(self):
+        """ Start the worker process if it isn't running. """
+        if self.process is not None and self.process.is_alive():
+            return
+        ctx = multiprocessing.get_context(self.context)
+        self.conn, child = ctx.Pipe()
+        self.process = ctx.Process(target=_serve, args=(child, self.player), daemon=True)
+        self.process.start()
+        child.close()
+
+    def close(self):
+        """ Stop the worker process. """
+        if self.process is None:
+            return
+        try:
+            self.conn.send(None)
+            self.process.join(1.)
+        except (OSError, EOFError):
+            pass
+        self.kill()
+
+    def kill(self):
+        """ Terminate the worker immediately. """
+        if self.process is not None:
+            if self.process.is_alive():
+                self.process.kill()
+            self.process.join()
+            self.conn.close()
+        self.process = None
+        self.conn = None
+
+    def get_move(self, game, legal_moves, time_left):
+        """Send the game state to the worker and wait for its move until the
+        time runs out.
+
+        Parameters
+        ----------
+        game : `isolation.Board`
+            An instance of `isolation.Board` encoding the current state of the
+            game (e.g., player locations and blocked cells).
+
+        legal_moves : list<(int, int)>
+            A list containing legal moves. Moves are encoded as tuples of pairs
+            of ints defining the next (row, col) for the agent to occupy.
+
+        time_left : callable
+            A function that returns the number of milliseconds left in the
+            current turn. Returning with any less than 0 ms remaining forfeits
+            the game.
+
+        Returns
+        ----------
+        (int, int)
+            The move selected by the hosted agent, or `isolation.TIMED_OUT`
+            if it missed the deadline. The deadline is always measured on
+            the wall clock.
+        """
+        self.start()
+        budget = time_left()
+        self.conn.send((game.to_bytes(), game.width, game.height, game.rule,
+                        budget - self.margin))
+
+        try:
+            if self.conn.poll(max(budget, 0.) / 1000.):
+                return self.conn.recv()
+        except EOFError:
+            # the worker crashed; treat it like a missed deadline
+            pass
+
+        self.timeouts += 1
+        self.kill()
+        # the game clock may not agree that the turn is over (poll() can wake
+        # up a hair early, and CPU time doesn't advance while waiting)
+        return TIMED_OUT
+
+    def __repr__(self):
+        return "ProcessPlayer({!r})".format(self.player)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,71 @@
+"""
+Tests for agents hosted in worker processes
+"""
+
+import time
+import unittest
+
+import isolation
+
+from remote import ProcessPlayer
+from sample_players import GreedyPlayer
+from sample_players import RandomPlayer
+
+
+class HangingPlayer():
+    """ Player that never returns """
+
+    def get_move(self, game, legal_moves, time_left):
+        while True:
+            time.sleep(1)
+
+
+class ProcessPlayerTest(unittest.TestCase):
+
+    def test_play(self):
+        """ A hosted agent plays a full game and keeps its identity """
+        with ProcessPlayer(GreedyPlayer()) as hosted:
+            opponent = RandomPlayer()
+            game = isolation.Board(opponent, hosted)
+            winner, history, termination = game.play(time_limit=500)
+            self.assertIn(winner, (hosted, opponent))
+            self.assertEqual(termination, "illegal move")
+            self.assertEqual(hosted.timeouts, 0)
+
+    def test_same_move_as_in_process(self):
+        greedy = GreedyPlayer()
+        game = isolation.Board(greedy, "opponent")
+        game.apply_move((2, 3))
+        game.apply_move((0, 0))
+        with ProcessPlayer(greedy) as hosted:
+            remote_game = isolation.Board(hosted, "opponent")
+            remote_game.apply_move((2, 3))
+            remote_game.apply_move((0, 0))
+            self.assertEqual(hosted.get_move(remote_game, remote_game.get_legal_moves(), lambda: 500),
+                             greedy.get_move(game, game.get_legal_moves(), lambda: 500))
+
+    def test_deadline(self):
+        """ A hanging agent is killed at the deadline and loses on time """
+        with ProcessPlayer(HangingPlayer()) as hosted:
+            opponent = RandomPlayer()
+            game = isolation.Board(hosted, opponent)
+            start = time.time()
+            winner, _, termination = game.play(time_limit=100)
+            self.assertLess(time.time() - start, 2.)
+            self.assertEqual((winner, termination), (opponent, "timeout"))
+            self.assertEqual(hosted.timeouts, 1)
+            self.assertIsNone(hosted.process)
+
+    def test_deadline_with_cpu_clock(self):
+        """ The parent's CPU clock barely moves while it waits; still a timeout """
+        with ProcessPlayer(HangingPlayer()) as hosted:
+            opponent = RandomPlayer()
+            game = isolation.Board(hosted, opponent)
+            winner, history, termination = game.play(
+                time_control=isolation.TimeControl(move_millis=100, clock="process"))
+            self.assertEqual((winner, termination), (opponent, "timeout"))
+            self.assertEqual(history, [[None]])
+
+
+if __name__ == '__main__':
+    unittest.main()
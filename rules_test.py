@@ -0,0 +1,118 @@
+"""
+Tests for the movement rules and their move tables
+"""
+
+import pickle
+import random
+import unittest
+
+import isolation
+import scoring
+
+from isolation import bitboard
+from isolation import rules
+
+
+def walk_moves(game, player=None):
+    """ Reference move generator walking the offsets one cell at a time. """
+    player = player or game.active_player
+    location = game.get_player_location(player)
+    if location is None:
+        return game.get_blank_spaces()
+    moves = []
+    for dr, dc in game.rule.offsets:
+        r, c = location[0] + dr, location[1] + dc
+        while game.move_is_legal((r, c)):
+            moves.append((r, c))
+            if not game.rule.sliding:
+                break
+            r, c = r + dr, c + dc
+    return moves
+
+
+def random_games(rule, board_class, count=20, seed=0):
+    """ Yield every position of random games under `rule`. """
+    rng = random.Random(seed)
+    for _ in range(count):
+        width, height = rng.randint(3, 11), rng.randint(3, 11)
+        game = board_class("p1", "p2", width, height, rule=rule)
+        while True:
+            yield game
+            moves = game.get_legal_moves()
+            if not moves:
+                break
+            game = game.forecast_move(rng.choice(moves))
+
+
+class MoveRuleTest(unittest.TestCase):
+
+    def test_get_rule(self):
+        self.assertIs(rules.get_rule(), rules.KNIGHT)
+        self.assertIs(rules.get_rule("queen"), rules.QUEEN)
+        self.assertEqual(rules.get_rule([(0, 1), (1, 0)]).offsets, [(0, 1), (1, 0)])
+        with self.assertRaises(ValueError):
+            rules.get_rule("bishop")
+
+    def test_pickle(self):
+        rule = pickle.loads(pickle.dumps(rules.QUEEN))
+        self.assertEqual(rule, rules.QUEEN)
+        self.assertNotEqual(rule, rules.KING)
+        self.assertEqual(rule.tables(5, 5).targets, rules.QUEEN.tables(5, 5).targets)
+
+    def test_legal_moves(self):
+        """ Board and BitBoard agree with a cell by cell walk, in order """
+        camel = isolation.MoveRule("camel", [(3, 1), (1, 3), (-3, 1), (1, -3),
+                                             (3, -1), (-1, 3), (-3, -1), (-1, -3)])
+        for rule in (rules.KNIGHT, rules.KING, rules.QUEEN, camel):
+            for board_class in (isolation.Board, isolation.BitBoard):
+                for game in random_games(rule, board_class, count=10):
+                    for player in ("p1", "p2"):
+                        self.assertEqual(game.get_legal_moves(player), walk_moves(game, player))
+
+    def test_copy_keeps_rule(self):
+        for board_class in (isolation.Board, isolation.BitBoard):
+            game = board_class("p1", "p2", rule="king")
+            game.apply_move((3, 3))
+            self.assertEqual(game.forecast_move((0, 0)).rule, rules.KING)
+            decoded = bitboard.decode_state(bitboard.encode_state(game), "p1", "p2",
+                                            board_class, rule=game.rule)
+            self.assertEqual(decoded.get_legal_moves("p1"), game.get_legal_moves("p1"))
+
+    def test_queen_distance_layers(self):
+        """ Flood fill layers of sliding moves agree with a breadth first search """
+        for game in random_games(rules.QUEEN, isolation.Board, count=5, seed=1):
+            location = game.get_player_location("p1")
+            if location is None:
+                continue
+            expected, seen, frontier = [], {location}, [location]
+            while True:
+                layer = set()
+                for cell in frontier:
+                    probe = game.copy()
+                    probe.__last_player_move__["p1"] = cell
+                    layer.update(m for m in walk_moves(probe, "p1") if m not in seen)
+                if not layer:
+                    break
+                expected.append(layer)
+                seen |= layer
+                frontier = layer
+            own, _ = bitboard.distance_layers(game, "p1")
+            self.assertEqual([set(bitboard.iter_cells(l, game.width)) for l in own], expected)
+
+    def test_scoring_uses_rule(self):
+        """ A king standing next to the opponent can step onto its cell """
+        game = isolation.Board("p1", "p2", rule="king")
+        game.apply_move((3, 3))
+        game.apply_move((4, 4))
+        knight = isolation.Board("p1", "p2")
+        knight.apply_move((3, 3))
+        knight.apply_move((4, 4))
+        bonus = 2 * round(1 / 8 * 100)
+        self.assertEqual(scoring.toe_stepper(game, "p1") - 10. * len(game.get_legal_moves("p1")),
+                         bonus)
+        self.assertEqual(scoring.toe_stepper(knight, "p1") -
+                         10. * len(knight.get_legal_moves("p1")), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+"""
+Statistics helpers for comparing agents: conversions between expected score
+and Elo difference, Elo confidence intervals, and a sequential probability
+ratio test (SPRT) used to stop a pairing as soon as its outcome is known.
+
+Isolation has no draws, so a sequence of games between two agents is
+modelled as Bernoulli trials with success probability equal to the expected
+score of the first agent.
+"""
+
+import math
+
+
+def score_from_elo(elo):
+    """ Expected score of an agent rated `elo` points above its opponent. """
+    return 1. / (1. + 10. ** (-elo / 400.))
+
+
+def elo_from_score(score):
+    """ Elo difference matching an expected score in [0, 1]. """
+    if score <= 0.:
+        return float("-inf")
+    if score >= 1.:
+        return float("inf")
+    return -400. * math.log10(1. / score - 1.)
+
+
+def normal_quantile(p):
+    """ Inverse of the standard normal CDF (Acklam's approximation). """
+    a = [-3.969683028665376e+01, 2.209460984245205e+02, -2.759285104469687e+02,
+         1.383577518672690e+02, -3.066479806614716e+01, 2.506628277459239e+00]
+    b = [-5.447609879822406e+01, 1.615858368580409e+02, -1.556989798598866e+02,
+         6.680131188771972e+01, -1.328068155288572e+01]
+    c = [-7.784894002430293e-03, -3.223964580411365e-01, -2.400758277161838e+00,
+         -2.549732539343734e+00, 4.374664141464968e+00, 2.938163982698783e+00]
+    d = [7.784695709041462e-03, 3.224671290700398e-01, 2.445134137142996e+00,
+         3.754408661907416e+00]
+    low = 0.02425
+    if p < low:
+        q = math.sqrt(-2 * math.log(p))
+        return (((((c[0]*q + c[1])*q + c[2])*q + c[3])*q + c[4])*q + c[5]) / \
+               ((((d[0]*q + d[1])*q + d[2])*q + d[3])*q + 1)
+    if p > 1 - low:
+        return -normal_quantile(1 - p)
+    q = p - 0.5
+    r = q * q
+    return (((((a[0]*r + a[1])*r + a[2])*r + a[3])*r + a[4])*r + a[5])*q / \
+           (((((b[0]*r + b[1])*r + b[2])*r + b[3])*r + b[4])*r + 1)
+
+
+def elo_interval(wins, losses, confidence=0.95):
+    """
+    Estimate the Elo difference implied by a match result.
+
+    Parameters
+    ----------
+    wins, losses : int
+        Games won and lost by the first agent.
+
+    confidence : float (optional)
+        Coverage of the two-sided confidence interval.
+
+    Returns
+    ----------
+    (float, float)
+        The Elo difference and the half-width of its confidence interval
+        (+/- error bar), obtained by mapping the normal interval of the
+        score back to the Elo scale. Both are infinite for a clean sweep.
+    """
+    games = wins + losses
+    if games == 0:
+        return 0., float("inf")
+    score = float(wins) / games
+    margin = normal_quantile(0.5 + confidence / 2.) * math.sqrt(score * (1. - score) / games)
+    elo = elo_from_score(score)
+    if math.isinf(elo):
+        return elo, float("inf")
+    return elo, (elo_from_score(score + margin) - elo_from_score(score - margin)) / 2.
+
+
+class SPRT():
+    """Two-sided sequential probability ratio test on the Elo difference of a
+    pairing.
+
+    Two one-sided Wald tests run side by side: H0 (elo = 0) against H1
+    (elo = +elo1) decides whether the first agent is stronger, and H0
+    against H1 (elo = -elo1) whether it is weaker. The pairing is
+    `"stronger"` or `"weaker"` as soon as one test accepts its H1, and
+    `"equal"` (no difference of at least elo1) once both accept H0.
+
+    Parameters
+    ----------
+    elo1 : float (optional)
+        Smallest Elo difference worth detecting.
+
+    alpha : float (optional)
+        Probability of reporting a difference when there is none.
+
+    beta : float (optional)
+        Probability of missing a difference of elo1.
+    """
+
+    def __init__(self, elo1=50., alpha=0.05, beta=0.05):
+        self.elo1 = elo1
+        self.alpha = alpha
+        self.beta = beta
+        self.lower = math.log(beta / (1. - alpha))
+        self.upper = math.log((1. - beta) / alpha)
+        self.wins = 0
+        self.losses = 0
+
+    def record(self, wins, losses):
+        """ Add game results from the point of view of the first agent. """
+        self.wins += wins
+        self.losses += losses
+
+    def llr(self, elo1):
+        """ Log-likelihood ratio of elo = elo1 against elo = 0. """
+        p0, p1 = 0.5, score_from_elo(elo1)
+        return self.wins * math.log(p1 / p0) + self.losses * math.log((1. - p1) / (1. - p0))
+
+    def decision(self):
+        """ Return "stronger", "weaker", "equal" or None while undecided. """
+        up, down = self.llr(self.elo1), self.llr(-self.elo1)
+        if up >= self.upper:
+            return "stronger"
+        if down >= self.upper:
+            return "weaker"
+        if up <= self.lower and down <= self.lower:
+            return "equal"
+        return None
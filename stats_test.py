@@ -0,0 +1,50 @@
+"""
+Tests for the Elo helpers and the sequential probability ratio test
+"""
+
+import unittest
+
+import stats
+
+
+class StatsTest(unittest.TestCase):
+
+    def test_elo_round_trip(self):
+        for elo in (-400., -50., 0., 120., 800.):
+            self.assertAlmostEqual(stats.elo_from_score(stats.score_from_elo(elo)), elo)
+        self.assertAlmostEqual(stats.score_from_elo(400.), 10. / 11.)
+
+    def test_normal_quantile(self):
+        self.assertAlmostEqual(stats.normal_quantile(0.975), 1.959964, places=5)
+        self.assertAlmostEqual(stats.normal_quantile(0.5), 0.)
+        self.assertAlmostEqual(stats.normal_quantile(0.001), -3.090232, places=5)
+
+    def test_elo_interval(self):
+        elo, margin = stats.elo_interval(60, 40)
+        self.assertAlmostEqual(elo, stats.elo_from_score(0.6))
+        self.assertTrue(0 < margin < 100)
+        # four times the games halves the error bar
+        _, smaller = stats.elo_interval(240, 160)
+        self.assertAlmostEqual(smaller / margin, 0.5, places=1)
+        self.assertEqual(stats.elo_interval(10, 0)[1], float("inf"))
+
+    def test_sprt(self):
+        test = stats.SPRT(elo1=100.)
+        test.record(3, 2)
+        self.assertIsNone(test.decision())
+
+        test = stats.SPRT(elo1=100.)
+        test.record(40, 10)
+        self.assertEqual(test.decision(), "stronger")
+
+        test = stats.SPRT(elo1=100.)
+        test.record(10, 40)
+        self.assertEqual(test.decision(), "weaker")
+
+        test = stats.SPRT(elo1=100.)
+        test.record(200, 200)
+        self.assertEqual(test.decision(), "equal")
+
+
+if __name__ == '__main__':
+    unittest.main()
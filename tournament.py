@@ -19,19 +19,40 @@ initiative in the second match with agentB at (5, 2) as player 1 and agentA at
 (1, 3) as player 2.
 """
 
+import argparse
+import functools
 import itertools
+import multiprocessing
+import os
 import random
+import shlex
 import warnings
+import zlib
 
 from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import as_completed
+from multiprocessing.util import Finalize
 
+import distributed
+import profiling
 from isolation import Board
+from isolation import TimeControl
+from calibration import calibrate
+from calibration import scale_time_control
 from sample_players import RandomPlayer
 from sample_players import null_score
 from sample_players import open_move_score
 from sample_players import improved_score
 from game_agent import CustomPlayer
 from game_agent import custom_score
+from engine import EnginePlayer
+from gamelog import GameLog
+from openings import load as load_openings
+from rating import RatingTable
+from remote import ProcessPlayer
+from stats import SPRT
+from stats import elo_interval
 
 NUM_MATCHES = 5  # number of matches against each opponent
 TIME_LIMIT = 150  # number of milliseconds before timeout
@@ -56,28 +77,61 @@ same opponents.
 
 Agent = namedtuple("Agent", ["player", "name"])
 
+# engines started by the jobs of a process, by (pid, agent name, command)
+_ENGINES = {}
 
-def play_match(player1, player2):
+
+def play_match(player1, player2, seed=None, names=None, records=None, time_control=None,
+               opening=None):
     """
     Play a "fair" set of matches between two agents by playing two games
     between the players, forcing each agent to play from randomly selected
     positions. This should control for differences in outcome resulting from
     advantage due to starting position on the board.
+
+    If `seed` is given the opening and the random module used by the agents
+    are seeded from it, so the match can be replayed. If `records` is a
+    list, a `gamelog` record is appended to it for each game, naming the
+    players with the `names` dict (player -> name). `time_control` (an
+    `isolation.TimeControl`) replaces the fixed TIME_LIMIT per move.
+    `opening` (a pair of moves, see `openings.py`) replaces the random
+    initial moves.
     """
     num_wins = {player1: 0, player2: 0}
     num_timeouts = {player1: 0, player2: 0}
     num_invalid_moves = {player1: 0, player2: 0}
     games = [Board(player1, player2), Board(player2, player1)]
-
-    # initialize both games with a random move and response
-    for _ in range(2):
-        move = random.choice(games[0].get_legal_moves())
+    rng = random.Random(seed) if seed is not None else random
+
+    # initialize both games with a random move and response, unless the
+    # opening is given
+    moves = list(opening) if opening is not None else []
+    opening = []
+    for i in range(2):
+        move = moves[i] if moves else rng.choice(games[0].get_legal_moves())
         games[0].apply_move(move)
         games[1].apply_move(move)
+        opening.append(move)
 
     # play both games and tally the results
-    for game in games:
-        winner, _, termination = game.play(time_limit=TIME_LIMIT)
+    for i, game in enumerate(games):
+        if seed is not None:
+            random.seed(seed + i)
+        move_times = []
+        winner, history, termination = game.play(time_limit=TIME_LIMIT, move_times=move_times,
+                                                   time_control=time_control)
+
+        if records is not None:
+            names = names or {player1: str(player1), player2: str(player2)}
+            records.append({"game": i,
+                            "seed": seed,
+                            "player_1": names[game.__player_1__],
+                            "player_2": names[game.__player_2__],
+                            "opening": opening,
+                            "moves": history,
+                            "winner": names[winner],
+                            "termination": termination,
+                            "move_times": [round(t, 3) for t in move_times]})
 
         if player1 == winner:
             num_wins[player1] += 1
@@ -102,9 +156,131 @@ def play_match(player1, player2):
     return num_wins[player1], num_wins[player2]
 
 
-def play_round(agents, num_matches):
+def available_cpus():
+    """ Return the number of CPUs this process is allowed to run on. """
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def _init_worker(cores):
+    """
+    Pool initializer: reseed the random module (forked workers would
+    otherwise draw identical openings) and pin the worker to a core of its
+    own so concurrent games never compete for the same CPU.
+    """
+    random.seed()
+    os.environ["OMP_NUM_THREADS"] = "1"
+    if hasattr(os, "sched_setaffinity"):
+        try:
+            os.sched_setaffinity(0, {cores.get_nowait()})
+        except Exception:
+            pass
+
+
+def _worker_engine(player, name):
+    """
+    The engine of agent `name` in this process. Every job carries its own
+    unpickled copy of an `EnginePlayer`, which would start (and leave
+    running) an engine of its own; instead the first copy is kept and
+    reused by the later jobs of the process, and closed when it exits.
+    """
+    if not isinstance(player, EnginePlayer):
+        return player
+    if not any(pid == os.getpid() for pid, _, _ in _ENGINES):
+        # run at exit by pool workers and job processes as well
+        Finalize(None, _close_engines, exitpriority=10)
+    return _ENGINES.setdefault((os.getpid(), name, tuple(player.command)), player)
+
+
+def _close_engines():
+    """ Quit the engines started by `_worker_engine` in this process. """
+    for key in [key for key in _ENGINES if key[0] == os.getpid()]:
+        _ENGINES.pop(key).close()
+
+
+def _play_match_job(job, calibration=None):
+    """
+    Play one `play_match` in a worker process. The time control is scaled by
+    the calibration of the job, or by `calibration` if the worker measured
+    its own.
+    """
+    idx, first, key, seed, player1, player2, names, time_control, job_calibration, opening = job
+    player1, player2 = _worker_engine(player1, names[0]), _worker_engine(player2, names[1])
+    calibration = calibration or job_calibration
+    if calibration is not None:
+        time_control = scale_time_control(time_control or TimeControl(move_millis=TIME_LIMIT),
+                                          calibration)
+    records = []
+    score_1, score_2 = play_match(player1, player2, seed,
+                                  {player1: names[0], player2: names[1]}, records,
+                                  time_control, opening)
+    for record in records:
+        record["match"] = key
+        if calibration is not None:
+            record["calibration"] = calibration
+    return idx, first, score_1, score_2, records
+
+
+def _match_jobs(agent_1, agent_2, idx, start, count, run_seed, time_control,
+                calibration=None, openings=None):
+    """
+    List the `play_match` calls for matches start..start+count-1 of a
+    pairing as (opponent index, index of the ordering, match key, seed,
+    player 1, player 2, names, time control, calibration, opening); ordering
+    0 has agent_1 moving first. Without `openings` every match is played in
+    both orderings from random moves. With an `openings` suite match k is
+    played once, from opening k (cycling through the suite) in ordering
+    k % 2: `play_match` already plays an opening with both colours, so a
+    second ordering would only repeat the same games.
+    The key identifies the match in a `gamelog.GameLog` and the seed is derived from
+    it, so a resumed run replays exactly the missing matches.
+    """
+    jobs = []
+    for first, (a, b) in enumerate(itertools.permutations((agent_1, agent_2))):
+        for k in range(start, start + count):
+            if openings and k % 2 != first:
+                continue
+            key = "{}|{}|{}|{}".format(agent_1.name, agent_2.name, first, k)
+            seed = zlib.crc32("{}:{}".format(run_seed, key).encode()) if run_seed is not None else None
+            jobs.append((idx, first, key, seed, a.player, b.player, (a.name, b.name),
+                         time_control, calibration,
+                         openings[k % len(openings)] if openings else None))
+    return jobs
+
+
+def play_round(agents, num_matches, workers=1, sprt=None, ratings=None, log=None,
+               seed=None, time_control=None, queue=None, calibration=None, openings=None):
     """
     Play one round (i.e., a single match between each pair of opponents)
+
+    With more than one worker every `play_match` call is scheduled on a pool
+    of processes, each with its own copy of the players. The number of
+    workers is capped at the number of available CPUs and each worker is
+    pinned to a separate core, so that the per-move time limit measures the
+    same amount of computation as in a serial run.
+
+    If `sprt` is a callable returning a fresh `stats.SPRT`, each pairing is
+    played in small batches and stops as soon as the test reaches a
+    decision; `num_matches` is then the maximum number of matches.
+
+    The results of the matches played are added to `ratings` (a
+    `rating.RatingTable`) when one is given.
+
+    Every game is streamed to `log` (a `gamelog.GameLog`) as soon as its
+    match finishes; matches already present in the log are not played again
+    and their logged results are counted in the round instead, but not
+    added to `ratings` again: the run that logged them did. `seed` makes the
+    openings reproducible. `time_control` is passed on to `play_match`,
+    scaled by `calibration` (see `calibration.calibrate`), which is also
+    stored in every game record. Matches start from the `openings` suite (a
+    list of move pairs) when one is given.
+
+    If `queue` (a `distributed.JobQueue`) is given the matches are not
+    played here: they are added to the queue and the round waits for
+    `tournament.py --worker` processes to return their results. Jobs are
+    keyed by the seed and the match, so restarting a coordinator with the
+    same seed and queue collects the matches that are already done.
     """
     agent_1 = agents[-1]
     wins = 0.
@@ -113,30 +289,209 @@ def play_round(agents, num_matches):
     print("\nPlaying Matches:")
     print("----------")
 
-    for idx, agent_2 in enumerate(agents[:-1]):
+    # counts[idx] holds the wins of (agent_1, agents[idx]) in that pairing,
+    # new_counts[idx] only those of the matches played (not read from the log)
+    counts = [[0., 0.] for _ in agents[:-1]]
+    new_counts = [[0., 0.] for _ in agents[:-1]]
+    decisions = [None for _ in agents[:-1]]
+
+    def tally(results):
+        for idx, first, score_1, score_2, records in results:
+            if log is not None:
+                for record in records:
+                    log.write(record)
+            # permutations() puts agent_1 first in the first ordering
+            agent_1_score, agent_2_score = (score_1, score_2) if first == 0 else (score_2, score_1)
+            counts[idx][0] += agent_1_score
+            counts[idx][1] += agent_2_score
+            # logged matches come without records
+            if records:
+                new_counts[idx][0] += agent_1_score
+                new_counts[idx][1] += agent_2_score
+
+    # without a seed, keep this round from collecting an earlier round's results
+    run_id = seed if seed is not None else "r{}".format(random.randrange(2 ** 31))
+    workers = min(workers, available_cpus())
+    pool = manager = None
+    if workers > 1 and queue is None:
+        manager = multiprocessing.Manager()
+        cores = manager.Queue()
+        for core in (sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity")
+                     else range(workers)):
+            cores.put(core)
+        # unlike multiprocessing.Pool, the executor's workers aren't daemonic
+        # and may start processes of their own (e.g. remote.ProcessPlayer)
+        pool = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(cores,))
+
+    def run(jobs):
+        done = []
+        if log is not None:
+            for job in list(jobs):
+                records = log.completed(job[2])
+                if records is not None:
+                    jobs.remove(job)
+                    names = job[6]
+                    done.append(job[:2] + tuple(sum(r["winner"] == name for r in records)
+                                                for name in names) + ([],))
+        if queue is not None:
+            key = lambda job: "{}:{}".format(run_id, job[2])
+            return itertools.chain(done, queue.map(jobs, key))
+        if pool is not None:
+            futures = [pool.submit(_play_match_job, job) for job in jobs]
+            return itertools.chain(done, (f.result() for f in as_completed(futures)))
+        return itertools.chain(done, map(_play_match_job, jobs))
+
+    try:
+        if sprt is None:
+            jobs = []
+            for idx, agent_2 in enumerate(agents[:-1]):
+                jobs.extend(_match_jobs(agent_1, agent_2, idx, 0, num_matches, seed,
+                                        time_control, calibration, openings))
+            tally(run(jobs))
+        else:
+            # each batch gives both orderings to every worker at least once
+            batch = max(1, workers // 2)
+            for idx, agent_2 in enumerate(agents[:-1]):
+                test = sprt()
+                played = 0
+                while played < num_matches and decisions[idx] is None:
+                    size = min(batch, num_matches - played)
+                    before = list(counts[idx])
+                    tally(run(_match_jobs(agent_1, agent_2, idx, played, size, seed,
+                                          time_control, calibration, openings)))
+                    played += size
+                    test.record(counts[idx][0] - before[0], counts[idx][1] - before[1])
+                    decisions[idx] = test.decision()
+    finally:
+        if pool is not None:
+            pool.shutdown()
+            manager.shutdown()
 
-        counts = {agent_1.player: 0., agent_2.player: 0.}
+    for idx, agent_2 in enumerate(agents[:-1]):
         names = [agent_1.name, agent_2.name]
         print("  Match {}: {!s:^11} vs {!s:^11}".format(idx + 1, *names), end=' ')
-
-        # Each player takes a turn going first
-        for p1, p2 in itertools.permutations((agent_1.player, agent_2.player)):
-            for _ in range(num_matches):
-                score_1, score_2 = play_match(p1, p2)
-                counts[p1] += score_1
-                counts[p2] += score_2
-                total += score_1 + score_2
-
-        wins += counts[agent_1.player]
-
-        print("\tResult: {} to {}".format(int(counts[agent_1.player]),
-                                          int(counts[agent_2.player])))
+        print("\tResult: {} to {}".format(int(counts[idx][0]), int(counts[idx][1])), end=' ')
+        elo, margin = elo_interval(*counts[idx])
+        print("\tElo: {:+.0f} +/- {:.0f}".format(elo, margin), end='')
+        if sprt is not None:
+            print("\tSPRT: {}".format(decisions[idx] or "undecided"), end='')
+        print("")
+        wins += counts[idx][0]
+        total += sum(counts[idx])
+        if ratings is not None:
+            ratings.add_results(agent_1.name, agent_2.name, *new_counts[idx])
 
     return 100. * wins / total
 
 
 def main():
 
+    parser = argparse.ArgumentParser(description=DESCRIPTION)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of processes playing games in parallel; 0 uses every " +
+                             "available CPU (default: 1, serial)")
+    parser.add_argument("--matches", type=int,
+                        help="matches against each opponent, or the maximum with --sprt " +
+                             "(default: {}, or the size of the --openings suite)".format(NUM_MATCHES))
+    parser.add_argument("--openings", metavar="PATH",
+                        help="play match k from opening k of this suite (see openings.py) " +
+                             "instead of random initial moves")
+    parser.add_argument("--sprt", action="store_true",
+                        help="stop each pairing as soon as a sequential probability ratio " +
+                             "test decides whether the agents differ by at least --elo1")
+    parser.add_argument("--elo1", type=float, default=50.,
+                        help="smallest Elo difference the SPRT should detect (default: %(default)s)")
+    parser.add_argument("--alpha", type=float, default=0.05,
+                        help="SPRT false positive rate (default: %(default)s)")
+    parser.add_argument("--beta", type=float, default=0.05,
+                        help="SPRT false negative rate (default: %(default)s)")
+    parser.add_argument("--ratings", metavar="PATH",
+                        help="accumulate the results in this ratings file and print the " +
+                             "Elo table of every agent it contains")
+    parser.add_argument("--log", metavar="PATH",
+                        help="stream every game to this JSON Lines file; if it already " +
+                             "exists the tournament resumes, skipping logged matches")
+    parser.add_argument("--seed", type=int,
+                        help="seed for the openings and the agents' random choices " +
+                             "(a random seed is chosen and printed otherwise)")
+    parser.add_argument("--clock", choices=["wall", "process", "thread"], default="wall",
+                        help="clock measuring the agents' time: wall-clock, or CPU time of " +
+                             "the process or of the playing thread (default: %(default)s)")
+    parser.add_argument("--base-time", type=float, metavar="MS",
+                        help="give each agent a time bank of MS milliseconds per game " +
+                             "instead of a fixed TIME_LIMIT per move")
+    parser.add_argument("--increment", type=float, default=0., metavar="MS",
+                        help="milliseconds added to the time bank after every move")
+    parser.add_argument("--moves-to-go", type=float, default=20, metavar="N",
+                        help="with --base-time, budget every move as if the bank had to " +
+                             "last N more moves (default: %(default)s)")
+    parser.add_argument("--isolate", action="store_true",
+                        help="run every agent in its own worker process, killed when it " +
+                             "overruns its time (see remote.ProcessPlayer)")
+    parser.add_argument("--engine", action="append", default=[], metavar="NAME=COMMAND",
+                        help="also evaluate the engine started by COMMAND (see engine.py); " +
+                             "may be repeated")
+    parser.add_argument("--queue", metavar="PATH",
+                        help="coordinate workers through this SQLite job queue instead of " +
+                             "playing the games in this process (see distributed.py)")
+    parser.add_argument("--worker", action="store_true",
+                        help="play games from the --queue of a coordinator instead of " +
+                             "running a tournament")
+    parser.add_argument("--lease", type=float, default=30., metavar="SECONDS",
+                        help="reassign a job whose worker sent no heartbeat for this long " +
+                             "(default: %(default)s)")
+    parser.add_argument("--calibrate", action="store_true",
+                        help="measure this machine's search speed and scale every time " +
+                             "limit to the node budget of the reference machine; workers " +
+                             "started with --calibrate use their own measurement")
+    parser.add_argument("--max-idle", type=float, metavar="SECONDS",
+                        help="with --worker, exit after waiting this long for a job")
+    parser.add_argument("--profile", metavar="DIR",
+                        help="profile every agent's get_move() across all games, write " +
+                             "DIR/<agent>.prof and print a summary (see profiling.py); " +
+                             "games are played serially")
+    args = parser.parse_args()
+    if args.profile and (args.queue or args.worker or args.isolate):
+        parser.error("--profile profiles this process and can't be combined with " +
+                     "--queue, --worker or --isolate")
+    suite = None
+    if args.openings:
+        try:
+            suite = load_openings(args.openings)
+        except ValueError as e:
+            parser.error(str(e))
+    if args.matches is None:
+        args.matches = len(suite) if suite else NUM_MATCHES
+    calibration = None
+    if args.calibrate:
+        calibration = calibrate()
+        print("Calibration: {} nodes/s, time limits x{}".format(calibration["nps"],
+                                                               calibration["scale"]))
+    queue = distributed.JobQueue(args.queue, lease=args.lease) if args.queue else None
+    if args.worker:
+        if queue is None:
+            parser.error("--worker requires --queue")
+        play = functools.partial(_play_match_job, calibration=calibration)
+        done = distributed.work(queue, play, max_idle=args.max_idle)
+        print("Played {} matches".format(done))
+        return
+
+    time_control = TimeControl(move_millis=TIME_LIMIT, base_millis=args.base_time,
+                               increment_millis=args.increment, clock=args.clock,
+                               moves_to_go=args.moves_to_go)
+    if args.seed is None:
+        args.seed = random.randrange(2 ** 31)
+    workers = args.workers or available_cpus()
+    if args.profile:
+        # the profiles are collected in this process
+        workers = 1
+    ratings = None
+    if args.ratings:
+        ratings = RatingTable.load(args.ratings) if os.path.exists(args.ratings) else RatingTable()
+    sprt = None
+    if args.sprt:
+        sprt = lambda: SPRT(elo1=args.elo1, alpha=args.alpha, beta=args.beta)
+
     HEURISTICS = [("Null", null_score),
                   ("Open", open_move_score),
                   ("Improved", improved_score)]
@@ -159,11 +514,28 @@ def main():
     # submitted agent for calibration on the performance across different
     # systems; i.e., the performance of the student agent is considered
     # relative to the performance of the ID_Improved agent to account for
-    # faster or slower computers.
+    # faster or slower computers. (--calibrate normalizes the time limits
+    # themselves instead.)
     test_agents = [Agent(CustomPlayer(score_fn=improved_score, **CUSTOM_ARGS), "ID_Improved"),
                    Agent(CustomPlayer(score_fn=custom_score, **CUSTOM_ARGS), "Student")]
 
+    for spec in args.engine:
+        name, _, command = spec.partition("=")
+        test_agents.append(Agent(EnginePlayer(shlex.split(command)), name))
+
+    if args.isolate:
+        wrap = lambda agents: [Agent(ProcessPlayer(a.player), a.name) for a in agents]
+        mm_agents, ab_agents = wrap(mm_agents), wrap(ab_agents)
+        random_agents, test_agents = wrap(random_agents), wrap(test_agents)
+
+    if args.profile:
+        wrap = lambda agents: [Agent(profiling.ProfiledPlayer(a.player, a.name), a.name) for a in agents]
+        mm_agents, ab_agents = wrap(mm_agents), wrap(ab_agents)
+        random_agents, test_agents = wrap(random_agents), wrap(test_agents)
+
     print(DESCRIPTION)
+    print("Seed: {}".format(args.seed))
+    log = GameLog(args.log) if args.log else None
     for agentUT in test_agents:
         print("")
         print("*************************")
@@ -171,12 +543,34 @@ def main():
         print("*************************")
 
         agents = random_agents + mm_agents + ab_agents + [agentUT]
-        win_ratio = play_round(agents, NUM_MATCHES)
+        win_ratio = play_round(agents, args.matches, workers, sprt, ratings, log, args.seed,
+                               time_control, queue, calibration, suite)
 
         print("\n\nResults:")
         print("----------")
         print("{!s:<15}{:>10.2f}%".format(agentUT.name, win_ratio))
 
+        # the logged matches of this round are rated, even if the run dies
+        if ratings is not None:
+            ratings.save(args.ratings)
+
+    if log is not None:
+        log.close()
+
+    if args.profile:
+        profiled = [a.player for a in random_agents + mm_agents + ab_agents + test_agents]
+        profiling.dump(profiled, args.profile)
+        print("\n\nProfiles (written to {}):".format(args.profile))
+        print("----------")
+        print(profiling.report(profiled))
+
+    if ratings is not None:
+        ratings.fit()
+        ratings.save(args.ratings)
+        print("\n\nRatings:")
+        print("----------")
+        print(ratings.to_string())
+
 
 if __name__ == "__main__":
     main()